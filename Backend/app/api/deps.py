@@ -1,32 +1,84 @@
 from __future__ import annotations
 
+import logging
 from functools import lru_cache
+from typing import Optional
 
-from fastapi import HTTPException
+from fastapi import Depends, HTTPException
 from starlette import status
 
 from app.core.config import settings
 from app.providers.email_reader import EmailReader
-from app.providers.nlp_preprocess import NlpPreprocess
+from app.providers.fallback_provider import HeuristicFallbackProvider
+from app.providers.job_store import InMemoryJobStore, JobStore, SqliteJobStore
+from app.providers.local_classifier import LocalClassifier
+from app.providers.nlp_preprocess import NlpBudget, NlpPreprocess
 from app.providers.openai_provider import OpenAiEmailProvider
+from app.providers.pdf_sandbox import PdfSandbox
+from app.providers.result_cache import InMemoryResultCache, ResultCache, SqliteResultCache, TieredResultCache
+from app.services.email_batch_service import EmailBatchService
 from app.services.email_classifier_service import EmailClassifierService
+from app.services.email_cleaner import EmailCleaner
+from app.services.job_queue_service import JobQueueService
+from app.services.near_duplicate_index import NearDuplicateIndex
+from app.services.single_flight import SingleFlight
 
 from app.services.prompt_policy import PromptPolicy
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache
+def get_pdf_sandbox() -> Optional[PdfSandbox]:
+    if settings.pdf_pool_workers <= 0:
+        return None
+    return PdfSandbox(
+        workers=settings.pdf_pool_workers,
+        timeout_s=settings.pdf_timeout_seconds,
+        max_rss_mb=settings.pdf_max_rss_mb,
+        max_tasks_per_child=settings.pdf_worker_max_tasks,
+    )
+
+
+@lru_cache
+def get_pdf_cache() -> Optional[InMemoryResultCache]:
+    if not settings.pdf_cache_enabled:
+        return None
+    return InMemoryResultCache(
+        max_entries=settings.pdf_cache_max_entries,
+        max_bytes=settings.pdf_cache_max_bytes,
+        ttl_seconds=settings.pdf_cache_ttl_seconds,
+    )
+
 
 @lru_cache
 def get_email_reader() -> EmailReader:
-    return EmailReader()
+    return EmailReader(
+        max_pdf_chars=settings.pdf_max_chars or None,
+        sandbox=get_pdf_sandbox(),
+        parallel_min_pages=settings.pdf_parallel_min_pages,
+        pages_per_task=settings.pdf_pages_per_task,
+        extraction_cache=get_pdf_cache(),
+    )
 
 
 @lru_cache
 def get_nlp_preprocess() -> NlpPreprocess:
-    return NlpPreprocess()
+    return NlpPreprocess(
+        budget=NlpBudget(
+            max_chars=settings.nlp_budget_max_chars,
+            max_cpu_ms=settings.nlp_budget_max_cpu_ms,
+            lang_sample_chars=settings.nlp_lang_sample_chars,
+        ),
+        pool_workers=settings.nlp_pool_workers,
+        pool_min_batch=settings.nlp_pool_min_batch,
+        pool_chunk_size=settings.nlp_pool_chunk_size or None,
+    )
 
 
 @lru_cache
 def get_prompt_policy() -> PromptPolicy:
-    return PromptPolicy()
+    return PromptPolicy(max_input_tokens=settings.prompt_max_input_tokens)
 
 
 def _ensure_openai_config() -> None:
@@ -49,11 +101,127 @@ def get_ai_provider() -> OpenAiEmailProvider:
         api_key=settings.openai_api_key,
         model=settings.openai_model,
         policy=get_prompt_policy(),
+        classify_model=settings.openai_classify_model.strip() or None,
     )
 
 
+@lru_cache
+def get_result_cache() -> Optional[ResultCache]:
+    if not settings.analysis_cache_enabled:
+        return None
+    memory = InMemoryResultCache(
+        max_entries=settings.analysis_cache_max_entries,
+        max_bytes=settings.analysis_cache_max_bytes,
+        ttl_seconds=settings.analysis_cache_ttl_seconds,
+    )
+    # "sqlite": todos os workers do host enxergam o mesmo cache (e ele sobrevive à reciclagem)
+    if settings.analysis_cache_store.strip().lower() == "sqlite":
+        shared = SqliteResultCache(
+            settings.analysis_cache_sqlite_path,
+            max_entries=settings.analysis_cache_sqlite_max_entries,
+            ttl_seconds=settings.analysis_cache_ttl_seconds,
+        )
+        return TieredResultCache(memory, shared)
+    return memory
+
+
+@lru_cache
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    if not settings.near_duplicate_enabled:
+        return None
+    return NearDuplicateIndex(
+        threshold=settings.near_duplicate_threshold,
+        max_entries=settings.near_duplicate_max_entries,
+        ttl_seconds=settings.analysis_cache_ttl_seconds,
+    )
+
+
+@lru_cache
+def get_single_flight() -> Optional[SingleFlight]:
+    # compartilhado por todos os services do worker (threadpool e event loop)
+    return SingleFlight() if settings.single_flight_enabled else None
+
+
+@lru_cache
+def get_email_cleaner() -> Optional[EmailCleaner]:
+    return EmailCleaner() if settings.email_cleaner_enabled else None
+
+
+@lru_cache
+def get_fallback_provider() -> HeuristicFallbackProvider:
+    # regras compiladas (Aho-Corasick) uma vez por worker; arquivo inválido derruba o startup
+    return HeuristicFallbackProvider.from_file(settings.fallback_rules_path.strip() or None)
+
+
+@lru_cache
+def get_local_classifier() -> Optional[LocalClassifier]:
+    path = settings.local_classifier_path.strip()
+    if not path:
+        return None
+    try:
+        return LocalClassifier.load(
+            path,
+            cleaned=settings.email_cleaner_enabled,
+            threshold=settings.local_classifier_threshold,
+            categories=[c.strip() for c in settings.local_classifier_categories.split(",") if c.strip()],
+        )
+    except (OSError, ValueError):
+        # artefato ausente/incompatível: segue só com a IA (o classificador local é otimização)
+        logger.exception("local_classifier_load_failed", extra={"event": "local_classifier_load_failed"})
+        return None
+
+
 def get_email_service() -> EmailClassifierService:
     return EmailClassifierService(
         ai=get_ai_provider(),
         nlp=get_nlp_preprocess(),
+        cache=get_result_cache(),
+        # trocar modelo ou prompt muda o namespace -> entradas antigas deixam de casar
+        cache_namespace=(
+            f"{settings.openai_model}+{settings.openai_classify_model.strip() or settings.openai_model}"
+            f":{get_prompt_policy().version}"
+        ),
+        near_duplicates=get_near_duplicate_index(),
+        reuse_near_duplicate_reply=settings.near_duplicate_reuse_reply,
+        single_flight=get_single_flight(),
+        local_classifier=get_local_classifier(),
+        fallback=get_fallback_provider(),
+        reply_templates=settings.reply_templates_enabled,
+        cleaner=get_email_cleaner(),
+        long_document_min_chars=settings.long_document_min_chars,
+        long_document_chunk_chars=settings.long_document_chunk_chars,
+        long_document_max_chunks=settings.long_document_max_chunks,
+        packed_max_items=settings.packed_classify_max_items,
+        packed_max_chars=settings.packed_classify_max_chars,
+    )
+
+
+def get_email_batch_service(
+    service: EmailClassifierService = Depends(get_email_service),
+) -> EmailBatchService:
+    return EmailBatchService(
+        service=service,
+        max_concurrency=settings.email_batch_concurrency,
+    )
+
+
+@lru_cache
+def get_job_store() -> JobStore:
+    # "sqlite": estado visível por todos os workers do gunicorn no mesmo host
+    if settings.job_store.strip().lower() == "sqlite":
+        return SqliteJobStore(settings.job_store_sqlite_path)
+    return InMemoryJobStore()
+
+
+@lru_cache
+def get_job_queue() -> JobQueueService:
+    return JobQueueService(
+        store=get_job_store(),
+        # resolvido por job: falta de OPENAI_* vira erro do job, não do startup
+        service_factory=get_email_service,
+        reader=get_email_reader(),
+        workers=settings.job_workers,
+        depth=settings.job_queue_depth,
+        timeout_seconds=settings.job_timeout_seconds,
+        result_ttl_seconds=settings.job_result_ttl_seconds,
     )
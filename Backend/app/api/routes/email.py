@@ -2,73 +2,56 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import os
-import tempfile
+import re
 import time
-from pathlib import Path
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request, Response
+from pydantic import ValidationError
 from starlette import status
-
-from app.api.deps import get_email_service, get_email_reader
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from app.api.deps import get_email_service, get_email_reader, get_email_batch_service
+from app.api.uploads import is_allowed_filename, receive_upload, record_upload_to_text
+from app.core.config import settings
+from app.core.ndjson import NDJSON_MEDIA_TYPE, NdjsonStreamingResponse, iter_ndjson
+from app.core.rate_limit import limiter, charge_emails
 from app.core.response_factory import ok
-from app.domain.models.api_response import ApiResponse
-from app.domain.models.email_analysis import EmailAnalyzeRequest, EmailAnalyzeResponse
-from app.providers.email_reader import EmailReader
+from app.core.sse import SSE_HEADERS, SSE_MEDIA_TYPE, sse_event
+from app.domain.models.api_response import ApiError, ApiResponse
+from app.domain.models.email_analysis import (
+    AnalysisMeta,
+    EmailAnalyzeRequest,
+    EmailAnalyzeResponse,
+    EmailBatchItem,
+    EmailBatchItemResult,
+    EmailBatchRequest,
+    EmailBatchResponse,
+    EmailReplyClassification,
+    EmailReplyDelta,
+    EmailStreamItem,
+)
+from app.providers.email_reader import EmailReader, MboxSplitter
+from app.providers.pdf_sandbox import PdfSandboxError
+from app.services.email_batch_service import EmailBatchService, StreamInput
 from app.services.email_classifier_service import EmailClassifierService
 
+_REPLY_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
 router = APIRouter(prefix="/emails", tags=["Emails"])
 
 logger = logging.getLogger(__name__)
 
-# Limites e parâmetros (pode controlar por ENV sem rebuild)
-MAX_UPLOAD_BYTES = int(os.getenv("EMAIL_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))  # 10MB
-UPLOAD_CHUNK_SIZE = int(os.getenv("EMAIL_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # 1MB
-
-
-def _is_allowed_filename(filename: str) -> bool:
-    f = (filename or "").strip().lower()
-    return f.endswith(".txt") or f.endswith(".pdf")
-
-
-async def _save_upload_to_tempfile(upload: UploadFile) -> tuple[str, int]:
-    """
-    Salva UploadFile em arquivo temporário usando streaming.
-    Retorna (tmp_path, size_bytes).
-
-    Evita carregar arquivo inteiro em memória (RAM), reduz chance de OOM.
-    """
-    suffix = ""
-    if upload.filename:
-        name = upload.filename.strip().lower()
-        if name.endswith(".pdf"):
-            suffix = ".pdf"
-        elif name.endswith(".txt"):
-            suffix = ".txt"
+CACHE_HEADER = "X-Cache"
+MBOX_MEDIA_TYPE = "application/mbox"
+EML_MEDIA_TYPE = "message/rfc822"
 
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    size = 0
 
-    try:
-        while True:
-            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
-            if not chunk:
-                break
-
-            size += len(chunk)
-            if size > MAX_UPLOAD_BYTES:
-                raise HTTPException(
-                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    detail=f"Arquivo muito grande. Limite: {MAX_UPLOAD_BYTES // (1024 * 1024)}MB",
-                )
-
-            tmp.write(chunk)
-
-        tmp.flush()
-        return tmp.name, size
-
-    finally:
-        tmp.close()
+def _set_cache_header(response: Response, result: EmailAnalyzeResponse) -> None:
+    # HIT/MISS só quando o cache está habilitado (sem meta.cache, sem header)
+    if result.meta is not None and result.meta.cache is not None:
+        response.headers[CACHE_HEADER] = result.meta.cache.upper()
 
 
 @router.post(
@@ -80,24 +63,422 @@ async def _save_upload_to_tempfile(upload: UploadFile) -> tuple[str, int]:
         "- `category`: Produtivo | Improdutivo\n"
         "- `suggested_reply`: resposta sugerida em pt-BR no formato de email\n"
         "- `confidence`: 0..1\n\n"
-        "O texto passa por pré-processamento NLP (stopwords + lematização) antes de consultar a IA."
+        "O texto passa por pré-processamento NLP (stopwords + lematização) antes de consultar a IA.\n\n"
+        "Resultados repetidos (mesmo texto, modelo e prompt) saem do cache: header `X-Cache: HIT|MISS` "
+        "e `meta.cache` no corpo."
     ),
 )
-def analyze_email(
+async def analyze_email(
     payload: EmailAnalyzeRequest,
+    response: Response,
     service: EmailClassifierService = Depends(get_email_service),
 ) -> ApiResponse[EmailAnalyzeResponse]:
-    # OBS: endpoint sync já roda em threadpool do FastAPI, então não bloqueia o event loop.
-    result = service.analyze(payload.text)
+    # OBS: NLP roda em thread e a chamada à IA é aguardada no event loop (AsyncOpenAI),
+    # então requisições em voo não ocupam threads do pool.
+    result = await service.analyze_async(payload.text)
+    _set_cache_header(response, result)
     return ok(result, message="Email analisado com sucesso.")
 
 
+@router.post(
+    "/classify",
+    response_model=ApiResponse[EmailAnalyzeResponse],
+    summary="Classificar email (sem gerar resposta)",
+    description=(
+        "Só `category` + `confidence`, num modelo menor (`OPENAI_CLASSIFY_MODEL`) e com saída mínima — "
+        "bem mais rápido e barato que o `/emails/analyze` (ex.: ordenar uma caixa de entrada).\n\n"
+        "- `suggested_reply` vem `null` e `reply.href` aponta para `GET /emails/replies/{id}`, "
+        "que gera a resposta sob demanda\n"
+        "- Emails `Improdutivo` recebem resposta de template local na hora (`REPLY_TEMPLATES_ENABLED`)\n"
+        "- Resultado completo já em cache (ou de quase-duplicado) sai com a resposta\n"
+        "- O pendente fica no cache de análises: sem cache habilitado, `reply` vem `null`"
+    ),
+)
+async def classify_email(
+    payload: EmailAnalyzeRequest,
+    response: Response,
+    service: EmailClassifierService = Depends(get_email_service),
+) -> ApiResponse[EmailAnalyzeResponse]:
+    result = await service.classify_async(payload.text)
+    _set_cache_header(response, result)
+    return ok(result, message="Email classificado com sucesso.")
+
+
+@router.get(
+    "/replies/{reply_id}",
+    response_model=ApiResponse[EmailAnalyzeResponse],
+    summary="Gerar/obter a resposta adiada de um /emails/classify",
+    description=(
+        "Gera a resposta sugerida de um email classificado em `/emails/classify` (categoria já decidida) "
+        "e devolve o resultado completo. Chamadas seguintes (e o `/emails/analyze` do mesmo texto) saem do cache.\n\n"
+        "`404` se o id não existe ou expirou (`ANALYSIS_CACHE_TTL_SECONDS`)."
+    ),
+)
+async def get_email_reply(
+    reply_id: str,
+    response: Response,
+    service: EmailClassifierService = Depends(get_email_service),
+) -> ApiResponse[EmailAnalyzeResponse]:
+    result = await service.reply_async(reply_id) if _REPLY_ID_RE.match(reply_id) else None
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resposta não encontrada ou expirada. Classifique o email novamente.",
+        )
+    _set_cache_header(response, result)
+    return ok(result, message="Resposta gerada com sucesso.")
+
+
+@router.post(
+    "/analyze-batch",
+    response_model=ApiResponse[EmailBatchResponse],
+    summary="Analisar vários emails em lote",
+    description=(
+        "Recebe uma lista de emails (`items[]`, cada um com `id` opcional e `text`) e analisa todos "
+        "com concorrência limitada (`EMAIL_BATCH_CONCURRENCY`).\n\n"
+        "- Retorna um resultado por item, na mesma ordem da requisição\n"
+        "- Falha de um item vira `errors` do item, sem falhar o lote\n"
+        "- Rate limit cobrado **por email** (`RATE_LIMIT_EMAILS`), não por requisição\n"
+        f"- Máximo de `EMAIL_BATCH_MAX_ITEMS` itens por requisição (atual: {settings.email_batch_max_items})"
+    ),
+)
+@limiter.exempt
+async def analyze_email_batch(
+    request: Request,
+    payload: EmailBatchRequest,
+    batch: EmailBatchService = Depends(get_email_batch_service),
+) -> ApiResponse[EmailBatchResponse]:
+    total = len(payload.items)
+    if total > settings.email_batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lote muito grande. Limite: {settings.email_batch_max_items} emails por requisição.",
+        )
+
+    # isento do limite global: cobra 1 hit por email do lote
+    charge_emails(request, total)
+
+    result = await batch.analyze_many(payload.items)
+    return ok(result, message=f"Lote analisado: {result.succeeded}/{result.total} emails com sucesso.")
+
+
+@router.post(
+    "/classify-batch",
+    response_model=ApiResponse[EmailBatchResponse],
+    summary="Classificar vários emails em lote (sem gerar respostas)",
+    description=(
+        "Lote do `/emails/classify`: `category` + `confidence` por item, com a resposta adiada em "
+        "`reply.href` (ou template local para `Improdutivo`).\n\n"
+        "- Emails curtos (até `PACKED_CLASSIFY_MAX_CHARS`) vão juntos para a IA, até "
+        "`PACKED_CLASSIFY_MAX_ITEMS` por chamada (`meta.packed = true`); item que o modelo não devolve "
+        "é reclassificado sozinho\n"
+        "- Retorna um resultado por item, na mesma ordem da requisição\n"
+        "- Rate limit cobrado **por email** (`RATE_LIMIT_EMAILS`)\n"
+        f"- Máximo de `EMAIL_BATCH_MAX_ITEMS` itens por requisição (atual: {settings.email_batch_max_items})"
+    ),
+)
+@limiter.exempt
+async def classify_email_batch(
+    request: Request,
+    payload: EmailBatchRequest,
+    batch: EmailBatchService = Depends(get_email_batch_service),
+) -> ApiResponse[EmailBatchResponse]:
+    total = len(payload.items)
+    if total > settings.email_batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lote muito grande. Limite: {settings.email_batch_max_items} emails por requisição.",
+        )
+
+    charge_emails(request, total)
+
+    result = await batch.classify_many(payload.items)
+    return ok(result, message=f"Lote classificado: {result.succeeded}/{result.total} emails com sucesso.")
+
+
+@router.post(
+    "/analyze-sse",
+    response_model=None,
+    response_class=StreamingResponse,
+    summary="Analisar email com resposta em streaming (SSE)",
+    description=(
+        "Mesma análise do `/emails/analyze`, mas em **Server-Sent Events** (`text/event-stream`):\n\n"
+        "- `classification`: `{ category, confidence }` assim que o modelo decide (antes da resposta)\n"
+        "- `delta`: `{ text }` com o próximo trecho de `suggested_reply` (já sanitizado)\n"
+        "- `done`: envelope padrão `{ success, message, data, errors }` com o resultado final sanitizado "
+        "— é a versão canônica da resposta (substitui o texto acumulado dos deltas). Se a IA falhar no meio, "
+        "a categoria já enviada é mantida e o `done` sai com `meta.tier = \"fallback\"` "
+        "(`meta.replaced = true` se algum `delta` já tinha saído: descarte o texto acumulado)"
+    ),
+    responses={200: {"content": {SSE_MEDIA_TYPE: {"schema": {"type": "string"}}}}},
+)
+async def analyze_email_sse(
+    payload: EmailAnalyzeRequest,
+    service: EmailClassifierService = Depends(get_email_service),
+) -> StreamingResponse:
+    async def events() -> AsyncIterator[bytes]:
+        started = time.perf_counter()
+        first = True
+
+        async for event in service.analyze_stream_async(payload.text):
+            if first:
+                first = False
+                logger.info(
+                    "analyze_sse_first_event",
+                    extra={
+                        "event": "analyze_sse_first_event",
+                        "ttfb_ms": int((time.perf_counter() - started) * 1000),
+                    },
+                )
+
+            if event.kind == "classification":
+                yield sse_event(
+                    "classification",
+                    EmailReplyClassification(category=event.category, confidence=event.confidence),
+                )
+            elif event.kind == "delta":
+                yield sse_event("delta", EmailReplyDelta(text=event.text))
+            else:
+                result = EmailAnalyzeResponse(
+                    category=event.category,
+                    suggested_reply=event.text,
+                    confidence=event.confidence,
+                    meta=AnalysisMeta(tier="fallback", replaced=event.replaced or None) if event.fallback else None,
+                )
+                yield sse_event("done", ok(result, message="Email analisado com sucesso."))
+
+        logger.info(
+            "analyze_sse_done",
+            extra={
+                "event": "analyze_sse_done",
+                "duration_ms": int((time.perf_counter() - started) * 1000),
+            },
+        )
+
+    return StreamingResponse(events(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+def _stream_line(result: EmailBatchItemResult) -> bytes:
+    """Uma linha NDJSON no envelope padrão `{ success, message, data, errors }`."""
+    item = EmailStreamItem(index=result.index, id=result.id, result=result.data)
+    if result.success:
+        envelope = ok(item, message="Email analisado com sucesso.")
+    else:
+        envelope = ApiResponse[EmailStreamItem](
+            message="Falha ao analisar o email.",
+            success=False,
+            data=item,
+            errors=result.errors or [],
+        )
+    return envelope.model_dump_json().encode("utf-8") + b"\n"
+
+
+async def _cancel_on_disconnect(request: Request, body_done: asyncio.Event, task: asyncio.Task) -> None:
+    # só escuta `receive` depois que o corpo foi consumido (antes disso, quem lê é o request.stream())
+    await body_done.wait()
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            task.cancel()
+            return
+
+
+def _ndjson_results(
+    request: Request,
+    body_done: asyncio.Event,
+    results: AsyncIterator[EmailBatchItemResult],
+    *,
+    event: str,
+) -> NdjsonStreamingResponse:
+    """Resposta NDJSON (uma linha por resultado), cancelando o trabalho pendente se o cliente desconectar."""
+
+    async def lines() -> AsyncIterator[bytes]:
+        current = asyncio.current_task()
+        watcher = asyncio.create_task(_cancel_on_disconnect(request, body_done, current)) if current else None
+        started = time.perf_counter()
+        count = 0
+
+        try:
+            async for result in results:
+                count += 1
+                yield _stream_line(result)
+        except (asyncio.CancelledError, ClientDisconnect):
+            logger.info(
+                f"{event}_client_disconnected",
+                extra={
+                    "event": f"{event}_client_disconnected",
+                    "duration_ms": int((time.perf_counter() - started) * 1000),
+                },
+            )
+            raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+        logger.info(
+            f"{event}_done",
+            extra={
+                "event": f"{event}_done",
+                "items": count,
+                "duration_ms": int((time.perf_counter() - started) * 1000),
+            },
+        )
+
+    return NdjsonStreamingResponse(lines())
+
+
+@router.post(
+    "/analyze-stream",
+    response_model=None,
+    response_class=NdjsonStreamingResponse,
+    summary="Analisar emails em streaming (NDJSON)",
+    description=(
+        "Recebe emails como **NDJSON** (`application/x-ndjson`, um `{ \"id\", \"text\" }` por linha) "
+        "e devolve NDJSON: uma linha por email **assim que ele termina** (ordem de conclusão).\n\n"
+        "- Cada linha usa o envelope padrão `{ success, message, data, errors }`, com "
+        "`data = { index, id, result }`\n"
+        "- A entrada é lida em streaming (o corpo nunca é carregado inteiro em memória)\n"
+        "- Rate limit cobrado por email (`RATE_LIMIT_EMAILS`); ao estourar, emite uma linha `RATE_LIMIT` e encerra\n"
+        "- Se o cliente desconectar, as análises pendentes são canceladas"
+    ),
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}}},
+        }
+    },
+)
+@limiter.exempt
+async def analyze_email_stream(
+    request: Request,
+    batch: EmailBatchService = Depends(get_email_batch_service),
+) -> NdjsonStreamingResponse:
+    body_done = asyncio.Event()
+
+    async def items() -> AsyncIterator[StreamInput]:
+        try:
+            async for index, value in iter_ndjson(
+                request.stream(),
+                max_line_bytes=settings.email_stream_max_line_bytes,
+            ):
+                if isinstance(value, ApiError):
+                    yield index, value
+                    continue
+
+                try:
+                    charge_emails(request, 1)
+                except HTTPException:
+                    yield index, ApiError(code="RATE_LIMIT", message=f"Limite de {settings.rate_limit_emails} emails excedido.")
+                    return
+
+                try:
+                    yield index, EmailBatchItem.model_validate(value)
+                except ValidationError as exc:
+                    first = exc.errors()[0] if exc.errors() else {}
+                    field = ".".join(str(x) for x in first.get("loc", ())) or None
+                    yield index, ApiError(code="VALIDATION_ERROR", message=str(first.get("msg", "Item inválido")), field=field)
+        finally:
+            body_done.set()
+
+    return _ndjson_results(request, body_done, batch.stream(items()), event="analyze_stream")
+
+
+@router.post(
+    "/analyze-mailbox",
+    response_model=None,
+    response_class=NdjsonStreamingResponse,
+    summary="Analisar uma caixa de email exportada (.mbox / .eml) em streaming (NDJSON)",
+    description=(
+        "Recebe o arquivo **no corpo da requisição** (sem multipart):\n\n"
+        "- `Content-Type: application/mbox`: mbox com várias mensagens, lido mensagem a mensagem "
+        "(o arquivo nunca é carregado inteiro em memória)\n"
+        "- `Content-Type: message/rfc822`: uma única mensagem `.eml`\n\n"
+        "Cada mensagem é lida como MIME (parte `text/plain`; sem ela, o `text/html` convertido em texto, "
+        "com o assunto no início) e entra no pipeline de lote. A resposta é NDJSON como a do "
+        "`/emails/analyze-stream`, com `data.id` = `Message-ID` da mensagem e `data.index` = posição no arquivo.\n\n"
+        "- Mensagens acima de `MAILBOX_MAX_MESSAGE_BYTES` viram erro do item (`MESSAGE_TOO_LARGE`)\n"
+        "- Rate limit cobrado por mensagem (`RATE_LIMIT_EMAILS`)"
+    ),
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                MBOX_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+                EML_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+@limiter.exempt
+async def analyze_email_mailbox(
+    request: Request,
+    reader: EmailReader = Depends(get_email_reader),
+    batch: EmailBatchService = Depends(get_email_batch_service),
+) -> NdjsonStreamingResponse:
+    single = request.headers.get("content-type", "").split(";")[0].strip().lower() == EML_MEDIA_TYPE
+    body_done = asyncio.Event()
+
+    async def items() -> AsyncIterator[StreamInput]:
+        index = 0
+        try:
+            async for raw in _iter_messages(request.stream(), single, settings.mailbox_max_message_bytes):
+                try:
+                    charge_emails(request, 1)
+                except HTTPException:
+                    yield index, ApiError(code="RATE_LIMIT", message=f"Limite de {settings.rate_limit_emails} emails excedido.")
+                    return
+
+                if raw is None:
+                    yield index, ApiError(
+                        code="MESSAGE_TOO_LARGE",
+                        message=f"Mensagem maior que {settings.mailbox_max_message_bytes} bytes.",
+                    )
+                else:
+                    try:
+                        # parsing MIME é CPU: fora do event loop
+                        content = await asyncio.to_thread(reader.from_eml_bytes, raw)
+                    except Exception:
+                        logger.warning("mailbox_message_invalid", extra={"event": "mailbox_message_invalid"})
+                        yield index, ApiError(code="INVALID_MESSAGE", message="Mensagem MIME inválida.")
+                    else:
+                        message_id = (content.message_id or "")[:200] or None
+                        yield index, EmailBatchItem(id=message_id, text=content.text)
+                index += 1
+        finally:
+            body_done.set()
+
+    return _ndjson_results(request, body_done, batch.stream(items()), event="analyze_mailbox")
+
+
+async def _iter_messages(
+    chunks: AsyncIterator[bytes], single: bool, max_message_bytes: int
+) -> AsyncIterator[Optional[bytes]]:
+    """Mensagens brutas do corpo (None = acima do limite): mbox dividido em streaming ou um único .eml."""
+    if single:
+        parts: List[bytes] = []
+        size = 0
+        async for chunk in chunks:
+            size += len(chunk)
+            if size <= max_message_bytes:
+                parts.append(chunk)
+        if size:
+            yield b"".join(parts) if size <= max_message_bytes else None
+        return
+
+    splitter = MboxSplitter(max_message_bytes)
+    async for chunk in chunks:
+        for raw in splitter.feed(chunk):
+            yield raw
+    for raw in splitter.close():
+        yield raw
+
+
 @router.post(
     "/analyze-file",
     response_model=ApiResponse[EmailAnalyzeResponse],
-    summary="Analisar email por arquivo (.txt ou .pdf)",
+    summary="Analisar email por arquivo (.txt, .pdf ou .eml)",
     description=(
-        "Recebe um arquivo `.txt` ou `.pdf` via **multipart/form-data** (campo `file`).\n\n"
+        "Recebe um arquivo `.txt`, `.pdf` ou `.eml` via **multipart/form-data** (campo `file`).\n\n"
         "Fluxo:\n"
         "1) Extrai texto do arquivo\n"
         "2) Aplica NLP (stopwords + lematização)\n"
@@ -121,6 +502,7 @@ def analyze_email(
     },
 )
 async def analyze_email_file(
+    response: Response,
     file: UploadFile = File(...),
     reader: EmailReader = Depends(get_email_reader),
     service: EmailClassifierService = Depends(get_email_service),
@@ -130,30 +512,41 @@ async def analyze_email_file(
     filename_raw = file.filename or ""
     filename = filename_raw.strip().lower()
 
-    if not _is_allowed_filename(filename):
+    if not is_allowed_filename(filename):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Envie um arquivo .txt ou .pdf",
+            detail="Envie um arquivo .txt, .pdf ou .eml",
         )
 
-    # 1) Salva arquivo temporário SEM carregar tudo em RAM
-    tmp_path, size_bytes = await _save_upload_to_tempfile(file)
+    # 1) Recebe o upload em streaming: pequenos ficam em memória, grandes vão para arquivo temporário
+    upload = await receive_upload(file)
+    size_bytes = upload.size
 
     try:
-        # 2) Extrai texto (PDF/TXT) usando processamento por PATH (menos memória)
+        # 2) Extrai texto (PDF/TXT) do buffer ou por PATH (arquivos grandes, menos memória)
         #    e joga em thread para não travar o event loop do UvicornWorker.
-        if filename.endswith(".pdf"):
-            content = await asyncio.to_thread(
-                reader.from_pdf_path,
-                tmp_path,
-                filename=filename_raw,
-            )
-        else:
-            content = await asyncio.to_thread(
-                reader.from_txt_path,
-                tmp_path,
-                filename=filename_raw,
-            )
+        #    PDFs rodam no sandbox (prazo/memória por documento): falha vira 422, o worker segue atendendo.
+        try:
+            if upload.path is not None:
+                content = await asyncio.to_thread(
+                    reader.from_path,
+                    upload.path,
+                    filename=filename_raw,
+                    content_hash=upload.content_hash,
+                )
+            else:
+                content = await asyncio.to_thread(
+                    reader.from_bytes,
+                    upload.data or b"",
+                    filename=filename_raw,
+                    content_hash=upload.content_hash,
+                )
+        except PdfSandboxError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=exc.message,
+            ) from exc
+        record_upload_to_text(upload, (time.perf_counter() - started) * 1000)
 
         if not content.text.strip():
             raise HTTPException(
@@ -161,8 +554,9 @@ async def analyze_email_file(
                 detail="Não foi possível extrair texto do arquivo.",
             )
 
-        # 3) Classificação + IA: também em thread (CPU bound + IO bound dependendo do provider)
-        result = await asyncio.to_thread(service.analyze, content.text)
+        # 3) Classificação + IA: NLP em thread, chamada à IA no event loop
+        result = await service.analyze_async(content.text)
+        _set_cache_header(response, result)
 
         duration_ms = int((time.perf_counter() - started) * 1000)
         logger.info(
@@ -208,14 +602,14 @@ async def analyze_email_file(
         )
 
     finally:
-        # garante cleanup do arquivo temporário
+        # garante cleanup do arquivo temporário (se o upload foi para disco)
         try:
-            Path(tmp_path).unlink(missing_ok=True)
+            upload.cleanup()
         except Exception:
             logger.warning(
                 "failed_to_delete_tempfile",
                 extra={
                     "event": "failed_to_delete_tempfile",
-                    "tmp_path": tmp_path,
+                    "tmp_path": upload.path,
                 },
             )
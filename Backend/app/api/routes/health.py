@@ -1,8 +1,43 @@
+from typing import Any
+
 from fastapi import APIRouter
 
+from app.api.deps import (
+    get_email_cleaner,
+    get_local_classifier,
+    get_near_duplicate_index,
+    get_pdf_cache,
+    get_pdf_sandbox,
+    get_result_cache,
+    get_single_flight,
+)
+from app.api.uploads import upload_stats
+
 router = APIRouter(tags=["Health"])
 
 
 @router.get("/health")
 def health() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@router.get("/health/cache", summary="Contadores do cache de análises (deste worker)")
+def health_cache() -> dict[str, Any]:
+    cache = get_result_cache()
+    near_duplicates = get_near_duplicate_index()
+    single_flight = get_single_flight()
+    local_classifier = get_local_classifier()
+    stats: dict[str, Any] = {"enabled": False} if cache is None else {"enabled": True, **cache.stats()}
+    stats["near_duplicates"] = {"enabled": False} if near_duplicates is None else {"enabled": True, **near_duplicates.stats()}
+    stats["single_flight"] = {"enabled": False} if single_flight is None else {"enabled": True, **single_flight.stats()}
+    stats["local_classifier"] = (
+        {"enabled": False} if local_classifier is None else {"enabled": True, **local_classifier.stats()}
+    )
+    pdf_sandbox = get_pdf_sandbox()
+    stats["pdf_sandbox"] = {"enabled": False} if pdf_sandbox is None else {"enabled": True, **pdf_sandbox.stats()}
+    pdf_cache = get_pdf_cache()
+    stats["pdf_cache"] = {"enabled": False} if pdf_cache is None else {"enabled": True, **pdf_cache.stats()}
+    stats["uploads"] = upload_stats()
+    cleaner = get_email_cleaner()
+    stats["cleaner"] = {"enabled": False} if cleaner is None else {"enabled": True, **cleaner.stats()}
+    return stats
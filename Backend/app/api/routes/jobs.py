@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from starlette import status
+
+from app.api.deps import get_job_queue
+from app.api.uploads import is_allowed_filename, receive_upload
+from app.core.rate_limit import limiter
+from app.core.response_factory import ok
+from app.domain.models.api_response import ApiResponse
+from app.domain.models.email_analysis import EmailAnalyzeRequest
+from app.domain.models.job import JobResponse
+from app.providers.job_store import JobRecord
+from app.services.job_queue_service import JobInput, JobQueueFull, JobQueueService
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def _job_response(record: JobRecord) -> JobResponse:
+    return JobResponse(
+        id=record.id,
+        status=record.status,
+        kind=record.kind,
+        filename=record.filename,
+        created_at=_ts(record.created_at),
+        started_at=_ts(record.started_at),
+        finished_at=_ts(record.finished_at),
+        cancel_requested=record.cancel_requested,
+        result=record.result,
+        error=record.error,
+    )
+
+
+def _ts(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+
+def _queue_full(exc: JobQueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail={
+            "message": "Fila de análises cheia. Tente novamente em instantes.",
+            "errors": [{"code": "JOB_QUEUE_FULL", "message": "Job queue is full."}],
+        },
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _not_found() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job não encontrado (ou expirado).")
+
+
+@router.post(
+    "/emails",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=ApiResponse[JobResponse],
+    summary="Enfileirar análise de email por texto",
+    description=(
+        "Cria um job de análise e retorna imediatamente (`202`) com o `id` do job.\n\n"
+        "Consulte `GET /jobs/{id}` até `status` ser `succeeded`, `failed` ou `cancelled`.\n"
+        "Fila cheia: `503` com header `Retry-After`."
+    ),
+)
+async def submit_email_job(
+    payload: EmailAnalyzeRequest,
+    queue: JobQueueService = Depends(get_job_queue),
+) -> ApiResponse[JobResponse]:
+    try:
+        record = await queue.submit(JobInput(text=payload.text), kind="text")
+    except JobQueueFull as exc:
+        raise _queue_full(exc)
+    return ok(_job_response(record), message="Job enfileirado.")
+
+
+@router.post(
+    "/emails/file",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=ApiResponse[JobResponse],
+    summary="Enfileirar análise de email por arquivo (.txt, .pdf ou .eml)",
+    description=(
+        "Recebe `.txt`/`.pdf`/`.eml` via **multipart/form-data** (campo `file`) e enfileira a extração + análise.\n\n"
+        "Indicado para PDFs grandes, que podem passar do timeout do load balancer no `/emails/analyze-file`."
+    ),
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "file": {"type": "string", "format": "binary"}
+                        },
+                        "required": ["file"],
+                    }
+                }
+            }
+        }
+    },
+)
+async def submit_email_file_job(
+    file: UploadFile = File(...),
+    queue: JobQueueService = Depends(get_job_queue),
+) -> ApiResponse[JobResponse]:
+    filename_raw = file.filename or ""
+    if not is_allowed_filename(filename_raw):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Envie um arquivo .txt, .pdf ou .eml",
+        )
+
+    # falha rápido antes de receber o upload inteiro
+    try:
+        queue.ensure_capacity()
+    except JobQueueFull as exc:
+        raise _queue_full(exc)
+
+    upload = await receive_upload(file)
+
+    try:
+        record = await queue.submit(
+            JobInput(path=upload.path, data=upload.data, filename=filename_raw, content_hash=upload.content_hash),
+            kind="file",
+        )
+    except JobQueueFull as exc:
+        upload.cleanup()
+        raise _queue_full(exc)
+    except BaseException:
+        upload.cleanup()
+        raise
+
+    return ok(_job_response(record), message="Job enfileirado.")
+
+
+@router.get(
+    "/{job_id}",
+    response_model=ApiResponse[JobResponse],
+    summary="Consultar status/resultado de um job",
+)
+@limiter.exempt
+async def get_job(
+    job_id: str,
+    queue: JobQueueService = Depends(get_job_queue),
+) -> ApiResponse[JobResponse]:
+    # polling isento do rate limit global (senão 15/min acaba em poucos segundos de polling)
+    record = await queue.get(job_id)
+    if record is None:
+        raise _not_found()
+    return ok(_job_response(record), message=f"Job {record.status}.")
+
+
+@router.delete(
+    "/{job_id}",
+    response_model=ApiResponse[JobResponse],
+    summary="Cancelar um job",
+    description=(
+        "Job na fila é cancelado na hora. Job em execução recebe `cancel_requested=true` "
+        "e é interrompido pelo worker que o executa."
+    ),
+)
+async def cancel_job(
+    job_id: str,
+    queue: JobQueueService = Depends(get_job_queue),
+) -> ApiResponse[JobResponse]:
+    record = await queue.cancel(job_id)
+    if record is None:
+        raise _not_found()
+    return ok(_job_response(record), message="Cancelamento solicitado.")
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette import status
+
+# Limites e parâmetros (pode controlar por ENV sem rebuild)
+MAX_UPLOAD_BYTES = int(os.getenv("EMAIL_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))  # 10MB
+UPLOAD_CHUNK_SIZE = int(os.getenv("EMAIL_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # 1MB
+# uploads até este tamanho ficam em memória; acima, vão para arquivo temporário (0 = sempre em disco)
+UPLOAD_SPOOL_MAX_BYTES = int(os.getenv("EMAIL_UPLOAD_SPOOL_MAX_BYTES", str(1024 * 1024)))  # 1MB
+
+
+def is_allowed_filename(filename: str) -> bool:
+    f = (filename or "").strip().lower()
+    return f.endswith(".txt") or f.endswith(".pdf") or f.endswith(".eml")
+
+
+@dataclass(frozen=True)
+class SpooledUpload:
+    """
+    Upload recebido: em memória (`data`) ou, acima de `UPLOAD_SPOOL_MAX_BYTES`, em arquivo
+    temporário (`path`). `content_hash` = sha256 hex do conteúdo (cache de extração de PDF).
+    """
+
+    size: int
+    content_hash: str
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def cleanup(self) -> None:
+        if self.path is not None:
+            Path(self.path).unlink(missing_ok=True)
+
+
+class _UploadStats:
+    """Contadores de upload deste worker (expostos em /health/cache -> uploads)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._uploads = 0
+        self._spilled = 0
+        self._bytes = 0
+        self._to_text_count = 0
+        self._to_text_ms = 0.0
+        self._to_text_ms_spilled = 0.0
+        self._to_text_count_spilled = 0
+
+    def received(self, upload: SpooledUpload) -> None:
+        with self._lock:
+            self._uploads += 1
+            self._bytes += upload.size
+            if upload.spilled:
+                self._spilled += 1
+
+    def to_text(self, upload: SpooledUpload, ms: float) -> None:
+        with self._lock:
+            self._to_text_count += 1
+            self._to_text_ms += ms
+            if upload.spilled:
+                self._to_text_count_spilled += 1
+                self._to_text_ms_spilled += ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            in_memory_count = self._to_text_count - self._to_text_count_spilled
+            in_memory_ms = self._to_text_ms - self._to_text_ms_spilled
+            return {
+                "uploads": self._uploads,
+                "bytes": self._bytes,
+                "in_memory": self._uploads - self._spilled,
+                "tempfiles_created": self._spilled,
+                "spill_rate": round(self._spilled / self._uploads, 4) if self._uploads else 0.0,
+                "spool_max_bytes": UPLOAD_SPOOL_MAX_BYTES,
+                "avg_upload_to_text_ms": {
+                    "in_memory": round(in_memory_ms / in_memory_count, 2) if in_memory_count else None,
+                    "spilled": (
+                        round(self._to_text_ms_spilled / self._to_text_count_spilled, 2)
+                        if self._to_text_count_spilled
+                        else None
+                    ),
+                },
+            }
+
+
+_stats = _UploadStats()
+
+
+def upload_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
+
+
+def record_upload_to_text(upload: SpooledUpload, duration_ms: float) -> None:
+    """Latência do início do upload até o texto extraído (separada por memória/disco)."""
+    _stats.to_text(upload, duration_ms)
+
+
+def _suffix_for(upload: UploadFile) -> str:
+    if upload.filename:
+        name = upload.filename.strip().lower()
+        if name.endswith(".pdf"):
+            return ".pdf"
+        if name.endswith(".txt"):
+            return ".txt"
+        if name.endswith(".eml"):
+            return ".eml"
+    return ""
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Arquivo muito grande. Limite: {MAX_UPLOAD_BYTES // (1024 * 1024)}MB",
+    )
+
+
+async def receive_upload(upload: UploadFile, *, spool_max_bytes: Optional[int] = None) -> SpooledUpload:
+    """
+    Recebe UploadFile em streaming, mantendo em memória enquanto couber em
+    `spool_max_bytes` (default `UPLOAD_SPOOL_MAX_BYTES`): a maioria dos uploads são .txt
+    pequenos e não precisa de syscalls/disco. Passou do limite, o que já chegou e o resto
+    vão para um arquivo temporário (sem carregar arquivo grande inteiro em RAM).
+
+    O sha256 é calculado nos mesmos chunks. Quem chama deve chamar `cleanup()` ao final.
+    """
+    limit = UPLOAD_SPOOL_MAX_BYTES if spool_max_bytes is None else spool_max_bytes
+    chunks: List[bytes] = []
+    tmp = None
+    size = 0
+    digest = hashlib.sha256()
+
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise _too_large()
+            digest.update(chunk)
+
+            if tmp is None and size > limit:
+                tmp = tempfile.NamedTemporaryFile(delete=False, suffix=_suffix_for(upload))
+                for buffered in chunks:
+                    tmp.write(buffered)
+                chunks.clear()
+
+            if tmp is not None:
+                tmp.write(chunk)
+            else:
+                chunks.append(chunk)
+
+        if tmp is not None:
+            tmp.flush()
+            result = SpooledUpload(size=size, content_hash=digest.hexdigest(), path=tmp.name)
+        else:
+            data = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+            result = SpooledUpload(size=size, content_hash=digest.hexdigest(), data=data)
+
+        _stats.received(result)
+        return result
+
+    except BaseException:
+        # upload recusado/interrompido: não deixa arquivo órfão no disco
+        if tmp is not None:
+            tmp.close()
+            Path(tmp.name).unlink(missing_ok=True)
+        raise
+
+    finally:
+        if tmp is not None:
+            tmp.close()
@@ -14,6 +14,101 @@ class Settings(BaseSettings):
 
     openai_api_key: str = Field(default="", alias="OPENAI_API_KEY")
     openai_model: str = Field(default="gpt-5-mini", alias="OPENAI_MODEL")
+    # Modo só-classificação (/emails/classify): modelo menor/mais rápido (vazio = OPENAI_MODEL)
+    openai_classify_model: str = Field(default="gpt-5-nano", alias="OPENAI_CLASSIFY_MODEL")
+    # Orçamento (tokens estimados) da mensagem enviada à IA: emails maiores são compactados
+    # (começo, fim e frases com mais palavras-chave); 0 = envia o texto inteiro
+    prompt_max_input_tokens: int = Field(default=4000, ge=0, alias="PROMPT_MAX_INPUT_TOKENS")
+    # Documento longo (map-reduce): acima de LONG_DOCUMENT_MIN_CHARS (0 = desliga), chunks por parágrafo
+    # classificados em paralelo (até LONG_DOCUMENT_MAX_CHUNKS chamadas) e uma resposta
+    long_document_min_chars: int = Field(default=16_000, ge=0, alias="LONG_DOCUMENT_MIN_CHARS")
+    long_document_chunk_chars: int = Field(default=12_000, ge=1000, alias="LONG_DOCUMENT_CHUNK_CHARS")
+    long_document_max_chunks: int = Field(default=8, ge=2, alias="LONG_DOCUMENT_MAX_CHUNKS")
+    # Respostas de emails Improdutivo por template local (sem IA) no modo só-classificação
+    reply_templates_enabled: bool = Field(default=True, alias="REPLY_TEMPLATES_ENABLED")
+
+    # Rate limit: requisições por IP (global) e emails por IP (endpoints em lote)
+    rate_limit_default: str = Field(default="15/minute", alias="RATE_LIMIT_DEFAULT")
+    rate_limit_emails: str = Field(default="60/minute", alias="RATE_LIMIT_EMAILS")
+
+    # Lote: máximo de emails por requisição e chamadas simultâneas ao provider
+    email_batch_max_items: int = Field(default=50, ge=1, alias="EMAIL_BATCH_MAX_ITEMS")
+    email_batch_concurrency: int = Field(default=8, ge=1, alias="EMAIL_BATCH_CONCURRENCY")
+    # /emails/classify-batch: emails curtos (até PACKED_CLASSIFY_MAX_CHARS) empacotados por chamada à IA
+    # (até PACKED_CLASSIFY_MAX_ITEMS; 0 ou 1 = uma chamada por email)
+    packed_classify_max_items: int = Field(default=10, ge=0, le=50, alias="PACKED_CLASSIFY_MAX_ITEMS")
+    packed_classify_max_chars: int = Field(default=500, ge=1, alias="PACKED_CLASSIFY_MAX_CHARS")
+
+    # Streaming NDJSON: tamanho máximo de cada linha (um email) da entrada
+    email_stream_max_line_bytes: int = Field(default=1024 * 1024, ge=1024, alias="EMAIL_STREAM_MAX_LINE_BYTES")
+
+    # Caixa exportada (/emails/analyze-mailbox): tamanho máximo de cada mensagem do .mbox/.eml
+    mailbox_max_message_bytes: int = Field(default=5 * 1024 * 1024, ge=1024, alias="MAILBOX_MAX_MESSAGE_BYTES")
+
+    # Jobs em background: workers, profundidade da fila e store ("memory" | "sqlite")
+    job_workers: int = Field(default=4, ge=1, alias="JOB_WORKERS")
+    job_queue_depth: int = Field(default=100, ge=1, alias="JOB_QUEUE_DEPTH")
+    job_timeout_seconds: float = Field(default=600, gt=0, alias="JOB_TIMEOUT_SECONDS")
+    job_result_ttl_seconds: float = Field(default=3600, gt=0, alias="JOB_RESULT_TTL_SECONDS")
+    job_store: str = Field(default="memory", alias="JOB_STORE")
+    job_store_sqlite_path: str = Field(default="/tmp/inboxiq-jobs.sqlite3", alias="JOB_STORE_SQLITE_PATH")
+
+    # Cache de resultados de análise (por conteúdo): LRU + TTL, limitado por entradas e bytes
+    analysis_cache_enabled: bool = Field(default=True, alias="ANALYSIS_CACHE_ENABLED")
+    analysis_cache_max_entries: int = Field(default=2048, ge=1, alias="ANALYSIS_CACHE_MAX_ENTRIES")
+    analysis_cache_max_bytes: int = Field(default=16 * 1024 * 1024, ge=1024, alias="ANALYSIS_CACHE_MAX_BYTES")
+    analysis_cache_ttl_seconds: float = Field(default=86400, gt=0, alias="ANALYSIS_CACHE_TTL_SECONDS")
+    # "memory" (por worker) | "sqlite" (memória + SQLite compartilhado entre workers, persiste entre reciclagens)
+    analysis_cache_store: str = Field(default="memory", alias="ANALYSIS_CACHE_STORE")
+    analysis_cache_sqlite_path: str = Field(default="/tmp/inboxiq-cache.sqlite3", alias="ANALYSIS_CACHE_SQLITE_PATH")
+    analysis_cache_sqlite_max_entries: int = Field(default=50000, ge=1, alias="ANALYSIS_CACHE_SQLITE_MAX_ENTRIES")
+
+    # Quase-duplicados (MinHash/LSH sobre os lemas): reaproveita categoria (e resposta) de emails de template
+    near_duplicate_enabled: bool = Field(default=True, alias="NEAR_DUPLICATE_ENABLED")
+    near_duplicate_threshold: float = Field(default=0.85, gt=0, le=1, alias="NEAR_DUPLICATE_THRESHOLD")
+    # resposta do email parecido citaria nomes/números/valores de outro remetente: só se habilitado
+    near_duplicate_reuse_reply: bool = Field(default=False, alias="NEAR_DUPLICATE_REUSE_REPLY")
+    near_duplicate_max_entries: int = Field(default=5000, ge=1, alias="NEAR_DUPLICATE_MAX_ENTRIES")
+
+    # Single-flight: análises idênticas concorrentes compartilham uma única chamada ao provider
+    single_flight_enabled: bool = Field(default=True, alias="SINGLE_FLIGHT_ENABLED")
+
+    # Limpeza do corpo antes do NLP/IA: remove histórico citado, assinatura e disclaimers
+    email_cleaner_enabled: bool = Field(default=True, alias="EMAIL_CLEANER_ENABLED")
+
+    # NLP com orçamento: textos acima de NLP_BUDGET_MAX_CHARS são processados em streaming limitado
+    nlp_budget_max_chars: int = Field(default=200_000, ge=1000, alias="NLP_BUDGET_MAX_CHARS")
+    nlp_budget_max_cpu_ms: float = Field(default=200, gt=0, alias="NLP_BUDGET_MAX_CPU_MS")
+    nlp_lang_sample_chars: int = Field(default=8192, ge=256, alias="NLP_LANG_SAMPLE_CHARS")
+
+    # NLP em lote (`run_many`): processos do pool (0 = sem pool), lote mínimo para usá-lo e chunk (0 = automático)
+    nlp_pool_workers: int = Field(default=2, ge=0, alias="NLP_POOL_WORKERS")
+    nlp_pool_min_batch: int = Field(default=8, ge=1, alias="NLP_POOL_MIN_BATCH")
+    nlp_pool_chunk_size: int = Field(default=0, ge=0, alias="NLP_POOL_CHUNK_SIZE")
+
+    # PDF: orçamento de caracteres (para de extrair páginas ao atingir; 0 = sem limite) e extração paralela
+    pdf_max_chars: int = Field(default=100_000, ge=0, alias="PDF_MAX_CHARS")
+    # processos isolados (sandbox) da extração; 0 = extrai no próprio worker, sem isolamento
+    pdf_pool_workers: int = Field(default=2, ge=0, alias="PDF_POOL_WORKERS")
+    pdf_parallel_min_pages: int = Field(default=16, ge=1, alias="PDF_PARALLEL_MIN_PAGES")
+    pdf_pages_per_task: int = Field(default=8, ge=1, alias="PDF_PAGES_PER_TASK")
+    # Sandbox do PDF: prazo por documento, limite de RSS por processo (0 = sem limite) e reciclagem
+    pdf_timeout_seconds: float = Field(default=20.0, gt=0, alias="PDF_TIMEOUT_SECONDS")
+    pdf_max_rss_mb: int = Field(default=512, ge=0, alias="PDF_MAX_RSS_MB")
+    pdf_worker_max_tasks: int = Field(default=50, ge=1, alias="PDF_WORKER_MAX_TASKS")
+    # Cache de extração de PDF por hash do conteúdo (mesmo arquivo reenviado não é parseado de novo)
+    pdf_cache_enabled: bool = Field(default=True, alias="PDF_CACHE_ENABLED")
+    pdf_cache_max_entries: int = Field(default=512, ge=1, alias="PDF_CACHE_MAX_ENTRIES")
+    pdf_cache_max_bytes: int = Field(default=32 * 1024 * 1024, ge=1024, alias="PDF_CACHE_MAX_BYTES")
+    pdf_cache_ttl_seconds: float = Field(default=86400, gt=0, alias="PDF_CACHE_TTL_SECONDS")
+
+    # Fallback heurístico: arquivo de regras JSON (vazio = regras embutidas em app/providers/fallback_rules.json)
+    fallback_rules_path: str = Field(default="", alias="FALLBACK_RULES_PATH")
+
+    # Classificador local (artefato do `tools.train_local_classifier`; vazio = desligado): limiar e categorias sem IA
+    local_classifier_path: str = Field(default="", alias="LOCAL_CLASSIFIER_PATH")
+    local_classifier_threshold: float = Field(default=0.9, ge=0.5, le=1, alias="LOCAL_CLASSIFIER_THRESHOLD")
+    local_classifier_categories: str = Field(default="Improdutivo", alias="LOCAL_CLASSIFIER_CATEGORIES")
 
 
 settings = Settings()
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import logging
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 from fastapi import Request, HTTPException
 from fastapi.exceptions import RequestValidationError
@@ -14,9 +14,15 @@ from app.domain.models.api_response import ApiError
 logger = logging.getLogger("app.exceptions")
 
 
-def _as_json_response(*, status_code: int, message: str, errors: Optional[List[ApiError]] = None) -> JSONResponse:
+def _as_json_response(
+    *,
+    status_code: int,
+    message: str,
+    errors: Optional[List[ApiError]] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> JSONResponse:
     payload = fail(message=message, errors=errors).model_dump()
-    return JSONResponse(status_code=status_code, content=payload)
+    return JSONResponse(status_code=status_code, content=payload, headers=headers)
 
 
 async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
@@ -62,7 +68,13 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
         },
     )
 
-    return _as_json_response(status_code=exc.status_code, message=message, errors=errors)
+    # preserva headers da exceção (ex.: Retry-After em 429/503)
+    return _as_json_response(
+        status_code=exc.status_code,
+        message=message,
+        errors=errors,
+        headers=getattr(exc, "headers", None),
+    )
 
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
@@ -21,7 +21,7 @@ class JsonFormatter(logging.Formatter):
         }
 
         # Extras úteis (se vierem no logger.info(..., extra={...}))
-        for key in ("event", "method", "path", "status_code", "duration_ms", "client_ip"):
+        for key in ("event", "method", "path", "status_code", "duration_ms", "ttfb_ms", "client_ip"):
             if hasattr(record, key):
                 payload[key] = getattr(record, key)
 
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator, Union
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.domain.models.api_response import ApiError
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class NdjsonStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse para NDJSON full-duplex (lê o corpo enquanto escreve a resposta).
+
+    O StreamingResponse padrão (ASGI < 2.4) escuta `receive()` em paralelo para detectar
+    desconexão, o que consumiria os chunks do corpo que o gerador ainda está lendo.
+    Aqui o próprio gerador é dono do `receive` (lê o corpo e detecta o `http.disconnect`).
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_ndjson(
+    chunks: AsyncIterator[bytes],
+    *,
+    max_line_bytes: int,
+) -> AsyncIterator[tuple[int, Union[dict[str, Any], ApiError]]]:
+    """
+    Lê NDJSON em streaming (sem bufferizar o corpo inteiro).
+    Retorna (index, objeto) por linha não vazia; linha inválida vira (index, ApiError).
+    """
+    buffer = bytearray()
+    index = 0
+    oversized = False
+
+    async for chunk in chunks:
+        buffer.extend(chunk)
+
+        while True:
+            pos = buffer.find(b"\n")
+            if pos < 0:
+                break
+
+            line = bytes(buffer[:pos])
+            del buffer[: pos + 1]
+
+            if oversized:
+                # resto de uma linha grande demais já reportada
+                oversized = False
+                continue
+
+            parsed = _parse_line(line, max_line_bytes)
+            if parsed is not None:
+                yield index, parsed
+                index += 1
+
+        if len(buffer) > max_line_bytes and not oversized:
+            # descarta a linha em andamento para não crescer sem limite
+            yield index, ApiError(
+                code="LINE_TOO_LARGE",
+                message=f"Linha excede o limite de {max_line_bytes} bytes.",
+            )
+            index += 1
+            buffer.clear()
+            oversized = True
+        elif oversized:
+            buffer.clear()
+
+    if buffer and not oversized:
+        parsed = _parse_line(bytes(buffer), max_line_bytes)
+        if parsed is not None:
+            yield index, parsed
+
+
+def _parse_line(line: bytes, max_line_bytes: int) -> Union[dict[str, Any], ApiError, None]:
+    if not line.strip():
+        return None
+
+    if len(line) > max_line_bytes:
+        return ApiError(code="LINE_TOO_LARGE", message=f"Linha excede o limite de {max_line_bytes} bytes.")
+
+    try:
+        value = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return ApiError(code="INVALID_JSON", message="Linha não é um JSON válido.")
+
+    if not isinstance(value, dict):
+        return ApiError(code="INVALID_JSON", message="Cada linha deve ser um objeto JSON.")
+
+    return value
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import time
+
+from fastapi import HTTPException, Request
+from limits import parse
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from starlette import status
+
+from app.core.config import settings
+
+# ✅ limite global por IP (aplicado pelo SlowAPIMiddleware em todas as rotas não isentas)
+limiter = Limiter(key_func=get_remote_address, default_limits=[settings.rate_limit_default])
+
+# limite "por email": endpoints em lote são isentos do limite global e cobram 1 hit por item
+_emails_limit = parse(settings.rate_limit_emails)
+_EMAILS_SCOPE = "emails:items"
+
+
+def charge_emails(request: Request, count: int) -> None:
+    """
+    Cobra `count` hits do limite por email para o IP da requisição.
+    Levanta 429 (HTTPException -> ApiResponse) com Retry-After quando excedido.
+    """
+    if not limiter.enabled or count <= 0:
+        return
+
+    key = get_remote_address(request)
+    if limiter.limiter.hit(_emails_limit, key, _EMAILS_SCOPE, cost=count):
+        return
+
+    reset_at, _ = limiter.limiter.get_window_stats(_emails_limit, key, _EMAILS_SCOPE)
+    retry_after = max(1, int(reset_at - time.time()))
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail={
+            "message": "Muitas requisições. Tente novamente em instantes.",
+            "errors": [
+                {
+                    "code": "RATE_LIMIT",
+                    "message": f"Limite de {settings.rate_limit_emails} emails excedido ({count} solicitados).",
+                }
+            ],
+        },
+        headers={"Retry-After": str(retry_after)},
+    )
+
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# evita buffering em proxies (nginx/ELB) e caches no caminho
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: BaseModel) -> bytes:
+    """Formata um evento Server-Sent Events com `data` em JSON (uma linha)."""
+    return f"event: {event}\ndata: {data.model_dump_json()}\n\n".encode("utf-8")
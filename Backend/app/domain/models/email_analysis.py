@@ -1,15 +1,127 @@
 from pydantic import BaseModel, Field
-from typing import Literal, Optional
+from typing import List, Literal, Optional
+
+from app.domain.models.api_response import ApiError
 
 
 EmailCategory = Literal["Produtivo", "Improdutivo"]
+AnalysisTier = Literal["cache", "near_duplicate", "local", "provider", "fallback"]
 
 
 class EmailAnalyzeRequest(BaseModel):
     text: str = Field(min_length=1, description="Conteúdo do email em texto puro")
 
 
+class NearDuplicateMeta(BaseModel):
+    match_id: str = Field(description="Id (hash de conteúdo) da análise reaproveitada")
+    similarity: float = Field(ge=0, le=1, description="Similaridade estimada (MinHash) com a análise reaproveitada")
+    reply_reused: bool = Field(description="`false`: só a categoria foi reaproveitada (resposta padrão)")
+
+
+class CleaningMeta(BaseModel):
+    input_chars: int = Field(description="Tamanho do corpo recebido (caracteres)")
+    output_chars: int = Field(description="Tamanho enviado ao NLP e à IA, sem histórico citado/assinatura/disclaimer")
+    size_ratio: float = Field(description="`input_chars / output_chars` (economia de tokens de entrada)")
+    removed: List[str] = Field(default_factory=list, description="Seções removidas: quote, signature, disclaimer")
+
+
+class LongDocumentMeta(BaseModel):
+    chunks: int = Field(description="Chunks (por parágrafo) classificados em paralelo")
+    failed_chunks: int = Field(default=0, description="Chunks cuja classificação falhou (ficaram fora da decisão)")
+    selected_chunk: int = Field(description="Índice do chunk mais relevante, base da resposta")
+
+
+class AnalysisMeta(BaseModel):
+    """Como o resultado foi obtido (não faz parte do conteúdo cacheado)."""
+
+    tier: Optional[AnalysisTier] = Field(
+        default=None,
+        description="Quem respondeu: cache, quase-duplicado, classificador local, provider (IA) ou fallback heurístico",
+    )
+    cache: Optional[Literal["hit", "miss"]] = Field(
+        default=None, description="`hit` quando o resultado veio do cache de análises"
+    )
+    near_duplicate: Optional[NearDuplicateMeta] = Field(
+        default=None, description="Preenchido quando o email é quase-duplicado de uma análise recente"
+    )
+    coalesced: Optional[bool] = Field(
+        default=None, description="`true` quando o resultado veio de uma análise idêntica que já estava em andamento"
+    )
+    packed: Optional[bool] = Field(
+        default=None, description="`true` quando classificado junto com outros emails curtos numa única chamada à IA"
+    )
+    long_document: Optional[LongDocumentMeta] = Field(
+        default=None, description="Documento longo classificado em chunks (map-reduce)"
+    )
+    cleaning: Optional[CleaningMeta] = Field(
+        default=None, description="Limpeza do corpo antes da análise (ausente em resultados do cache)"
+    )
+    replaced: Optional[bool] = Field(
+        default=None,
+        description="SSE: `true` quando a resposta do `done` substitui os `delta` já enviados (descartar o texto acumulado)",
+    )
+
+
+class DeferredReply(BaseModel):
+    """Resposta ainda não gerada (modo só-classificação): buscar depois em `href`."""
+
+    id: str = Field(description="Id da resposta pendente")
+    href: str = Field(description="Endpoint que gera/retorna a resposta (`GET`)")
+
+
 class EmailAnalyzeResponse(BaseModel):
     category: EmailCategory
-    suggested_reply: str
+    suggested_reply: Optional[str] = Field(
+        default=None, description="`null` quando a resposta foi adiada (ver `reply`)"
+    )
+    confidence: Optional[float] = Field(default=None, ge=0, le=1)
+    reply: Optional[DeferredReply] = Field(
+        default=None, description="Preenchido quando a resposta será gerada sob demanda"
+    )
+    meta: Optional[AnalysisMeta] = None
+
+
+class EmailBatchItem(BaseModel):
+    id: Optional[str] = Field(default=None, max_length=200, description="Identificador do item definido pelo cliente")
+    # sem min_length: item vazio vira erro do item, não erro do lote inteiro
+    text: str = Field(description="Conteúdo do email em texto puro")
+
+
+class EmailBatchRequest(BaseModel):
+    items: List[EmailBatchItem] = Field(min_length=1, description="Emails a analisar")
+
+
+class EmailBatchItemResult(BaseModel):
+    index: int = Field(description="Posição do item na requisição")
+    id: Optional[str] = None
+    success: bool
+    data: Optional[EmailAnalyzeResponse] = None
+    errors: Optional[List[ApiError]] = None
+
+
+class EmailBatchResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    items: List[EmailBatchItemResult]
+
+
+class EmailStreamItem(BaseModel):
+    """`data` de cada linha NDJSON do streaming (resultado vem marcado com o id do cliente)."""
+
+    index: int = Field(description="Posição (linha) do item na entrada")
+    id: Optional[str] = None
+    result: Optional[EmailAnalyzeResponse] = None
+
+
+class EmailReplyClassification(BaseModel):
+    """Evento SSE `classification`: enviado antes da resposta começar a ser gerada."""
+
+    category: EmailCategory
     confidence: Optional[float] = Field(default=None, ge=0, le=1)
+
+
+class EmailReplyDelta(BaseModel):
+    """Evento SSE `delta`: próximo trecho (já sanitizado) de `suggested_reply`."""
+
+    text: str
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.domain.models.api_response import ApiError
+from app.domain.models.email_analysis import EmailAnalyzeResponse
+
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+class JobResponse(BaseModel):
+    id: str
+    status: JobStatus
+    kind: Literal["text", "file"]
+    filename: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    cancel_requested: bool = Field(default=False, description="Cancelamento pedido (job ainda rodando)")
+    result: Optional[EmailAnalyzeResponse] = None
+    error: Optional[ApiError] = None
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -7,6 +10,14 @@ from app.core.config import settings
 from app.core.logging import configure_logging
 from app.api.routes.health import router as health_router
 from app.api.routes.email import router as email_router
+from app.api.routes.jobs import router as jobs_router
+from app.api.deps import (
+    get_fallback_provider,
+    get_job_queue,
+    get_nlp_preprocess,
+    get_pdf_sandbox,
+    get_result_cache,
+)
 from app.middlewares.correlation_id_middleware import CorrelationIdMiddleware
 from app.middlewares.externalAiExceptionMiddleware import ExternalAiExceptionMiddleware
 from fastapi import HTTPException
@@ -19,13 +30,12 @@ from app.core.exception_handlers import (
 )
 
 # ✅ Rate limiter (SlowAPI)
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 
+from app.core.rate_limit import limiter
 from app.core.response_factory import fail
 from app.domain.models.api_response import ApiError
 
@@ -36,10 +46,35 @@ openapi_tags = [
         "**Fluxo:** texto bruto → NLP (stopwords + lematização) → IA (OpenAI) → validação/normalização → resposta.\n"
         "Suporta envio de texto direto ou arquivo `.txt` / `.pdf`."
     )},
+    {"name": "Jobs", "description": (
+        "Análises em background: enfileira (texto ou arquivo), consulta status/resultado e cancela.\n\n"
+        "Fila limitada por worker; quando cheia responde `503` com `Retry-After`."
+    )},
 ]
 
-# ✅ 15 requisições por minuto por IP (global)
-limiter = Limiter(key_func=get_remote_address, default_limits=["15/minute"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # carrega stopwords/dicionários do NLP no startup (não na primeira requisição)
+    nlp = await asyncio.to_thread(get_nlp_preprocess)
+    # compila as regras do fallback (e falha cedo se o arquivo for inválido)
+    await asyncio.to_thread(get_fallback_provider)
+    # workers da fila de jobs vivem no event loop deste processo
+    queue = get_job_queue()
+    queue.start()
+    try:
+        yield
+    finally:
+        await queue.stop()
+        # grava escritas pendentes do cache compartilhado antes do worker sair
+        cache = get_result_cache()
+        if cache is not None:
+            await asyncio.to_thread(cache.close)
+        # encerra os processos do NLP em lote e do sandbox do PDF (se chegaram a ser criados)
+        await asyncio.to_thread(nlp.close)
+        sandbox = get_pdf_sandbox()
+        if sandbox is not None:
+            await asyncio.to_thread(sandbox.close)
 
 
 def create_app() -> FastAPI:
@@ -50,7 +85,7 @@ def create_app() -> FastAPI:
         version=settings.app_version,
         description=(
             "API para classificar emails e sugerir respostas automáticas.\n\n"
-            "- **Entrada:** texto ou arquivo `.txt/.pdf`\n"
+            "- **Entrada:** texto ou arquivo `.txt/.pdf/.eml` (ou caixa `.mbox`)\n"
             "- **Saída:** categoria + resposta sugerida + confiança\n"
             "- **Padrão de resposta:** `{ success, message, data, errors }`"
         ),
@@ -61,6 +96,7 @@ def create_app() -> FastAPI:
         contact={"name": "InboxIQ API"},
         license_info={"name": "Proprietary"},
         servers=[{"url": "http://localhost:8000", "description": "Local"}],
+        lifespan=lifespan,
     )
 
     # ✅ SlowAPI middleware + handler
@@ -71,7 +107,7 @@ def create_app() -> FastAPI:
     async def ratelimit_handler(request: Request, exc: RateLimitExceeded):
         payload = fail(
             message="Muitas requisições. Tente novamente em instantes.",
-            errors=[ApiError(code="RATE_LIMIT", message="Limite de 15 requisições por minuto excedido.")],
+            errors=[ApiError(code="RATE_LIMIT", message=f"Limite de {settings.rate_limit_default} requisições excedido.")],
         ).model_dump()
         return JSONResponse(status_code=429, content=payload)
 
@@ -94,6 +130,7 @@ def create_app() -> FastAPI:
 
     app.include_router(health_router, tags=["Health"])
     app.include_router(email_router, tags=["Emails"])
+    app.include_router(jobs_router, tags=["Jobs"])
     return app
 
 
@@ -1,5 +1,6 @@
+from dataclasses import dataclass
 from pydantic import BaseModel
-from typing import Literal, Protocol, Sequence, Tuple
+from typing import AsyncIterator, Iterator, List, Literal, Optional, Protocol, Sequence, Tuple
 
 
 class AiResult(BaseModel):
@@ -7,6 +8,67 @@ class AiResult(BaseModel):
     suggested_reply: str
     confidence: float
 
+
+@dataclass(frozen=True)
+class ReplyStreamEvent:
+    """
+    Evento do streaming do provider:
+    - "classification": `category`/`confidence` já conhecidos (antes da resposta)
+    - "delta": trecho novo da resposta em `text`
+    - "done": resultado completo (`category`, `confidence`, `text` = resposta inteira);
+      `fallback=True` quando o provider falhou e a resposta veio da contingência, e
+      `replaced=True` quando ela substitui `delta`s já emitidos
+    """
+
+    kind: Literal["classification", "delta", "done"]
+    category: Optional[str] = None
+    confidence: Optional[float] = None
+    text: str = ""
+    fallback: bool = False
+    replaced: bool = False
+
+
 class AiProvider(Protocol):
     def classify_and_reply(self, text: str, keywords: Sequence[str]) -> Tuple[str, str, float]:
-        ...
\ No newline at end of file
+        ...
+
+
+class StreamingAiProvider(AiProvider, Protocol):
+    def stream_classify_and_reply(self, text: str, keywords: Sequence[str]) -> Iterator[ReplyStreamEvent]:
+        ...
+
+
+class AsyncAiProvider(Protocol):
+    """Variante async: a chamada de rede espera no event loop (sem ocupar thread)."""
+
+    async def classify_and_reply_async(self, text: str, keywords: Sequence[str]) -> Tuple[str, str, float]:
+        ...
+
+    def stream_classify_and_reply_async(self, text: str, keywords: Sequence[str]) -> AsyncIterator[ReplyStreamEvent]:
+        ...
+
+
+class SplitAiProvider(Protocol):
+    """Classificação e resposta em chamadas separadas (só-classificação + resposta sob demanda)."""
+
+    def classify(self, text: str, keywords: Sequence[str]) -> Tuple[str, float]:
+        ...
+
+    def generate_reply(self, text: str, keywords: Sequence[str], category: str) -> str:
+        ...
+
+    async def classify_async(self, text: str, keywords: Sequence[str]) -> Tuple[str, float]:
+        ...
+
+    async def generate_reply_async(self, text: str, keywords: Sequence[str], category: str) -> str:
+        ...
+
+
+class PackedAiProvider(Protocol):
+    """Classificação de vários emails curtos numa única chamada (lote só-classificação)."""
+
+    async def classify_many_async(
+        self, items: Sequence[Tuple[str, Sequence[str]]]
+    ) -> List[Optional[Tuple[str, float]]]:
+        """Um resultado por item, na ordem de `items`; None = item ausente/inválido na saída do modelo."""
+        ...
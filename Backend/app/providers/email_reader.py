@@ -1,22 +1,79 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import os
 import re
-from dataclasses import dataclass
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from email.message import EmailMessage
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from html.parser import HTMLParser
 from io import BytesIO
 from pathlib import Path
-from typing import Optional
+from typing import Deque, List, Optional, Tuple, Union
 
 from pypdf import PdfReader
 
+from app.providers.pdf_sandbox import PdfSandbox
+from app.providers.result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PdfExtractStats:
+    pages_total: int
+    pages_processed: int
+    pages_skipped: int  # não extraídas porque o orçamento de caracteres já tinha sido atingido
+    extract_ms: int
+    parallel: bool
+    cached: bool = False  # texto veio do cache de extração (mesmo conteúdo já extraído)
+
 
 @dataclass(frozen=True)
 class EmailContent:
     text: str
-    source: str  # "text" | "txt" | "pdf"
+    source: str  # "text" | "txt" | "pdf" | "eml"
     filename: Optional[str] = None
+    pdf: Optional[PdfExtractStats] = None
+    message_id: Optional[str] = None  # cabeçalho Message-ID (.eml/.mbox)
 
 
 class EmailReader:
+    """
+    Leitura de emails (texto, .txt, .pdf, .eml; mbox via `MboxSplitter`).
+
+    PDF:
+    - `sandbox`: o parsing roda em processos filhos isolados, com prazo e limite de memória
+      por documento (`PdfSandbox`); sem sandbox, roda na própria thread (ferramentas/testes)
+    - `max_pdf_chars`: para de extrair páginas quando o texto acumulado atinge o orçamento
+      (para triagem só as primeiras páginas importam; o resto é contado como `pages_skipped`)
+    - PDFs por caminho com `parallel_min_pages`+ páginas são extraídos em faixas de
+      `pages_per_task` páginas pelos processos do sandbox, na ordem das páginas (janela
+      limitada de faixas em voo, para o orçamento cortar o trabalho cedo)
+    - `extraction_cache`: texto extraído por hash do conteúdo (`content_hash`, calculado no
+      upload); o mesmo PDF enviado de novo não é parseado outra vez
+    """
+
+    def __init__(
+        self,
+        *,
+        max_pdf_chars: Optional[int] = None,
+        sandbox: Optional[PdfSandbox] = None,
+        parallel_min_pages: int = 16,
+        pages_per_task: int = 8,
+        extraction_cache: Optional[ResultCache] = None,
+    ) -> None:
+        self._max_pdf_chars = max_pdf_chars or None
+        self._sandbox = sandbox
+        self._cache = extraction_cache
+        self._parallel_min_pages = max(1, parallel_min_pages)
+        self._pages_per_task = max(1, pages_per_task)
+
     def from_text(self, text: str) -> EmailContent:
         # mantém simples, mas normaliza quebras e espaços comuns
         return EmailContent(text=self._normalize(text or ""), source="text")
@@ -36,36 +93,217 @@ class EmailReader:
         data = p.read_bytes()
         return self.from_txt_bytes(data, filename=filename)
 
+    # ---------------------------
+    # EML (MIME)
+    # ---------------------------
+    def from_eml_bytes(self, data: bytes, filename: str | None = None) -> EmailContent:
+        """
+        Mensagem MIME (RFC 5322): corpo text/plain; sem ele, o text/html convertido em texto.
+        O assunto entra no início do texto (é sinal forte para a triagem). Anexos são ignorados.
+        """
+        msg = BytesParser(policy=default_policy).parsebytes(data)
+
+        body = ""
+        part = msg.get_body(preferencelist=("plain", "html"))
+        if part is not None:
+            body = _part_text(part)
+            if part.get_content_subtype() == "html":
+                body = _html_to_text(body)
+
+        subject = str(msg.get("Subject", "") or "").strip()
+        text = f"Assunto: {subject}\n\n{body}" if subject else body
+        message_id = str(msg.get("Message-ID", "") or "").strip() or None
+        return EmailContent(text=self._normalize(text), source="eml", filename=filename, message_id=message_id)
+
+    def from_eml_path(self, path: str, filename: str | None = None) -> EmailContent:
+        return self.from_eml_bytes(Path(path).read_bytes(), filename=filename)
+
     # ---------------------------
     # PDF
     # ---------------------------
-    def from_pdf_bytes(self, data: bytes, filename: str | None = None) -> EmailContent:
-        reader = PdfReader(BytesIO(data))
-        parts: list[str] = []
+    def from_pdf_bytes(
+        self, data: bytes, filename: str | None = None, content_hash: Optional[str] = None
+    ) -> EmailContent:
+        """
+        Lê PDF já em memória (upload pequeno): o buffer vai direto ao sandbox, sem arquivo.
+        Sem `content_hash`, calcula o sha256 aqui (se houver cache de extração).
+        """
+        if content_hash is None and self._cache is not None:
+            content_hash = hashlib.sha256(data).hexdigest()
+        cached = self._cached_pdf(content_hash, filename)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        if self._sandbox is None:
+            parts, processed, total = _extract_pdf(PdfReader(BytesIO(data)), 0, None, self._max_pdf_chars)
+        else:
+            parts, processed, total = self._sandbox.call(
+                _extract_pdf_in_worker, data, 0, None, self._max_pdf_chars, deadline=self._sandbox.new_deadline()
+            )
+        content = self._pdf_content(parts, total, processed, started, False, filename)
+        self._store_pdf(content_hash, content)
+        return content
+
+    def from_pdf_path(
+        self, path: str, filename: str | None = None, content_hash: Optional[str] = None
+    ) -> EmailContent:
+        """
+        Lê PDF por caminho (melhor para memória em produção; os processos do sandbox abrem o
+        arquivo pelo caminho). Falhas do sandbox (prazo, memória, queda) viram `PdfSandboxError`.
+        Com `content_hash` (sha256 do arquivo), consulta/alimenta o cache de extração.
+        """
+        cached = self._cached_pdf(content_hash, filename)
+        if cached is not None:
+            return cached
+        content = self._read_pdf_path(path, filename)
+        self._store_pdf(content_hash, content)
+        return content
+
+    def _read_pdf_path(self, path: str, filename: Optional[str]) -> EmailContent:
+        started = time.perf_counter()
+        budget = self._max_pdf_chars
+        sandbox = self._sandbox
+        if sandbox is None:
+            parts, processed, total = _extract_pdf(PdfReader(path), 0, None, budget)
+            return self._pdf_content(parts, total, processed, started, False, filename)
+
+        deadline = sandbox.new_deadline()
+        # com mais de um processo, a 1ª faixa já informa o total de páginas (decide se paraleliza)
+        first_stop = self._pages_per_task if sandbox.workers > 1 else None
+        parts, processed, total = sandbox.call(_extract_pdf_in_worker, path, 0, first_stop, budget, deadline=deadline)
+
+        parallel = False
+        chars = sum(len(p) for p in parts)
+        if processed < total and (budget is None or chars < budget):
+            if total >= self._parallel_min_pages:
+                parallel = True
+                more, more_processed = self._extract_parallel(path, processed, total, deadline)
+            else:
+                remaining = None if budget is None else budget - chars
+                more, more_processed, _ = sandbox.call(
+                    _extract_pdf_in_worker, path, processed, None, remaining, deadline=deadline
+                )
+            parts.extend(more)
+            processed += more_processed
+
+        return self._pdf_content(parts, total, processed, started, parallel, filename)
 
-        for page in reader.pages:
-            extracted = (page.extract_text() or "").strip()
-            if extracted:
-                parts.append(extracted)
+    def _extract_parallel(self, path: str, first: int, total: int, deadline: float) -> Tuple[List[str], int]:
+        sandbox = self._sandbox
+        assert sandbox is not None
+        budget = self._max_pdf_chars
+        step = self._pages_per_task
+        ranges = iter(range(first, total, step))
+        in_flight: Deque[Future] = deque()
 
+        def submit_next() -> None:
+            start = next(ranges, None)
+            if start is not None:
+                in_flight.append(
+                    sandbox.submit(_extract_pdf_in_worker, path, start, min(start + step, total), budget, deadline=deadline)
+                )
+
+        # janela: faixas suficientes para ocupar os processos sem adiantar trabalho que o orçamento descartaria
+        for _ in range(sandbox.workers * 2):
+            submit_next()
+
+        parts: List[str] = []
+        chars = 0
+        processed = 0
+        try:
+            while in_flight:
+                range_parts, range_processed, _ = in_flight.popleft().result()
+                parts.extend(range_parts)
+                processed += range_processed
+                chars += sum(len(p) for p in range_parts)
+                if budget is not None and chars >= budget:
+                    break
+                submit_next()
+        finally:
+            for fut in in_flight:
+                fut.cancel()
+
+        return parts, processed
+
+    def _pdf_content(
+        self,
+        parts: List[str],
+        total: int,
+        processed: int,
+        started: float,
+        parallel: bool,
+        filename: Optional[str],
+    ) -> EmailContent:
+        stats = PdfExtractStats(
+            pages_total=total,
+            pages_processed=processed,
+            pages_skipped=total - processed,
+            extract_ms=int((time.perf_counter() - started) * 1000),
+            parallel=parallel,
+        )
+        logger.info(
+            "pdf_extracted",
+            extra={
+                "event": "pdf_extracted",
+                "pages_total": stats.pages_total,
+                "pages_processed": stats.pages_processed,
+                "pages_skipped": stats.pages_skipped,
+                "duration_ms": stats.extract_ms,
+                "parallel": parallel,
+            },
+        )
         # usa \n\n entre páginas para manter “cara de e-mail”
         text = "\n\n".join(parts)
-        return EmailContent(text=self._normalize(text), source="pdf", filename=filename)
+        return EmailContent(text=self._normalize(text), source="pdf", filename=filename, pdf=stats)
 
-    def from_pdf_path(self, path: str, filename: str | None = None) -> EmailContent:
+    def _cached_pdf(self, content_hash: Optional[str], filename: Optional[str]) -> Optional[EmailContent]:
+        if self._cache is None or not content_hash:
+            return None
+        value = self._cache.get(self._cache_key(content_hash))
+        if value is None:
+            return None
+        stats = PdfExtractStats(**{**value["pdf"], "cached": True})
+        logger.info(
+            "pdf_cache_hit",
+            extra={"event": "pdf_cache_hit", "pages_total": stats.pages_total, "duration_ms": stats.extract_ms},
+        )
+        return EmailContent(text=value["text"], source="pdf", filename=filename, pdf=stats)
+
+    def _store_pdf(self, content_hash: Optional[str], content: EmailContent) -> None:
+        if self._cache is None or not content_hash or content.pdf is None:
+            return
+        self._cache.put(self._cache_key(content_hash), {"text": content.text, "pdf": asdict(content.pdf)})
+
+    def _cache_key(self, content_hash: str) -> str:
+        # o orçamento muda o texto extraído: entra na chave
+        return f"pdf:{self._max_pdf_chars or 0}:{content_hash}"
+
+    def from_path(
+        self, path: str, filename: str | None = None, content_hash: Optional[str] = None
+    ) -> EmailContent:
         """
-        Lê PDF por caminho (melhor para memória em produção).
+        Escolhe PDF/TXT pela extensão do nome original (ou do próprio path).
         """
-        reader = PdfReader(path)
-        parts: list[str] = []
-
-        for page in reader.pages:
-            extracted = (page.extract_text() or "").strip()
-            if extracted:
-                parts.append(extracted)
+        name = (filename or path).strip().lower()
+        if name.endswith(".pdf"):
+            return self.from_pdf_path(path, filename=filename, content_hash=content_hash)
+        if name.endswith(".eml"):
+            return self.from_eml_path(path, filename=filename)
+        return self.from_txt_path(path, filename=filename)
 
-        text = "\n\n".join(parts)
-        return EmailContent(text=self._normalize(text), source="pdf", filename=filename)
+    def from_bytes(
+        self, data: bytes, filename: str | None = None, content_hash: Optional[str] = None
+    ) -> EmailContent:
+        """
+        Mesmo que `from_path`, para um upload mantido em memória (sem gravar em disco).
+        """
+        name = (filename or "").strip().lower()
+        if name.endswith(".pdf"):
+            return self.from_pdf_bytes(data, filename=filename, content_hash=content_hash)
+        if name.endswith(".eml"):
+            return self.from_eml_bytes(data, filename=filename)
+        return self.from_txt_bytes(data, filename=filename)
 
     # ---------------------------
     # Helpers
@@ -94,3 +332,169 @@ class EmailReader:
         t = re.sub(r"(?m)^[ \t]+$", "", t)
         t = re.sub(r"\n{3,}", "\n\n", t)
         return t.strip()
+
+
+class MboxSplitter:
+    """
+    Divide um mbox em mensagens a partir de chunks (upload em streaming): só a mensagem
+    corrente fica em memória, nunca o arquivo inteiro.
+
+    - separador: linha `From ` no início do arquivo ou depois de uma linha em branco
+    - linhas escapadas (`>From `, `>>From `...) perdem um `>` (mboxrd)
+    - mensagem acima de `max_message_bytes` vira None (o chamador reporta erro do item)
+    """
+
+    def __init__(self, max_message_bytes: int) -> None:
+        self._max = max(1, max_message_bytes)
+        self._partial = b""  # linha ainda sem \n
+        self._lines: List[bytes] = []
+        self._size = 0
+        self._oversized = False
+        self._in_message = False
+        self._prev_blank = True
+
+    def feed(self, chunk: bytes) -> List[Optional[bytes]]:
+        out: List[Optional[bytes]] = []
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        if len(self._partial) > self._max:
+            # "linha" gigante sem quebra: descarta (a mensagem já passou do limite)
+            self._oversized = self._in_message = True
+            self._partial = b""
+        for line in lines:
+            self._line(line + b"\n", out)
+        return out
+
+    def close(self) -> List[Optional[bytes]]:
+        out: List[Optional[bytes]] = []
+        if self._partial:
+            self._line(self._partial, out)
+            self._partial = b""
+        self._finish(out)
+        return out
+
+    def _line(self, line: bytes, out: List[Optional[bytes]]) -> None:
+        if self._prev_blank and line.startswith(b"From "):
+            self._finish(out)
+            self._in_message = True
+            self._prev_blank = False
+            return
+
+        self._prev_blank = not line.strip()
+        if not self._in_message:
+            if self._prev_blank:
+                return  # linhas em branco antes da primeira mensagem
+            self._in_message = True  # arquivo sem linha `From ` inicial: começa já na mensagem
+
+        if _MBOXRD_ESCAPED_RE.match(line):
+            line = line[1:]
+        if self._oversized:
+            return
+        self._size += len(line)
+        if self._size > self._max:
+            self._oversized = True
+            self._lines.clear()
+            return
+        self._lines.append(line)
+
+    def _finish(self, out: List[Optional[bytes]]) -> None:
+        if self._in_message:
+            out.append(None if self._oversized else b"".join(self._lines))
+        self._lines = []
+        self._size = 0
+        self._oversized = False
+        self._in_message = False
+
+
+_MBOXRD_ESCAPED_RE = re.compile(rb"^>+From ")
+
+
+def _part_text(part: EmailMessage) -> str:
+    try:
+        return str(part.get_content())
+    except (LookupError, UnicodeDecodeError):
+        # charset desconhecido/errado no cabeçalho: decodifica o payload na mão
+        payload = part.get_payload(decode=True) or b""
+        return payload.decode("utf-8", errors="replace")
+
+
+class _HtmlText(HTMLParser):
+    """HTML -> texto: ignora script/style/head e quebra linha nos elementos de bloco."""
+
+    _SKIP = {"script", "style", "head", "title"}
+    _BLOCK = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "table", "hr"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in self._SKIP:
+            self._skipping += 1
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def _html_to_text(html: str) -> str:
+    parser = _HtmlText()
+    parser.feed(html)
+    parser.close()
+    text = "".join(parser.parts)
+    # espaços do HTML não são significativos: colapsa por linha
+    return "\n".join(" ".join(line.split()) for line in text.split("\n"))
+
+
+def _extract_pdf(
+    reader: PdfReader, start: int, stop: Optional[int], max_chars: Optional[int]
+) -> Tuple[List[str], int, int]:
+    """
+    Texto das páginas [start, stop) (stop None = até o fim), quantas foram processadas
+    (para ao atingir `max_chars`) e o total de páginas do documento.
+    """
+    total = len(reader.pages)
+    stop = total if stop is None else min(stop, total)
+    parts: List[str] = []
+    chars = 0
+    processed = 0
+    for index in range(start, stop):
+        if max_chars is not None and chars >= max_chars:
+            break
+        processed += 1
+        extracted = (reader.pages[index].extract_text() or "").strip()
+        if extracted:
+            parts.append(extracted)
+            chars += len(extracted)
+    return parts, processed, total
+
+
+# ---------------------------
+# Processos do sandbox (PdfSandbox)
+# ---------------------------
+# último PDF aberto no processo: faixas seguidas do mesmo arquivo não re-parseiam a estrutura
+_worker_reader: Optional[Tuple[Tuple[str, int, int], PdfReader]] = None
+
+
+def _extract_pdf_in_worker(
+    source: Union[str, bytes], start: int, stop: Optional[int], max_chars: Optional[int]
+) -> Tuple[List[str], int, int]:
+    global _worker_reader
+    if isinstance(source, bytes):
+        return _extract_pdf(PdfReader(BytesIO(source)), start, stop, max_chars)
+
+    st = os.stat(source)
+    key = (source, st.st_size, st.st_mtime_ns)
+    if _worker_reader is None or _worker_reader[0] != key:
+        _worker_reader = None  # libera o anterior antes de abrir o próximo
+        _worker_reader = (key, PdfReader(source))
+    return _extract_pdf(_worker_reader[1], start, stop, max_chars)
@@ -1,41 +1,126 @@
 from __future__ import annotations
-from typing import Tuple
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Set, Tuple
+
+import ahocorasick
+from pydantic import BaseModel, Field
+
+DEFAULT_RULES_PATH = Path(__file__).with_name("fallback_rules.json")
+
+
+class FallbackOutcome(BaseModel):
+    category: Literal["Produtivo", "Improdutivo"]
+    confidence: float = Field(ge=0, le=1)
+    reply: str = Field(min_length=1)
+
+
+class FallbackRuleGroup(FallbackOutcome):
+    name: str
+    # sinal (substring, sem diferenciar maiúsculas) -> peso somado ao score do grupo
+    signals: Dict[str, float] = Field(min_length=1)
+
+
+class FallbackRules(BaseModel):
+    version: int = 1
+    groups: List[FallbackRuleGroup] = Field(min_length=1)
+    default: FallbackOutcome
+
 
 class HeuristicFallbackProvider:
+    """
+    Classificação heurística usada quando a IA falha (em queda do provider, é o caminho de
+    todas as requisições).
+
+    Regras (arquivo JSON, `FALLBACK_RULES_PATH`) compiladas uma vez num autômato
+    Aho-Corasick (pyahocorasick, em C): o texto é varrido numa única passada, com custo que
+    não cresce com o número de sinais. Cada sinal encontrado (por substring, como o `in`
+    anterior) soma seu peso ao grupo e à categoria do grupo, e vence a categoria de maior
+    score — empate fica com o grupo que aparece antes no arquivo. Resposta e confiança vêm
+    do grupo de maior score dentro da categoria vencedora; sem nenhum sinal, vale o `default`.
+    """
+
+    def __init__(self, rules: FallbackRules) -> None:
+        self._rules = rules
+
+        pattern_ids: Dict[str, int] = {}
+        # por sinal: [(grupo, peso)] — o mesmo sinal pode pontuar em mais de um grupo
+        self._weights: List[List[Tuple[int, float]]] = []
+        self._matcher = ahocorasick.Automaton()
+        for group_idx, group in enumerate(rules.groups):
+            for signal, weight in group.signals.items():
+                signal = signal.lower()
+                if not signal:
+                    raise ValueError(f"Sinal vazio no grupo '{group.name}' das regras do fallback.")
+                pattern_id = pattern_ids.get(signal)
+                if pattern_id is None:
+                    pattern_id = pattern_ids[signal] = len(self._weights)
+                    self._matcher.add_word(signal, pattern_id)
+                    self._weights.append([])
+                self._weights[pattern_id].append((group_idx, weight))
+        self._matcher.make_automaton()
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "HeuristicFallbackProvider":
+        raw = Path(path or DEFAULT_RULES_PATH).read_text(encoding="utf-8")
+        return cls(FallbackRules.model_validate_json(raw))
+
+    @staticmethod
+    @lru_cache
+    def default() -> "HeuristicFallbackProvider":
+        """Instância com as regras embutidas (compilada uma vez por processo)."""
+        return HeuristicFallbackProvider.from_file()
+
+    @property
+    def n_signals(self) -> int:
+        return len(self._weights)
+
     def classify_and_reply(self, text: str) -> Tuple[str, str, float]:
-        t = (text or "").lower()
-
-        auto_reply_signals = [
-            "out of office", "fora do escritório", "resposta automática", "no-reply", "do not reply"
-        ]
-
-        action_signals = [
-            "erro", "bug", "acesso", "senha", "falha", "incidente", "problema", "suporte",
-            "cobrança", "fatura", "pagamento", "reembolso", "cancelamento",
-            "permissão", "convite", "repositório", "github", "invite", "colaborador"
-        ]
-
-        marketing_signals = [
-            "newsletter", "promo", "desconto", "oferta", "black friday", "marketing", "campanha"
-        ]
-
-        if any(s in t for s in auto_reply_signals):
-            return ("Improdutivo", "Obrigado pelo aviso! Assim que você retornar, fico à disposição.", 0.70)
-
-        # ação antes de marketing
-        if any(s in t for s in action_signals):
-            return (
-                "Produtivo",
-                "Olá! Obrigado pelo contato. Para avançarmos, você pode compartilhar mais detalhes do pedido "
-                "(ex.: contexto, passos para reproduzir, mensagens de erro e desde quando ocorre)?",
-                0.62,
-            )
-
-        if any(s in t for s in marketing_signals):
-            return (
-                "Improdutivo",
-                "Olá! Obrigado por compartilhar. No momento, não tenho nenhuma ação necessária, mas agradeço o contato.",
-                0.65
-            )
-
-        return ("Improdutivo", "Olá! Obrigado pela mensagem. Se precisar de algo, fico à disposição.", 0.55)
+        groups = self._rules.groups
+        scores = self._scores(text)
+
+        by_category: Dict[str, float] = {}
+        for group, score in zip(groups, scores):
+            by_category[group.category] = by_category.get(group.category, 0.0) + score
+
+        best: Optional[int] = None
+        for idx, (group, score) in enumerate(zip(groups, scores)):
+            if score <= 0:
+                continue
+            if best is None or (by_category[group.category], score) > (
+                by_category[groups[best].category],
+                scores[best],
+            ):
+                best = idx
+
+        outcome: FallbackOutcome = self._rules.default if best is None else groups[best]
+        return (outcome.category, outcome.reply, outcome.confidence)
+
+    def template_reply(self, text: str, category: str) -> Optional[str]:
+        """
+        Resposta local (sem IA) para um email já classificado: a do grupo de maior score
+        dentro da categoria (ex.: resposta automática, marketing) ou a do `default`.
+        None se nenhuma regra tem resposta para a categoria.
+        """
+        best: Optional[Tuple[float, int]] = None
+        for idx, (group, score) in enumerate(zip(self._rules.groups, self._scores(text))):
+            if group.category == category and score > 0 and (best is None or score > best[0]):
+                best = (score, idx)
+
+        if best is not None:
+            return self._rules.groups[best[1]].reply
+        if self._rules.default.category == category:
+            return self._rules.default.reply
+        return None
+
+    def _scores(self, text: str) -> List[float]:
+        scores = [0.0] * len(self._rules.groups)
+        for pattern_id in self._signals_in((text or "").lower()):
+            for group_idx, weight in self._weights[pattern_id]:
+                scores[group_idx] += weight
+        return scores
+
+    def _signals_in(self, text: str) -> Set[int]:
+        """Ids dos sinais presentes no texto (cada um conta uma vez, por mais que se repita)."""
+        return {pattern_id for _, pattern_id in self._matcher.iter(text)}
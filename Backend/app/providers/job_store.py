@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Protocol
+
+JobStatus = str  # "queued" | "running" | "succeeded" | "failed" | "cancelled"
+
+TERMINAL_STATUSES = frozenset({"succeeded", "failed", "cancelled"})
+
+
+@dataclass(frozen=True)
+class JobRecord:
+    id: str
+    status: JobStatus
+    kind: str  # "text" | "file"
+    owner: str  # "host:pid" do processo que executa o job
+    created_at: float
+    filename: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    cancel_requested: bool = False
+
+
+class JobStore(Protocol):
+    """
+    Estado dos jobs (o que o cliente consulta). A fila/execução é do processo dono;
+    o store só precisa ser compartilhado se vários workers respondem o polling.
+    """
+
+    def create(self, record: JobRecord) -> None:
+        ...
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        ...
+
+    def mark_running(self, job_id: str, started_at: float) -> bool:
+        """queued -> running. False se o job não está mais na fila (ex.: cancelado)."""
+        ...
+
+    def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        finished_at: float,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        ...
+
+    def request_cancel(self, job_id: str, now: float) -> Optional[JobRecord]:
+        """queued -> cancelled; running -> cancel_requested (o dono cancela)."""
+        ...
+
+    def purge_finished(self, older_than: float) -> int:
+        ...
+
+
+class InMemoryJobStore:
+    """Store padrão: dict por processo (polling precisa cair no mesmo worker)."""
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, JobRecord] = {}
+        self._lock = threading.Lock()
+
+    def create(self, record: JobRecord) -> None:
+        with self._lock:
+            self._jobs[record.id] = record
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def mark_running(self, job_id: str, started_at: float) -> bool:
+        with self._lock:
+            rec = self._jobs.get(job_id)
+            if rec is None or rec.status != "queued":
+                return False
+            self._jobs[job_id] = replace(rec, status="running", started_at=started_at)
+            return True
+
+    def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        finished_at: float,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        with self._lock:
+            rec = self._jobs.get(job_id)
+            if rec is None or rec.status in TERMINAL_STATUSES:
+                return
+            self._jobs[job_id] = replace(rec, status=status, finished_at=finished_at, result=result, error=error)
+
+    def request_cancel(self, job_id: str, now: float) -> Optional[JobRecord]:
+        with self._lock:
+            rec = self._jobs.get(job_id)
+            if rec is None or rec.status in TERMINAL_STATUSES:
+                return rec
+            if rec.status == "queued":
+                rec = replace(rec, status="cancelled", finished_at=now, cancel_requested=True)
+            else:
+                rec = replace(rec, cancel_requested=True)
+            self._jobs[job_id] = rec
+            return rec
+
+    def purge_finished(self, older_than: float) -> int:
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, rec in self._jobs.items()
+                if rec.finished_at is not None and rec.finished_at < older_than
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+            return len(expired)
+
+
+class SqliteJobStore:
+    """
+    Store compartilhado entre workers do gunicorn (mesmo host) via SQLite em WAL:
+    leituras não bloqueiam escritas e as transições de estado são atômicas (UPDATE ... WHERE status).
+    Uma conexão por thread (sqlite3 não compartilha conexões entre threads por padrão).
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            filename TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            result_json TEXT,
+            error_json TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS ix_jobs_finished_at ON jobs (finished_at);
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000) -> None:
+        self._path = path
+        self._busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.executescript(self._SCHEMA)
+
+    def create(self, record: JobRecord) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, kind, owner, filename, created_at, cancel_requested) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (record.id, record.status, record.kind, record.owner, record.filename, record.created_at),
+            )
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def mark_running(self, job_id: str, started_at: float) -> bool:
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+                (started_at, job_id),
+            )
+            return cur.rowcount == 1
+
+    def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        finished_at: float,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result_json = ?, error_json = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (
+                    status,
+                    finished_at,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    json.dumps(error, ensure_ascii=False) if error is not None else None,
+                    job_id,
+                ),
+            )
+
+    def request_cancel(self, job_id: str, now: float) -> Optional[JobRecord]:
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, cancel_requested = 1 "
+                "WHERE id = ? AND status = 'queued'",
+                (now, job_id),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'",
+                (job_id,),
+            )
+        return self.get(job_id)
+
+    def purge_finished(self, older_than: float) -> int:
+        with self._conn() as conn:
+            cur = conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (older_than,),
+            )
+            return cur.rowcount
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=self._busy_timeout_ms / 1000)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _to_record(self, row: sqlite3.Row) -> JobRecord:
+        return JobRecord(
+            id=row["id"],
+            status=row["status"],
+            kind=row["kind"],
+            owner=row["owner"],
+            filename=row["filename"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            result=json.loads(row["result_json"]) if row["result_json"] else None,
+            error=json.loads(row["error_json"]) if row["error_json"] else None,
+            cancel_requested=bool(row["cancel_requested"]),
+        )
+
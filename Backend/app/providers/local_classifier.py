@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import math
+import os
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Sequence
+
+import numpy as np
+
+# classe positiva do modelo logístico (a outra é "Improdutivo")
+POSITIVE_CATEGORY = "Produtivo"
+NEGATIVE_CATEGORY = "Improdutivo"
+
+# Artefato: cabeçalho fixo de 64 bytes + float32 little-endian (n_features pesos + bias)
+#   magic | versão do formato | versão das features | n_features | amostras de treino | flags
+ARTIFACT_MAGIC = b"IQLCLF\x00\x00"
+ARTIFACT_VERSION = 1
+# muda sempre que `feature_indices` mudar: pesos antigos deixam de fazer sentido
+FEATURE_VERSION = 1
+# treinado sobre o texto do `EmailCleaner` (artefatos antigos têm o campo zerado: sem limpeza)
+FLAG_CLEANED = 1
+_HEADER = struct.Struct("<8sHHIQH")
+HEADER_SIZE = 64
+
+
+def save_artifact(path: str, weights: np.ndarray, *, n_samples: int = 0, cleaned: bool = False) -> None:
+    """Grava o artefato (arquivo temporário + rename: workers nunca leem um arquivo pela metade)."""
+    weights = np.ascontiguousarray(weights, dtype="<f4")
+    flags = FLAG_CLEANED if cleaned else 0
+    header = _HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, FEATURE_VERSION, weights.shape[0] - 1, n_samples, flags)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\x00"))
+        f.write(weights.tobytes())
+    os.replace(tmp, path)
+
+
+def load_artifact(path: str, *, cleaned: Optional[bool] = None) -> np.ndarray:
+    """
+    Pesos do artefato via mmap (somente leitura; páginas compartilhadas entre processos).
+    `cleaned` (se informado): o serviço limpa o texto antes do NLP; o artefato precisa ter sido
+    treinado do mesmo jeito, senão as features do treino e as do serviço não batem.
+    """
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise ValueError("Artefato do classificador local truncado.")
+
+    magic, version, feature_version, n_features, _, flags = _HEADER.unpack(raw)
+    if magic != ARTIFACT_MAGIC:
+        raise ValueError("Arquivo não é um artefato do classificador local.")
+    if version != ARTIFACT_VERSION or feature_version != FEATURE_VERSION:
+        raise ValueError(
+            f"Artefato do classificador local incompatível (formato {version}, features {feature_version}; "
+            f"esperado formato {ARTIFACT_VERSION}, features {FEATURE_VERSION}). Treine de novo."
+        )
+    trained_cleaned = bool(flags & FLAG_CLEANED)
+    if cleaned is not None and trained_cleaned != cleaned:
+        raise ValueError(
+            f"Artefato do classificador local treinado {'com' if trained_cleaned else 'sem'} o EmailCleaner, "
+            f"mas EMAIL_CLEANER_ENABLED={'true' if cleaned else 'false'}. Treine de novo."
+        )
+    expected = HEADER_SIZE + (n_features + 1) * 4
+    if os.path.getsize(path) != expected:
+        raise ValueError("Tamanho do artefato do classificador local não confere com o cabeçalho.")
+
+    return np.memmap(path, dtype="<f4", mode="r", offset=HEADER_SIZE, shape=(n_features + 1,))
+
+
+def feature_indices(lemmas: Sequence[str], n_features: int) -> np.ndarray:
+    """
+    Features hasheadas (presença) de unigramas e bigramas de lemas.
+
+    Hash estável entre processos (crc32, não o `hash()` do Python), para o treino offline
+    e o serviço enxergarem os mesmos índices.
+    """
+    grams = list(lemmas)
+    grams.extend(f"{a} {b}" for a, b in zip(lemmas, lemmas[1:]))
+    idx = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint32, count=len(grams))
+    return np.unique(idx % np.uint32(n_features))
+
+
+@dataclass(frozen=True)
+class LocalDecision:
+    category: str
+    confidence: float
+
+
+class LocalClassifier:
+    """
+    Classificador local (regressão logística sobre features hasheadas dos lemas do `NlpPreprocess`).
+
+    Decide em microssegundos; só "responde sozinho" quando a confiança passa de `threshold`
+    e a categoria está em `categories` (categorias em que a resposta padrão basta —
+    por padrão só `Improdutivo`: newsletters, agradecimentos, avisos). O resto vai para a IA.
+
+    Pesos: vetor float32 de `n_features + 1` posições (a última é o bias); em produção vem do
+    artefato gerado por `tools/train_local_classifier.py`, lido via mmap.
+    """
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        *,
+        threshold: float,
+        categories: Iterable[str] = (NEGATIVE_CATEGORY,),
+        min_lemmas: int = 3,
+    ) -> None:
+        if weights.ndim != 1 or weights.shape[0] < 2:
+            raise ValueError("Pesos do classificador local inválidos.")
+
+        self._coef = weights[:-1]
+        self._bias = float(weights[-1])
+        self._n_features = int(self._coef.shape[0])
+        self._threshold = threshold
+        self._categories: FrozenSet[str] = frozenset(categories)
+        self._min_lemmas = min_lemmas
+
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._answered = 0
+
+    @classmethod
+    def load(cls, path: str, *, cleaned: Optional[bool] = None, **kwargs: Any) -> "LocalClassifier":
+        # mmap: os workers do gunicorn compartilham as páginas do arquivo (page cache)
+        return cls(load_artifact(path, cleaned=cleaned), **kwargs)
+
+    @property
+    def n_features(self) -> int:
+        return self._n_features
+
+    def predict(self, lemmas: Sequence[str]) -> LocalDecision:
+        idx = feature_indices(lemmas, self._n_features)
+        score = self._bias + float(self._coef[idx].sum())
+        p = 1.0 / (1.0 + math.exp(-max(-60.0, min(60.0, score))))
+        if p >= 0.5:
+            return LocalDecision(category=POSITIVE_CATEGORY, confidence=round(p, 4))
+        return LocalDecision(category=NEGATIVE_CATEGORY, confidence=round(1.0 - p, 4))
+
+    def decide(self, lemmas: Sequence[str], *, reply_needed: bool = True) -> Optional[LocalDecision]:
+        """
+        Decisão local se for confiável o bastante para dispensar a IA; senão None.
+        Sem resposta a gerar (`reply_needed=False`, modo só-classificação), vale qualquer categoria.
+        """
+        decision = None
+        if len(lemmas) >= self._min_lemmas:
+            predicted = self.predict(lemmas)
+            if predicted.confidence >= self._threshold and (
+                not reply_needed or predicted.category in self._categories
+            ):
+                decision = predicted
+
+        with self._lock:
+            self._lookups += 1
+            if decision is not None:
+                self._answered += 1
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups, answered = self._lookups, self._answered
+        return {
+            "lookups": lookups,
+            "answered": answered,
+            "escalated": lookups - answered,
+            "offload_ratio": round(answered / lookups, 4) if lookups else 0.0,
+            "threshold": self._threshold,
+            "categories": sorted(self._categories),
+        }
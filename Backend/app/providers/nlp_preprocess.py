@@ -1,15 +1,35 @@
 from __future__ import annotations
 
+import logging
+import math
+import multiprocessing
 import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
-from typing import List, Literal
+from functools import lru_cache, partial
+from typing import Dict, Iterator, List, Literal, Optional, Sequence, Tuple
 
 import simplemma
 from stopwordsiso import stopwords
 
+logger = logging.getLogger(__name__)
 
 Lang = Literal["pt", "en"]
 
+_WS_RE = re.compile(r"\s+")
+# tokens alfanuméricos (com acentos) e alguns símbolos comuns em emails
+_TOKEN_RE = re.compile(r"[A-Za-zÀ-ÿ0-9_@.\-]+")
+_LETTERS_RE = re.compile(r"[A-Za-zÀ-ÿ]+")
+_HAS_LETTER_RE = re.compile(r"[a-zà-ÿ]")
+
+KEYWORD_LIMIT = 25
+
+TruncationReason = Literal["keywords", "chars", "cpu"]
+
 
 @dataclass(frozen=True)
 class NlpOutput:
@@ -18,6 +38,27 @@ class NlpOutput:
     lang: Lang
     lemmas: List[str]
     keywords: List[str]
+    # modo com orçamento: o texto não foi processado inteiro (e por quê)
+    truncated: bool = False
+    truncation_reason: Optional[TruncationReason] = None
+
+
+@dataclass(frozen=True)
+class NlpBudget:
+    """
+    Orçamento para textos grandes (ex.: PDFs extraídos). Acima de `max_chars`, o `run`
+    troca o processamento completo por um streaming limitado:
+    - idioma estimado só por uma amostra do início (`lang_sample_chars`)
+    - tokens/lemas gerados em blocos de `chunk_chars` (sem cópia minúscula do texto inteiro)
+    - para ao completar as keywords, ao chegar em `max_chars` ou ao gastar `max_cpu_ms`
+
+    Memória e latência ficam limitadas pelo orçamento, não pelo tamanho da entrada.
+    """
+
+    max_chars: int = 200_000
+    max_cpu_ms: float = 200.0
+    lang_sample_chars: int = 8192
+    chunk_chars: int = 16_384
 
 
 class NlpPreprocess:
@@ -28,76 +69,221 @@ class NlpPreprocess:
 
     Observação: usamos o texto original para a IA responder com fluidez
     e enviamos keywords/lemmas como "sinais" auxiliares.
+
+    Desempenho: uma única tokenização alimenta a detecção de idioma e a lematização;
+    cada token distinto é resolvido uma vez por texto e o resultado (lema, placeholder
+    ou descarte) fica num cache LRU por idioma — vocabulário de email é muito repetitivo.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        lemma_cache_size: int = 50_000,
+        budget: Optional[NlpBudget] = None,
+        *,
+        pool_workers: int = 0,
+        pool_min_batch: int = 8,
+        pool_chunk_size: Optional[int] = None,
+    ) -> None:
         self._stop_pt = stopwords("pt")
         self._stop_en = stopwords("en")
+        self._budget = budget
+        self._lemma_cache_size = lemma_cache_size
+
+        # `run_many`: pool de processos persistente (criado no primeiro lote grande)
+        self._pool_workers = max(0, pool_workers)
+        self._pool_min_batch = max(1, pool_min_batch)
+        self._pool_chunk_size = pool_chunk_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+        # token -> lema/placeholder (None = descartado), um cache limitado por idioma
+        self._resolve_pt = lru_cache(maxsize=lemma_cache_size)(partial(self._resolve, lang="pt"))
+        self._resolve_en = lru_cache(maxsize=lemma_cache_size)(partial(self._resolve, lang="en"))
+
+        # simplemma carrega os dicionários sob demanda (~1s): carrega já, não na primeira requisição
+        self._lemmatize("teste", "pt")
+        self._lemmatize("test", "en")
 
     def run(self, text: str) -> NlpOutput:
         raw = (text or "").strip()
-        normalized = self._normalize(raw)
+        if self._budget is not None and len(raw) > self._budget.max_chars:
+            return self._run_budgeted(raw, self._budget)
 
-        lang = self._guess_lang(normalized)
+        normalized = self._normalize(raw)
 
-        # Tokenização simples (evita dependências)
+        # Tokenização simples (evita dependências), feita uma vez só
         tokens = self._tokenize(normalized)
+        counts = Counter(tokens)
 
-        # Stopwords + Lemmatização
-        lemmas: List[str] = []
-        for tok in tokens:
-            if self._is_url(tok):
-                lemmas.append("<url>")
-                continue
-            if self._is_email(tok):
-                lemmas.append("<email>")
-                continue
-            if tok.isdigit():
-                lemmas.append("<num>")
-                continue
+        lang = self._guess_lang(counts)
 
-            if self._is_stopword(tok, lang):
-                continue
+        # Stopwords + Lemmatização (por token distinto)
+        resolve = self._resolve_en if lang == "en" else self._resolve_pt
+        resolved: Dict[str, Optional[str]] = {tok: resolve(tok) for tok in counts}
+        lemmas: List[str] = [lemma for lemma in map(resolved.__getitem__, tokens) if lemma is not None]
 
-            lemma = self._lemmatize(tok, lang)
-            lemma = lemma.lower().strip()
+        keywords = self._unique_first(lemmas, limit=KEYWORD_LIMIT)
 
-            if len(lemma) < 3:
-                continue
-            if not re.search(r"[a-zà-ÿ]", lemma):
-                continue
+        return NlpOutput(
+            raw_text=raw,
+            normalized_text=normalized,
+            lang=lang,
+            lemmas=lemmas,
+            keywords=keywords,
+        )
+
+    def run_many(self, texts: Sequence[str], chunk_size: Optional[int] = None) -> List[NlpOutput]:
+        """
+        `run` para vários textos, na ordem da entrada. NLP é Python puro (CPU + GIL), então
+        lotes grandes vão para o pool de processos (`pool_workers`); lotes pequenos (menos de
+        `pool_min_batch`) rodam aqui mesmo, onde o custo de IPC dominaria.
+        """
+        if self._pool_workers == 0 or len(texts) < self._pool_min_batch:
+            return [self.run(text) for text in texts]
+
+        chunk = chunk_size or self._pool_chunk_size or max(1, math.ceil(len(texts) / (self._pool_workers * 4)))
+        try:
+            return list(self._get_pool().map(_run_in_worker, texts, chunksize=chunk))
+        except BrokenProcessPool:
+            # processo filho morreu (OOM/kill): recria o pool na próxima e resolve este lote aqui
+            logger.warning("nlp_pool_broken", extra={"event": "nlp_pool_broken"})
+            self._shutdown_pool(wait=False)
+            return [self.run(text) for text in texts]
+
+    def close(self) -> None:
+        self._shutdown_pool(wait=True)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: o worker do uvicorn tem threads/event loop, fork não é seguro
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._pool_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self._lemma_cache_size, self._budget),
+                )
+            return self._pool
 
-            lemmas.append(lemma)
+    def _shutdown_pool(self, wait: bool) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
 
-        keywords = self._unique_first(lemmas, limit=25)
+    # ---------------------------
+    # Modo com orçamento (textos grandes)
+    # ---------------------------
+    def _run_budgeted(self, raw: str, budget: NlpBudget) -> NlpOutput:
+        sample = self._tokenize(self._normalize(raw[: budget.lang_sample_chars]))
+        lang = self._guess_lang(Counter(sample))
+
+        lemmas: List[str] = []
+        keywords: List[str] = []
+        seen = set()
+        reason: Optional[TruncationReason] = None
+        consumed = 0
+
+        cpu_limit = time.thread_time() + budget.max_cpu_ms / 1000
+        for i, (lemma, end) in enumerate(self._iter_lemmas(raw, lang, budget)):
+            consumed = end
+            if lemma is not None:
+                lemmas.append(lemma)
+                if lemma not in seen:
+                    seen.add(lemma)
+                    keywords.append(lemma)
+                    if len(keywords) >= KEYWORD_LIMIT:
+                        reason = "keywords"
+                        break
+            # thread_time: só CPU desta thread (o NLP roda em thread no caminho async)
+            if i % 256 == 255 and time.thread_time() > cpu_limit:
+                reason = "cpu"
+                break
+        else:
+            consumed = min(len(raw), budget.max_chars)
+            if consumed < len(raw):
+                reason = "chars"
+
+        if reason is not None and consumed >= len(raw):
+            reason = None  # parou exatamente no fim do texto
 
         return NlpOutput(
             raw_text=raw,
-            normalized_text=normalized,
+            # só o trecho processado (não duplica o texto inteiro)
+            normalized_text=self._normalize(raw[:consumed]),
             lang=lang,
             lemmas=lemmas,
             keywords=keywords,
+            truncated=reason is not None,
+            truncation_reason=reason,
         )
 
+    def _iter_lemmas(self, raw: str, lang: Lang, budget: NlpBudget) -> Iterator[Tuple[Optional[str], int]]:
+        """(lema | None se descartado, posição final do token no texto) — na ordem do texto."""
+        resolve = self._resolve_en if lang == "en" else self._resolve_pt
+        for tok, end in self._iter_tokens(raw, budget):
+            yield resolve(tok), end
+
+    def _iter_tokens(self, raw: str, budget: NlpBudget) -> Iterator[Tuple[str, int]]:
+        """Tokens (minúsculos) de `raw[:max_chars]`, um bloco por vez."""
+        limit = min(len(raw), budget.max_chars)
+        pos = 0
+        while pos < limit:
+            stop = min(pos + budget.chunk_chars, limit)
+            chunk = raw[pos:stop].lower()
+            # lower() raramente muda o tamanho (ex.: "İ"); aí as posições deixam de bater
+            aligned = len(chunk) == stop - pos
+            next_pos = stop
+            for m in _TOKEN_RE.finditer(chunk):
+                if aligned and m.end() == len(chunk) and stop < limit and m.start() > 0:
+                    # token cortado pelo fim do bloco: recomeça o próximo bloco nele
+                    next_pos = pos + m.start()
+                    break
+                yield m.group(), pos + m.end()
+            pos = next_pos
+
     def _normalize(self, text: str) -> str:
         t = text.strip()
-        t = re.sub(r"\s+", " ", t)
+        t = _WS_RE.sub(" ", t)
         return t
 
     def _tokenize(self, text: str) -> List[str]:
-        # tokens alfanuméricos (com acentos) e alguns símbolos comuns em emails
-        return re.findall(r"[A-Za-zÀ-ÿ0-9_@.\-]+", text.lower())
+        return _TOKEN_RE.findall(text.lower())
 
-    def _guess_lang(self, text: str) -> Lang:
-        # Heurística leve usando stopwords:
-        toks = re.findall(r"[A-Za-zÀ-ÿ]+", text.lower())
-        if not toks:
-            return "pt"
-
-        en_hits = sum(1 for t in toks if t in self._stop_en)
-        pt_hits = sum(1 for t in toks if t in self._stop_pt)
+    def _guess_lang(self, counts: Counter) -> Lang:
+        # Heurística leve usando stopwords, sobre as sequências de letras dos tokens
+        # (toda sequência de letras do texto está dentro de exatamente um token)
+        en_hits = 0
+        pt_hits = 0
+        for tok, n in counts.items():
+            words = (tok,) if tok.isalpha() else _LETTERS_RE.findall(tok)
+            for w in words:
+                if w in self._stop_en:
+                    en_hits += n
+                if w in self._stop_pt:
+                    pt_hits += n
         return "en" if en_hits > pt_hits else "pt"
 
+    def _resolve(self, tok: str, lang: Lang) -> Optional[str]:
+        if self._is_url(tok):
+            return "<url>"
+        if self._is_email(tok):
+            return "<email>"
+        if tok.isdigit():
+            return "<num>"
+
+        if self._is_stopword(tok, lang):
+            return None
+
+        lemma = self._lemmatize(tok, lang)
+        lemma = lemma.lower().strip()
+
+        if len(lemma) < 3:
+            return None
+        if not _HAS_LETTER_RE.search(lemma):
+            return None
+        return lemma
+
     def _is_stopword(self, token: str, lang: Lang) -> bool:
         return token in (self._stop_en if lang == "en" else self._stop_pt)
 
@@ -125,3 +311,19 @@ class NlpPreprocess:
 
     def _is_email(self, token: str) -> bool:
         return "@" in token and "." in token
+
+
+# ---------------------------
+# Processos do pool (`run_many`)
+# ---------------------------
+_worker_nlp: Optional[NlpPreprocess] = None
+
+
+def _init_worker(lemma_cache_size: int, budget: Optional[NlpBudget]) -> None:
+    # uma vez por processo filho: stopwords + dicionários do simplemma ficam carregados
+    global _worker_nlp
+    _worker_nlp = NlpPreprocess(lemma_cache_size=lemma_cache_size, budget=budget)
+
+
+def _run_in_worker(text: str) -> NlpOutput:
+    return _worker_nlp.run(text)
@@ -1,44 +1,207 @@
 from __future__ import annotations
 
-from typing import Tuple, Literal, Sequence
+import asyncio
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Tuple, Literal, Sequence, Type, TypeVar
 from pydantic import BaseModel, Field
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from openai import RateLimitError, APIConnectionError, APITimeoutError, AuthenticationError
 
-from app.providers.ai_provider import AiProvider
+from app.providers.ai_provider import AiProvider, ReplyStreamEvent
+from app.providers.structured_stream import StreamedObjectParser
 from app.services.prompt_policy import PromptPolicy
 
 EmailCategory = Literal["Produtivo", "Improdutivo"]
 
+ParsedT = TypeVar("ParsedT", bound=BaseModel)
+
+# acima disso a compactação do prompt (PromptPolicy) roda em thread, fora do event loop
+_OFFLOAD_PROMPT_CHARS = 20_000
+
 class ModelResult(BaseModel):
     category: EmailCategory
     suggested_reply: str = Field(min_length=1)
     confidence: float = Field(ge=0, le=1)
 
+
+class ClassificationResult(BaseModel):
+    # saída mínima do modo só-classificação (poucos tokens de saída)
+    category: EmailCategory
+    confidence: float = Field(ge=0, le=1)
+
+
+class PackedClassificationItem(BaseModel):
+    index: int = Field(ge=0)
+    category: EmailCategory
+    confidence: float = Field(ge=0, le=1)
+
+
+class PackedClassificationResult(BaseModel):
+    # vários emails numa chamada: um item por email, casado pelo índice do prompt
+    items: List[PackedClassificationItem]
+
+
+class ReplyResult(BaseModel):
+    suggested_reply: str = Field(min_length=1)
+
+
+class StreamModelResult(BaseModel):
+    # ordem importa: o modelo gera as chaves nesta ordem, então categoria/confiança
+    # chegam antes da resposta e podem ser enviadas ao cliente imediatamente
+    category: EmailCategory
+    confidence: float = Field(ge=0, le=1)
+    suggested_reply: str = Field(min_length=1)
+
+
+class _StreamState:
+    """Converte deltas do structured output em `ReplyStreamEvent` (compartilhado sync/async)."""
+
+    def __init__(self) -> None:
+        self._parser = StreamedObjectParser(stream_field="suggested_reply")
+        self._classified = False
+
+    def on_delta(self, raw_delta: str) -> List[ReplyStreamEvent]:
+        events: List[ReplyStreamEvent] = []
+        delta = self._parser.feed(raw_delta)
+        fields = self._parser.fields
+
+        if not self._classified and "category" in fields and "confidence" in fields:
+            self._classified = True
+            events.append(
+                ReplyStreamEvent(kind="classification", category=fields["category"], confidence=fields["confidence"])
+            )
+
+        if delta:
+            events.append(ReplyStreamEvent(kind="delta", text=delta))
+        return events
+
+    def done(self, parsed: StreamModelResult) -> ReplyStreamEvent:
+        return ReplyStreamEvent(
+            kind="done",
+            category=parsed.category,
+            confidence=float(parsed.confidence),
+            text=parsed.suggested_reply,
+        )
+
+
 class OpenAiEmailProvider(AiProvider):
-    def __init__(self, api_key: str, model: str, policy: PromptPolicy) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        policy: PromptPolicy,
+        classify_model: Optional[str] = None,
+    ) -> None:
         self._client = OpenAI(api_key=api_key)
+        # cliente async: chamadas em voo esperam no event loop, sem prender thread
+        self._async_client = AsyncOpenAI(api_key=api_key)
         self._model = model
+        # modo só-classificação: modelo menor/mais rápido (padrão: o mesmo do classify_and_reply)
+        self._classify_model = classify_model or model
         self._policy = policy
 
     def classify_and_reply(self, text: str, keywords: Sequence[str]) -> Tuple[str, str, float]:
-        system = self._policy.build_system()
-        user = self._policy.build_user(text, list(keywords))
-        ...
+        parsed = self._parse(self._model, self._input(text, keywords), ModelResult)
+        return (parsed.category, parsed.suggested_reply, float(parsed.confidence))
+
+    async def classify_and_reply_async(self, text: str, keywords: Sequence[str]) -> Tuple[str, str, float]:
+        """Mesmo contrato (e retry) de `classify_and_reply`, via AsyncOpenAI."""
+        messages = await self._build_async(self._input, text, keywords)
+        parsed = await self._parse_async(self._model, messages, ModelResult)
+        return (parsed.category, parsed.suggested_reply, float(parsed.confidence))
+
+    def classify(self, text: str, keywords: Sequence[str]) -> Tuple[str, float]:
+        """Só categoria + confiança, no modelo de classificação (sem gerar resposta)."""
+        parsed = self._parse(self._classify_model, self._classify_input(text, keywords), ClassificationResult)
+        return (parsed.category, float(parsed.confidence))
 
+    async def classify_async(self, text: str, keywords: Sequence[str]) -> Tuple[str, float]:
+        messages = await self._build_async(self._classify_input, text, keywords)
+        parsed = await self._parse_async(self._classify_model, messages, ClassificationResult)
+        return (parsed.category, float(parsed.confidence))
+
+    async def classify_many_async(
+        self, items: Sequence[Tuple[str, Sequence[str]]]
+    ) -> List[Optional[Tuple[str, float]]]:
+        """
+        Vários emails curtos numa chamada (modelo de classificação): system prompt, rede e
+        fila pagos uma vez. Índice ausente ou repetido na saída vira None (o chamador refaz).
+        """
+        messages = [
+            {"role": "system", "content": self._policy.build_packed_classify_system()},
+            {"role": "user", "content": self._policy.build_packed_user([(t, list(k)) for t, k in items])},
+        ]
+        parsed = await self._parse_async(self._classify_model, messages, PackedClassificationResult)
+
+        out: List[Optional[Tuple[str, float]]] = [None] * len(items)
+        seen: set[int] = set()
+        for item in parsed.items:
+            if item.index >= len(items) or item.index in seen:
+                # repetido: nenhuma das respostas é confiável
+                if item.index < len(items):
+                    out[item.index] = None
+                continue
+            seen.add(item.index)
+            out[item.index] = (item.category, float(item.confidence))
+        return out
+
+    def generate_reply(self, text: str, keywords: Sequence[str], category: str) -> str:
+        """Resposta sob demanda para um email já classificado (modelo principal)."""
+        parsed = self._parse(self._model, self._reply_input(text, keywords, category), ReplyResult)
+        return parsed.suggested_reply
+
+    async def generate_reply_async(self, text: str, keywords: Sequence[str], category: str) -> str:
+        messages = await self._build_async(self._reply_input, text, keywords, category)
+        parsed = await self._parse_async(self._model, messages, ReplyResult)
+        return parsed.suggested_reply
+
+    def stream_classify_and_reply(self, text: str, keywords: Sequence[str]) -> Iterator[ReplyStreamEvent]:
+        """
+        Mesmo contrato de `classify_and_reply`, mas em streaming:
+        emite a classificação assim que o JSON traz categoria+confiança e depois
+        a resposta em deltas. Sem retry (parte da resposta pode já ter sido enviada).
+        """
+        state = _StreamState()
+
+        with self._client.responses.stream(
+            model=self._model,
+            input=self._input(text, keywords),
+            text_format=StreamModelResult,
+        ) as stream:
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield from state.on_delta(event.delta)
+
+            parsed: StreamModelResult = stream.get_final_response().output_parsed
+
+        yield state.done(parsed)
+
+    async def stream_classify_and_reply_async(
+        self, text: str, keywords: Sequence[str]
+    ) -> AsyncIterator[ReplyStreamEvent]:
+        """Versão async de `stream_classify_and_reply` (AsyncOpenAI)."""
+        state = _StreamState()
+
+        messages = await self._build_async(self._input, text, keywords)
+        async with self._async_client.responses.stream(
+            model=self._model,
+            input=messages,
+            text_format=StreamModelResult,
+        ) as stream:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    for out in state.on_delta(event.delta):
+                        yield out
+
+            parsed: StreamModelResult = (await stream.get_final_response()).output_parsed
+
+        yield state.done(parsed)
+
+    def _parse(self, model: str, messages: list[dict[str, str]], text_format: Type[ParsedT]) -> ParsedT:
         last_exc: Exception | None = None
         for _ in range(2):  # 2 tentativas (simples e suficiente no MVP)
             try:
-                resp = self._client.responses.parse(
-                    model=self._model,
-                    input=[
-                        {"role": "system", "content": system},
-                        {"role": "user", "content": user},
-                    ],
-                    text_format=ModelResult,
-                )
-                parsed: ModelResult = resp.output_parsed
-                return (parsed.category, parsed.suggested_reply, float(parsed.confidence))
+                resp = self._client.responses.parse(model=model, input=messages, text_format=text_format)
+                return resp.output_parsed
 
             except (RateLimitError, APIConnectionError, APITimeoutError) as e:
                 last_exc = e
@@ -48,3 +211,47 @@ class OpenAiEmailProvider(AiProvider):
 
         # deixa a camada de serviço decidir fallback
         raise last_exc or RuntimeError("Falha desconhecida ao consultar OpenAI.")
+
+    async def _parse_async(
+        self, model: str, messages: list[dict[str, str]], text_format: Type[ParsedT]
+    ) -> ParsedT:
+        last_exc: Exception | None = None
+        for _ in range(2):
+            try:
+                resp = await self._async_client.responses.parse(model=model, input=messages, text_format=text_format)
+                return resp.output_parsed
+
+            except (RateLimitError, APIConnectionError, APITimeoutError) as e:
+                last_exc = e
+                continue
+            except AuthenticationError as e:
+                raise e
+
+        raise last_exc or RuntimeError("Falha desconhecida ao consultar OpenAI.")
+
+    async def _build_async(
+        self, build: Callable[..., list[dict[str, str]]], text: str, *args: Any
+    ) -> list[dict[str, str]]:
+        if len(text) > _OFFLOAD_PROMPT_CHARS:
+            return await asyncio.to_thread(build, text, *args)
+        return build(text, *args)
+
+    def _input(self, text: str, keywords: Sequence[str]) -> list[dict[str, str]]:
+        system = self._policy.build_system()
+        user = self._policy.build_user(text, list(keywords))
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+
+    def _classify_input(self, text: str, keywords: Sequence[str]) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": self._policy.build_classify_system()},
+            {"role": "user", "content": self._policy.build_user(text, list(keywords))},
+        ]
+
+    def _reply_input(self, text: str, keywords: Sequence[str], category: str) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": self._policy.build_system()},
+            {"role": "user", "content": self._policy.build_reply_user(text, list(keywords), category)},
+        ]
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Literal, Optional
+
+logger = logging.getLogger(__name__)
+
+SandboxFailure = Literal["timeout", "memory", "crash"]
+
+# código de saída do processo filho quando o watchdog de memória o encerra
+_EXIT_MEMORY = 86
+_WATCHDOG_INTERVAL_S = 0.05
+
+_MESSAGES: Dict[str, str] = {
+    "timeout": "Não foi possível processar o PDF: tempo limite de extração excedido.",
+    "memory": "Não foi possível processar o PDF: limite de memória da extração excedido.",
+    "crash": "Não foi possível processar o PDF: o processo de extração falhou.",
+}
+
+
+class PdfSandboxError(Exception):
+    """Extração abortada pelo sandbox (tempo, memória ou queda do processo filho)."""
+
+    def __init__(self, reason: SandboxFailure) -> None:
+        super().__init__(_MESSAGES[reason])
+        self.reason = reason
+        self.message = _MESSAGES[reason]
+
+
+@dataclass
+class _Worker:
+    process: Any  # multiprocessing.Process (contexto spawn)
+    conn: Connection
+    tasks: int = 0
+
+
+class PdfSandbox:
+    """
+    Processos filhos dedicados ao parsing de PDFs (entrada não confiável: pypdf pode girar
+    por minutos ou alocar gigabytes num arquivo patológico/malicioso).
+
+    - `workers` processos (spawn), cada um executa uma tarefa por vez
+    - prazo por documento (`timeout_s`, relógio de parede): estourou, o processo é morto e
+      substituído — a thread que espera é liberada na hora, ao contrário do `to_thread`
+    - watchdog de RSS dentro do filho (`max_rss_mb`): acima do limite, o processo sai
+    - reciclagem a cada `max_tasks_per_child` tarefas (memória fragmentada/caches do pypdf)
+
+    Falhas viram `PdfSandboxError`; exceções comuns da extração (PDF inválido) são
+    repassadas como estão. O processo do gunicorn nunca executa o parsing.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 2,
+        timeout_s: float = 20.0,
+        max_rss_mb: int = 512,
+        max_tasks_per_child: int = 50,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.timeout_s = timeout_s
+        self._max_rss_bytes = max_rss_mb * 1024 * 1024 if max_rss_mb > 0 else 0
+        self._max_tasks = max(1, max_tasks_per_child)
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._idle: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+
+        self._tasks = 0
+        self._failures: Dict[str, int] = {"timeout": 0, "memory": 0, "crash": 0}
+        self._recycled = 0
+
+    def new_deadline(self) -> float:
+        """Prazo (time.monotonic) para um documento; todas as tarefas dele o compartilham."""
+        return time.monotonic() + self.timeout_s
+
+    def call(self, fn: Callable[..., Any], *args: Any, deadline: float) -> Any:
+        """Executa `fn(*args)` num processo do sandbox (bloqueia até o resultado ou o prazo)."""
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            # todos os processos ocupados até o prazo deste documento
+            self._fail("timeout", None)
+        try:
+            worker = self._checkout()
+            try:
+                worker.conn.send((fn, args))
+                ready = worker.conn.poll(max(0.0, deadline - time.monotonic()))
+                if not ready:
+                    self._fail("timeout", worker)
+                status, payload, retire = worker.conn.recv()
+            except (EOFError, OSError):
+                worker.process.join(timeout=1)
+                reason: SandboxFailure = "memory" if worker.process.exitcode == _EXIT_MEMORY else "crash"
+                self._fail(reason, worker)
+
+            worker.tasks += 1
+            self._checkin(worker, retire)
+        finally:
+            self._slots.release()
+
+        if status == "error":
+            raise payload
+        return payload
+
+    def submit(self, fn: Callable[..., Any], *args: Any, deadline: float) -> Future:
+        """`call` numa thread própria do sandbox (para várias tarefas do mesmo documento em voo)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf-sandbox")
+            executor = self._executor
+        return executor.submit(self.call, fn, *args, deadline=deadline)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "timeout_s": self.timeout_s,
+                "max_rss_mb": self._max_rss_bytes // (1024 * 1024),
+                "tasks": self._tasks,
+                "timeouts": self._failures["timeout"],
+                "memory_kills": self._failures["memory"],
+                "crashes": self._failures["crash"],
+                "recycled": self._recycled,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for worker in idle:
+            self._stop(worker)
+
+    # ---------------------------
+    # Helpers
+    # ---------------------------
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            self._tasks += 1
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    return worker
+                worker.conn.close()
+        return self._spawn()
+
+    def _checkin(self, worker: _Worker, retire: bool = False) -> None:
+        if retire or worker.tasks >= self._max_tasks:
+            with self._lock:
+                self._recycled += 1
+            self._stop(worker)
+            worker = self._spawn()  # substituto já sobe enquanto ninguém espera por ele
+        with self._lock:
+            if not self._closed:
+                self._idle.append(worker)
+                return
+        self._stop(worker)
+
+    def _fail(self, reason: SandboxFailure, worker: Optional[_Worker]) -> None:
+        with self._lock:
+            self._failures[reason] += 1
+        if worker is not None:
+            self._kill(worker)
+            self._checkin(self._spawn())
+        logger.warning("pdf_sandbox_failure", extra={"event": "pdf_sandbox_failure", "reason": reason})
+        raise PdfSandboxError(reason)
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self._max_rss_bytes),
+            name="pdf-sandbox",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process=process, conn=parent_conn)
+
+    def _stop(self, worker: _Worker) -> None:
+        try:
+            worker.conn.send(None)
+        except OSError:
+            pass
+        worker.process.join(timeout=1)
+        if worker.process.is_alive():
+            self._kill(worker)
+        worker.conn.close()
+
+    def _kill(self, worker: _Worker) -> None:
+        worker.process.kill()
+        worker.process.join(timeout=1)
+        worker.conn.close()
+
+
+# ---------------------------
+# Processo filho
+# ---------------------------
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # sem /proc: pico de RSS (KB no Linux) — limite conservador
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _watchdog(max_rss_bytes: int, busy: threading.Event) -> None:
+    while True:
+        busy.wait()
+        if _rss_bytes() > max_rss_bytes:
+            os._exit(_EXIT_MEMORY)
+        time.sleep(_WATCHDOG_INTERVAL_S)
+
+
+def _worker_main(conn: Connection, max_rss_bytes: int) -> None:
+    busy = threading.Event()
+    if max_rss_bytes:
+        threading.Thread(target=_watchdog, args=(max_rss_bytes, busy), daemon=True).start()
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+
+        fn, args = task
+        busy.set()
+        try:
+            status, payload = "ok", fn(*args)
+        except Exception as exc:
+            status, payload = "error", exc
+        busy.clear()
+
+        # memória retida (caches do pypdf) acima do limite: avisa o pai e sai após responder
+        retire = bool(max_rss_bytes) and _rss_bytes() > max_rss_bytes
+        try:
+            conn.send((status, payload, retire))
+        except Exception as exc:
+            # exceção/resultado não serializável: manda só a descrição
+            conn.send(("error", RuntimeError(repr(exc)), retire))
+        if retire:
+            return
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+
+def cache_key(text: str, namespace: str) -> str:
+    """
+    Chave por conteúdo: sha256(namespace + texto normalizado).
+    `namespace` carrega modelo + versão da política de prompt, então trocar
+    `OPENAI_MODEL` ou `PromptPolicy` invalida o cache sem precisar limpar nada.
+    """
+    normalized = " ".join((text or "").split())
+    h = hashlib.sha256()
+    h.update(namespace.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(normalized.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _hit_rate(hits: int, misses: int) -> float:
+    lookups = hits + misses
+    return round(hits / lookups, 4) if lookups else 0.0
+
+
+class ResultCache(Protocol):
+    """Cache de resultados de análise (valor = `EmailAnalyzeResponse.model_dump()`)."""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        """`get` para o event loop: o que for I/O bloqueante (SQLite) roda em thread."""
+        ...
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class InMemoryResultCache:
+    """
+    LRU + TTL em memória, limitado por número de entradas e por bytes (tamanho do JSON).
+    Thread-safe: é usado tanto no threadpool (`analyze`) quanto no event loop (`analyze_async`).
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float) -> None:
+        self._max_entries = max(1, max_entries)
+        self._max_bytes = max(1, max_bytes)
+        self._ttl_seconds = ttl_seconds
+
+        # key -> (expira_em, tamanho, valor); ordem = recência (fim = mais recente)
+        self._items: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+
+            expires_at, _, value = item
+            if expires_at <= now:
+                self._drop(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self._hits += 1
+            return dict(value)
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        # dict em memória: custa menos que o salto para uma thread
+        return self.get(key)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        size = len(key) + len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if size > self._max_bytes:
+            return  # entrada maior que o cache inteiro: não vale guardar
+
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+
+            self._items[key] = (time.monotonic() + self._ttl_seconds, size, dict(value))
+            self._bytes += size
+
+            while len(self._items) > self._max_entries or self._bytes > self._max_bytes:
+                oldest = next(iter(self._items))
+                self._drop(oldest)
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_rate": _hit_rate(self._hits, self._misses),
+            }
+
+    def close(self) -> None:
+        return None
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._items.pop(key)
+        self._bytes -= size
+
+
+class SqliteResultCache:
+    """
+    Cache compartilhado entre os workers do gunicorn (mesmo host) em SQLite WAL:
+    sobrevive à reciclagem de workers (`--max-requests`) e, com o arquivo num volume, a deploys.
+
+    - leitura: SELECT por chave primária (WAL: leitores não esperam escritores)
+    - escrita: nunca no caminho da requisição — `put` só enfileira; uma thread de fundo
+      grava em lotes. Fila cheia descarta a escrita (é só cache)
+    - limite: entradas expiradas e as mais antigas além de `max_entries` são removidas pelo writer
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            key TEXT PRIMARY KEY,
+            value_json TEXT NOT NULL,
+            stored_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ix_analysis_cache_stored_at ON analysis_cache (stored_at);
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int,
+        ttl_seconds: float,
+        *,
+        write_queue_size: int = 1000,
+        write_batch_size: int = 100,
+        prune_every: int = 200,
+        busy_timeout_ms: int = 5000,
+    ) -> None:
+        self._path = path
+        self._max_entries = max(1, max_entries)
+        self._ttl_seconds = ttl_seconds
+        self._write_batch_size = max(1, write_batch_size)
+        self._prune_every = max(1, prune_every)
+        self._busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+
+        self._conn().executescript(self._SCHEMA)
+
+        self._hits = 0
+        self._misses = 0
+        self._dropped_writes = 0
+        self._failed_writes = 0
+        self._counters_lock = threading.Lock()
+
+        self._writes: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, write_queue_size))
+        self._writer = threading.Thread(target=self._writer_loop, name="analysis-cache-writer", daemon=True)
+        self._writer.start()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT value_json FROM analysis_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        with self._counters_lock:
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return json.loads(row[0])
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        # SELECT + json.loads (e até `busy_timeout_ms` esperando lock) fora do event loop
+        return await asyncio.to_thread(self.get, key)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            self._writes.put_nowait((key, json.dumps(value, ensure_ascii=False)))
+        except queue.Full:
+            with self._counters_lock:
+                self._dropped_writes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            entries = self._conn().execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        with self._counters_lock:
+            return {
+                "entries": entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": _hit_rate(self._hits, self._misses),
+                "pending_writes": self._writes.qsize(),
+                "dropped_writes": self._dropped_writes,
+                "failed_writes": self._failed_writes,
+            }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Grava o que estiver pendente (shutdown do worker) e encerra o writer."""
+        if not self._writer.is_alive():
+            return
+        try:
+            self._writes.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._writer.join(timeout)
+
+    # ---------------------------
+    # Writer (thread de fundo)
+    # ---------------------------
+    def _writer_loop(self) -> None:
+        since_prune = 0
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < self._write_batch_size:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(item is self._STOP for item in batch)
+            rows = [item for item in batch if item is not self._STOP]
+
+            if rows:
+                try:
+                    self._write(rows)
+                    since_prune += len(rows)
+                    if since_prune >= self._prune_every:
+                        since_prune = 0
+                        self._prune()
+                except sqlite3.Error:
+                    with self._counters_lock:
+                        self._failed_writes += len(rows)
+
+            if stop:
+                return
+
+    def _write(self, rows: List[Tuple[str, str]]) -> None:
+        now = time.time()
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO analysis_cache (key, value_json, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                [(key, value_json, now, now + self._ttl_seconds) for key, value_json in rows],
+            )
+
+    def _prune(self) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM analysis_cache WHERE expires_at <= ?", (time.time(),))
+            excess = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0] - self._max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM analysis_cache WHERE key IN "
+                    "(SELECT key FROM analysis_cache ORDER BY stored_at LIMIT ?)",
+                    (excess,),
+                )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=self._busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class TieredResultCache:
+    """
+    Memória do worker (L1) na frente do SQLite compartilhado (L2).
+    Hit no L2 é promovido para o L1; `put` grava no L1 na hora e no L2 em background.
+    """
+
+    def __init__(self, memory: InMemoryResultCache, shared: SqliteResultCache) -> None:
+        self._memory = memory
+        self._shared = shared
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+
+        try:
+            value = self._shared.get(key)
+        except sqlite3.Error:
+            return None  # L2 indisponível (lock/disco): segue como miss
+        if value is not None:
+            self._memory.put(key, value)
+        return value
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        """Como `get`, com o L1 consultado no loop e só o L2 (SQLite) em thread."""
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+
+        try:
+            value = await self._shared.get_async(key)
+        except sqlite3.Error:
+            return None
+        if value is not None:
+            self._memory.put(key, value)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        self._memory.put(key, value)
+        self._shared.put(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"memory": self._memory.stats(), "shared": self._shared.stats()}
+
+    def close(self) -> None:
+        self._shared.close()
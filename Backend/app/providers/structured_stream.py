@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Optional
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class StreamedObjectParser:
+    """
+    Parser incremental do JSON (objeto plano) gerado pelo structured output em streaming.
+
+    - `fields`: valores já completos (strings/números/bool), disponíveis assim que fecham
+    - `feed(chunk)`: devolve o trecho JÁ DECODIFICADO do campo `stream_field` contido no chunk,
+      permitindo repassar a resposta token a token sem esperar o JSON inteiro
+    """
+
+    _EXPECT_KEY = 0
+    _IN_KEY = 1
+    _EXPECT_COLON = 2
+    _EXPECT_VALUE = 3
+    _IN_STRING = 4
+    _IN_SCALAR = 5
+
+    def __init__(self, stream_field: str) -> None:
+        self._stream_field = stream_field
+        self.fields: Dict[str, Any] = {}
+
+        self._state = self._EXPECT_KEY
+        self._key: list[str] = []
+        self._value: list[str] = []
+        self._current_key = ""
+        self._escape = False
+        self._unicode: Optional[list[str]] = None
+        self._high_surrogate: Optional[int] = None
+
+    def feed(self, chunk: str) -> str:
+        streamed: list[str] = []
+
+        for ch in chunk:
+            state = self._state
+
+            if state == self._EXPECT_KEY:
+                if ch == '"':
+                    self._key = []
+                    self._state = self._IN_KEY
+
+            elif state == self._IN_KEY:
+                decoded = self._string_char(ch)
+                if decoded is None:
+                    continue
+                if decoded is _END:
+                    self._current_key = "".join(self._key)
+                    self._state = self._EXPECT_COLON
+                else:
+                    self._key.append(decoded)
+
+            elif state == self._EXPECT_COLON:
+                if ch == ":":
+                    self._state = self._EXPECT_VALUE
+
+            elif state == self._EXPECT_VALUE:
+                if ch.isspace():
+                    continue
+                self._value = []
+                if ch == '"':
+                    self._state = self._IN_STRING
+                else:
+                    self._value.append(ch)
+                    self._state = self._IN_SCALAR
+
+            elif state == self._IN_STRING:
+                decoded = self._string_char(ch)
+                if decoded is None:
+                    continue
+                if decoded is _END:
+                    self.fields[self._current_key] = "".join(self._value)
+                    self._state = self._EXPECT_KEY
+                    continue
+                self._value.append(decoded)
+                if self._current_key == self._stream_field:
+                    streamed.append(decoded)
+
+            elif state == self._IN_SCALAR:
+                if ch in ",}" or ch.isspace():
+                    self.fields[self._current_key] = self._parse_scalar("".join(self._value))
+                    self._state = self._EXPECT_KEY
+                else:
+                    self._value.append(ch)
+
+        return "".join(streamed)
+
+    def _string_char(self, ch: str):
+        """Decodifica 1 caractere de string JSON. Retorna str, None (aguardando) ou _END."""
+        if self._unicode is not None:
+            self._unicode.append(ch)
+            if len(self._unicode) < 4:
+                return None
+            code = int("".join(self._unicode), 16)
+            self._unicode = None
+            if 0xD800 <= code <= 0xDBFF:
+                self._high_surrogate = code
+                return None
+            if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            return chr(code)
+
+        if self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = []
+                return None
+            return _ESCAPES.get(ch, ch)
+
+        if ch == "\\":
+            self._escape = True
+            return None
+        if ch == '"':
+            return _END
+        return ch
+
+    def _parse_scalar(self, raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return raw
+
+
+_END = object()
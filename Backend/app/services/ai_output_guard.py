@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import Literal, Any
+from typing import Literal, Any, Tuple
 
 Category = Literal["Produtivo", "Improdutivo"]
 
@@ -34,6 +34,14 @@ class AiOutputGuard:
 
         return GuardedResult(category=cat, suggested_reply=clean_reply, confidence=conf)
 
+    def classification(self, category: Any, confidence: Any) -> Tuple[Category, float]:
+        """Normaliza só categoria/confiança (usado no streaming, antes da resposta existir)."""
+        return self._normalize_category(category), self._normalize_confidence(confidence)
+
+    def stream(self) -> "ReplyStreamGuard":
+        """Guard incremental para a resposta em streaming (o `ensure` final continua valendo)."""
+        return ReplyStreamGuard(max_reply_chars=self._max_reply_chars)
+
     def _normalize_category(self, value: Any) -> Category:
         v = str(value or "").strip().lower()
         if v in {"produtivo", "productive"}:
@@ -92,3 +100,102 @@ class AiOutputGuard:
                 "mais detalhes do pedido e o contexto (ex.: qual sistema/erro e desde quando acontece)?"
             )
         return "Olá! Obrigado pela mensagem. Se precisar de algo, fico à disposição."
+
+
+class ReplyStreamGuard:
+    """
+    Aplica, token a token, as mesmas regras de `AiOutputGuard.ensure` que dão para aplicar
+    sem ver o texto inteiro:
+    - remove cerca de código (```) no início
+    - CRLF/CR -> LF, remove espaços no fim das linhas
+    - colapsa 3+ quebras de linha em 2 e ignora quebras/espaços no começo
+    - corta em `max_reply_chars` (com "…")
+
+    Espaços/quebras ficam retidos até chegar o próximo caractere visível; o evento final
+    (resultado do `ensure`) é a versão canônica da resposta.
+    """
+
+    def __init__(self, max_reply_chars: int) -> None:
+        self._max_reply_chars = max_reply_chars
+        self._emitted = 0
+        self._started = False
+        self._truncated = False
+        self._head = ""  # início retido até decidir se é cerca de código
+        self._in_fence_line = False
+        self._spaces = ""
+        self._newlines = 0
+        self._pending_cr = False
+
+    def feed(self, delta: str) -> str:
+        if self._truncated or not delta:
+            return ""
+
+        out: list[str] = []
+        for ch in delta:
+            if self._pending_cr:
+                self._pending_cr = False
+                if ch == "\n":
+                    continue  # CRLF já contado como LF
+            if ch == "\r":
+                self._pending_cr = True
+                ch = "\n"
+
+            if not self._started and not self._accept_head(ch):
+                continue
+
+            if ch == "\n":
+                self._newlines += 1
+                self._spaces = ""  # espaço no fim da linha
+                continue
+            if ch in " \t":
+                self._spaces += ch
+                continue
+
+            if not self._emit(out, self._whitespace_run() + ch):
+                break
+
+        return "".join(out)
+
+    def _accept_head(self, ch: str) -> bool:
+        """Descarta espaços iniciais e uma linha de abertura ```lang. True = processar o caractere."""
+        if self._in_fence_line:
+            if ch == "\n":
+                self._in_fence_line = False
+            return False
+
+        if not self._head and ch.isspace():
+            return False
+
+        if ch == "`" or self._head:
+            self._head += ch
+            if "```".startswith(self._head):
+                if self._head == "```":
+                    self._head = ""
+                    self._in_fence_line = True
+                return False
+            # não era cerca: devolve o que foi retido (exceto o caractere atual)
+            retained, self._head = self._head[:-1], ""
+            self._started = True
+            self._spaces = retained
+            return True
+
+        self._started = True
+        return True
+
+    def _whitespace_run(self) -> str:
+        run = ("\n" * min(self._newlines, 2)) + self._spaces
+        self._newlines = 0
+        self._spaces = ""
+        return run
+
+    def _emit(self, out: list[str], text: str) -> bool:
+        room = self._max_reply_chars - self._emitted
+        if len(text) <= room:
+            out.append(text)
+            self._emitted += len(text)
+            return True
+
+        out.append(text[:room].rstrip() + "…")
+        self._emitted = self._max_reply_chars
+        self._truncated = True
+        return False
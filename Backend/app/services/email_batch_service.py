@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Union
+
+from app.domain.models.api_response import ApiError
+from app.domain.models.email_analysis import (
+    EmailBatchItem,
+    EmailBatchItemResult,
+    EmailBatchResponse,
+)
+from app.providers.nlp_preprocess import NlpOutput
+from app.services.email_classifier_service import EmailClassifierService
+
+logger = logging.getLogger(__name__)
+
+# item já resolvido pelo chamador (ex.: linha NDJSON inválida) passa como ApiError
+StreamInput = tuple[int, Union[EmailBatchItem, ApiError]]
+
+
+class EmailBatchService:
+    """
+    Analisa N emails com concorrência limitada.
+
+    - cada item roda NLP + IA via `EmailClassifierService.analyze_async`
+      (no `analyze_many`, o NLP do lote inteiro sai antes, de uma vez, via `preprocess_many`)
+    - no máximo `max_concurrency` itens em paralelo (protege o provider)
+    - falha de um item vira erro do item, sem derrubar o lote
+    - `classify_many`: só classificação, com emails curtos empacotados por chamada à IA
+    """
+
+    def __init__(self, service: EmailClassifierService, max_concurrency: int) -> None:
+        self._service = service
+        self._max_concurrency = max(1, max_concurrency)
+
+    async def analyze_many(self, items: Sequence[EmailBatchItem]) -> EmailBatchResponse:
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        nlp_outs = await self._preprocess(items)
+
+        async def run(index: int, item: EmailBatchItem) -> EmailBatchItemResult:
+            async with semaphore:
+                return await self.analyze_item(index, item, nlp_outs.get(index))
+
+        results = await asyncio.gather(*(run(i, item) for i, item in enumerate(items)))
+        return self._done("analyze_batch_done", list(results), started)
+
+    async def classify_many(self, items: Sequence[EmailBatchItem]) -> EmailBatchResponse:
+        """Lote só-classificação (`EmailClassifierService.classify_many_async`), mesma ordem dos itens."""
+        started = time.perf_counter()
+        nlp_outs = await self._preprocess(items)
+        indexes = [i for i, item in enumerate(items) if (item.text or "").strip()]
+
+        results: Dict[int, EmailBatchItemResult] = {}
+        try:
+            classified = await self._service.classify_many_async(
+                [items[i].text for i in indexes],
+                [nlp_outs.get(i) for i in indexes],
+                max_concurrency=self._max_concurrency,
+            )
+            if len(classified) != len(indexes):
+                raise RuntimeError("classify_many_async: resultados desalinhados com os itens")
+        except Exception:
+            logger.exception("classify_batch_failed", extra={"event": "classify_batch_failed"})
+            classified = [None] * len(indexes)
+
+        error = ApiError(code="ANALYZE_ERROR", message="Falha inesperada ao classificar o email.")
+        for index, data in zip(indexes, classified):
+            if data is None:
+                results[index] = self._failed(index, items[index], error)
+            else:
+                results[index] = EmailBatchItemResult(index=index, id=items[index].id, success=True, data=data)
+
+        empty = ApiError(code="EMPTY_TEXT", message="Texto do email vazio.", field="text")
+        ordered = [results.get(i) or self._failed(i, item, empty) for i, item in enumerate(items)]
+        return self._done("classify_batch_done", ordered, started)
+
+    async def stream(self, items: AsyncIterator[StreamInput]) -> AsyncIterator[EmailBatchItemResult]:
+        """
+        Versão streaming: consome `items` sob demanda e devolve resultados em ordem de conclusão.
+
+        - lê o próximo item só quando há vaga (no máximo `max_concurrency` em andamento),
+          então nem a entrada nem os resultados ficam inteiros em memória
+        - ao fechar o gerador (ex.: cliente desconectou), cancela o que estiver pendente
+        """
+        source = items.__aiter__()
+        pending: set[asyncio.Task] = set()
+        reader: Optional[asyncio.Task] = None
+        exhausted = False
+
+        try:
+            while True:
+                if reader is None and not exhausted and len(pending) < self._max_concurrency:
+                    reader = asyncio.create_task(_next_or_none(source))
+
+                waiting = pending | ({reader} if reader is not None else set())
+                if not waiting:
+                    break
+
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+                if reader is not None and reader in done:
+                    nxt = reader.result()
+                    reader = None
+                    if nxt is None:
+                        exhausted = True
+                    else:
+                        index, item = nxt
+                        if isinstance(item, ApiError):
+                            yield EmailBatchItemResult(index=index, success=False, errors=[item])
+                        else:
+                            pending.add(asyncio.create_task(self.analyze_item(index, item)))
+
+                for task in done:
+                    if task in pending:
+                        pending.discard(task)
+                        yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if reader is not None:
+                reader.cancel()
+            if pending:
+                logger.info(
+                    "analyze_stream_cancelled",
+                    extra={"event": "analyze_stream_cancelled", "pending": len(pending)},
+                )
+
+    async def analyze_item(
+        self, index: int, item: EmailBatchItem, nlp_out: Optional[NlpOutput] = None
+    ) -> EmailBatchItemResult:
+        if not (item.text or "").strip():
+            return self._failed(index, item, ApiError(code="EMPTY_TEXT", message="Texto do email vazio.", field="text"))
+
+        try:
+            # NLP em thread, IA no event loop (cancelável: desconexão cancela a chamada em voo)
+            result = await self._service.analyze_async(item.text, nlp_out)
+        except Exception:
+            logger.exception(
+                "analyze_batch_item_failed",
+                extra={"event": "analyze_batch_item_failed", "index": index},
+            )
+            return self._failed(
+                index,
+                item,
+                ApiError(code="ANALYZE_ERROR", message="Falha inesperada ao analisar o email."),
+            )
+
+        return EmailBatchItemResult(index=index, id=item.id, success=True, data=result)
+
+    async def _preprocess(self, items: Sequence[EmailBatchItem]) -> Dict[int, NlpOutput]:
+        # NLP é CPU puro: em lote vai para o pool de processos (escala com os núcleos, sem GIL)
+        indexes = [i for i, item in enumerate(items) if (item.text or "").strip()]
+        try:
+            outs = await self._service.preprocess_many([items[i].text for i in indexes])
+        except Exception:
+            # sem NLP prévio cada item faz o seu (caminho normal do `analyze_async`)
+            logger.exception("analyze_batch_preprocess_failed", extra={"event": "analyze_batch_preprocess_failed"})
+            return {}
+        return dict(zip(indexes, outs))
+
+    def _done(self, event: str, results: List[EmailBatchItemResult], started: float) -> EmailBatchResponse:
+        succeeded = sum(1 for r in results if r.success)
+        logger.info(
+            event,
+            extra={
+                "event": event,
+                "total": len(results),
+                "failed": len(results) - succeeded,
+                "duration_ms": int((time.perf_counter() - started) * 1000),
+            },
+        )
+        return EmailBatchResponse(
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            items=results,
+        )
+
+    def _failed(self, index: int, item: EmailBatchItem, error: ApiError) -> EmailBatchItemResult:
+        return EmailBatchItemResult(index=index, id=item.id, success=False, errors=[error])
+
+
+async def _next_or_none(source: AsyncIterator[StreamInput]) -> Optional[StreamInput]:
+    try:
+        return await source.__anext__()
+    except StopAsyncIteration:
+        return None
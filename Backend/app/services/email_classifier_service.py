@@ -1,25 +1,164 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
-from app.domain.models.email_analysis import EmailAnalyzeResponse
-from app.providers.ai_provider import AiProvider
-from app.providers.nlp_preprocess import NlpPreprocess
+from app.domain.models.email_analysis import (
+    AnalysisMeta,
+    AnalysisTier,
+    CleaningMeta,
+    DeferredReply,
+    EmailAnalyzeResponse,
+    LongDocumentMeta,
+    NearDuplicateMeta,
+)
+from app.providers.ai_provider import AiProvider, ReplyStreamEvent
+from app.providers.nlp_preprocess import NlpOutput, NlpPreprocess
 from app.providers.fallback_provider import HeuristicFallbackProvider
+from app.providers.local_classifier import LocalClassifier
+from app.providers.result_cache import ResultCache, cache_key
 from app.services.ai_output_guard import AiOutputGuard
+from app.services.email_cleaner import EmailCleaner
+from app.services.long_document import ChunkDecision, reduce_chunks, split_chunks
+from app.services.near_duplicate_index import NearDuplicateIndex
+from app.services.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# contexto de resposta pendente (modo só-classificação) mora no cache de resultados
+_PENDING_PREFIX = "pending:"
+REPLY_HREF = "/emails/replies/{id}"
+
+
+@dataclass(frozen=True)
+class _Prepared:
+    nlp_out: NlpOutput
+    signature: Optional[Any] = None  # assinatura MinHash (quando há índice de quase-duplicados)
+    cleaning: Optional[CleaningMeta] = None  # limpeza do corpo (quando há `EmailCleaner`)
+
 
 class EmailClassifierService:
-    def __init__(self, ai: AiProvider, nlp: NlpPreprocess) -> None:
+    """
+    Cache de resultados (opcional): chave = hash do texto normalizado + `cache_namespace`
+    (modelo + versão da política de prompt). Só resultados do provider são cacheados;
+    o fallback heurístico não, para a próxima tentativa consultar a IA de novo.
+
+    Quase-duplicados (opcional): emails de template parecidos com uma análise recente
+    (MinHash sobre os lemas) reaproveitam a categoria — e, se `reuse_near_duplicate_reply`,
+    a resposta — sem chamar a IA.
+
+    Single-flight (opcional): análises idênticas concorrentes (mesma chave de conteúdo)
+    esperam uma única execução e compartilham o resultado — inclusive o do fallback.
+
+    Classificador local (opcional): decisões confiantes em categorias que dispensam resposta
+    personalizada saem sem chamar a IA (resposta padrão da categoria). `meta.tier` diz
+    quem respondeu.
+
+    Só classificação (`classify_async`): categoria sem gerar resposta; a resposta fica
+    pendente e é gerada sob demanda (`reply_async`). Com `reply_templates`, emails
+    `Improdutivo` recebem resposta de template local, sem chamada à IA.
+
+    Limpeza (opcional): `cleaner` tira histórico citado, assinatura e disclaimers antes do
+    NLP; a IA recebe só o corpo limpo. A chave de cache continua sendo o texto recebido.
+
+    Documento longo (opcional; `analyze`, `analyze_async` e os streams): texto acima de
+    `long_document_min_chars` é dividido em chunks por parágrafo, classificados em paralelo
+    (saída mínima) e reduzidos a uma categoria; a resposta é gerada uma vez, a partir do
+    chunk mais relevante (no streaming, sai de uma vez, sem deltas). Exige provider com
+    classificação e resposta separadas; o tempo fica perto de uma chamada.
+
+    Lote só-classificação (`classify_many_async`): emails curtos são empacotados, até
+    `packed_max_items` por chamada ao provider (0 = desliga), com refação individual dos
+    itens que o modelo não devolveu direito.
+    """
+
+    def __init__(
+        self,
+        ai: AiProvider,
+        nlp: NlpPreprocess,
+        cache: Optional[ResultCache] = None,
+        cache_namespace: str = "",
+        near_duplicates: Optional[NearDuplicateIndex] = None,
+        reuse_near_duplicate_reply: bool = False,
+        single_flight: Optional[SingleFlight] = None,
+        local_classifier: Optional[LocalClassifier] = None,
+        fallback: Optional[HeuristicFallbackProvider] = None,
+        reply_templates: bool = False,
+        cleaner: Optional[EmailCleaner] = None,
+        long_document_min_chars: int = 0,
+        long_document_chunk_chars: int = 12_000,
+        long_document_max_chunks: int = 8,
+        packed_max_items: int = 0,
+        packed_max_chars: int = 500,
+    ) -> None:
         self._ai = ai
         self._nlp = nlp
         self._guard = AiOutputGuard()
-        self._fallback = HeuristicFallbackProvider()
+        self._fallback = fallback or HeuristicFallbackProvider.default()
+        self._cache = cache
+        self._cache_namespace = cache_namespace
+        self._near_duplicates = near_duplicates
+        self._reuse_near_duplicate_reply = reuse_near_duplicate_reply
+        self._single_flight = single_flight
+        self._local_classifier = local_classifier
+        self._reply_templates = reply_templates
+        self._cleaner = cleaner
+        self._long_min_chars = long_document_min_chars
+        self._long_chunk_chars = long_document_chunk_chars
+        self._long_max_chunks = long_document_max_chunks
+        self._packed_max_items = packed_max_items
+        self._packed_max_chars = packed_max_chars
 
     def analyze(self, raw_text: str) -> EmailAnalyzeResponse:
-        nlp_out = self._nlp.run(raw_text)
+        key = self._cache_key(raw_text)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        if key is None or self._single_flight is None:
+            return self._analyze_uncached(raw_text, key)
+
+        result, coalesced = self._single_flight.do(key, lambda: self._analyze_uncached(raw_text, key))
+        return _mark_coalesced(result) if coalesced else result
+
+    async def analyze_async(self, raw_text: str, nlp_out: Optional[NlpOutput] = None) -> EmailAnalyzeResponse:
+        """
+        Versão async do `analyze`:
+        - NLP (CPU-bound) roda em thread para não travar o event loop
+          (ou já vem pronto em `nlp_out`, ex.: lote pré-processado com `preprocess_many`)
+        - leitura do cache compartilhado (SQLite) também vai para thread; o L1 em memória não
+        - chamada ao provider é aguardada no loop (AsyncOpenAI), sem prender thread;
+          provider sem variante async cai no `classify_and_reply` em thread
+        """
+        key = self._cache_key(raw_text)
+        cached = await self._cache_get_async(key)
+        if cached is not None:
+            return cached
+
+        if key is None or self._single_flight is None:
+            return await self._analyze_uncached_async(raw_text, key, nlp_out)
+
+        result, coalesced = await self._single_flight.do_async(
+            key, lambda: self._analyze_uncached_async(raw_text, key, nlp_out)
+        )
+        return _mark_coalesced(result) if coalesced else result
+
+    def _analyze_uncached(self, raw_text: str, key: Optional[str]) -> EmailAnalyzeResponse:
+        prepared = self._prepare(raw_text)
+        nlp_out = prepared.nlp_out
+
+        reused = self._near_duplicate(prepared) or self._local(prepared)
+        if reused is not None:
+            return reused
+
+        if self._is_long_document(nlp_out, sync=True):
+            long_result = self._analyze_long(key, prepared)
+            if long_result is not None:
+                return long_result
 
         try:
             category, reply, confidence = self._ai.classify_and_reply(
@@ -28,16 +167,794 @@ class EmailClassifierService:
             )
         except Exception:
             # loga a exceção pra você enxergar no container/CloudWatch
-            logger.exception(
-                "ai_provider_failed_using_fallback",
-                extra={"event": "ai_provider_failed_using_fallback"},
+            self._log_fallback()
+            category, reply, confidence = self._fallback_result(nlp_out)
+            return self._response(category, reply, confidence, "fallback", cleaning=prepared.cleaning)
+
+        return self._remember(
+            key, prepared, self._response(category, reply, confidence, "provider", cleaning=prepared.cleaning)
+        )
+
+    async def preprocess_many(self, texts: Sequence[str]) -> List[NlpOutput]:
+        """NLP de um lote inteiro de uma vez (pool de processos do `NlpPreprocess.run_many`)."""
+        if self._cleaner is not None:
+            # contadores ficam para o `_prepare` de cada item, que refaz a limpeza para o meta
+            texts = [self._cleaner.clean(text, record=False).text for text in texts]
+        return await asyncio.to_thread(self._nlp.run_many, texts)
+
+    async def _analyze_uncached_async(
+        self, raw_text: str, key: Optional[str], nlp_out: Optional[NlpOutput] = None
+    ) -> EmailAnalyzeResponse:
+        prepared = await asyncio.to_thread(self._prepare, raw_text, nlp_out)
+        nlp_out = prepared.nlp_out
+
+        reused = self._near_duplicate(prepared) or self._local(prepared)
+        if reused is not None:
+            return reused
+
+        if self._is_long_document(nlp_out):
+            long_result = await self._analyze_long_async(key, prepared)
+            if long_result is not None:
+                return long_result
+
+        try:
+            category, reply, confidence = await self._classify_async(nlp_out)
+        except Exception:
+            self._log_fallback()
+            category, reply, confidence = self._fallback_result(nlp_out)
+            return self._response(category, reply, confidence, "fallback", cleaning=prepared.cleaning)
+
+        return self._remember(
+            key, prepared, self._response(category, reply, confidence, "provider", cleaning=prepared.cleaning)
+        )
+
+    def analyze_stream(self, raw_text: str) -> Iterator[ReplyStreamEvent]:
+        """
+        Versão streaming do `analyze` (eventos já passados pelo guard):
+        "classification" assim que categoria/confiança saem, "delta" com trechos sanitizados
+        da resposta e "done" com o resultado final canônico (`AiOutputGuard.ensure`).
+
+        Se o provider não suporta streaming, faz a chamada única e emite tudo no final.
+        Se falhar, usa o fallback heurístico (o "done" sempre sai).
+        Resultado em cache (ou de quase-duplicado / classificador local / documento longo)
+        sai de uma vez.
+        """
+        key = self._cache_key(raw_text)
+        cached = self._cache_get(key)
+        if cached is not None:
+            yield from _cached_events(cached)
+            return
+
+        prepared = self._prepare(raw_text)
+        nlp_out = prepared.nlp_out
+
+        reused = self._near_duplicate(prepared) or self._local(prepared)
+        if reused is None and self._is_long_document(nlp_out, sync=True):
+            # documento longo: map-reduce sem streaming de deltas (resultado sai de uma vez)
+            reused = self._analyze_long(key, prepared)
+        if reused is not None:
+            yield from _cached_events(reused)
+            return
+
+        assembler = _StreamAssembler(self._guard)
+
+        stream_fn = getattr(self._ai, "stream_classify_and_reply", None)
+
+        try:
+            if stream_fn is None:
+                assembler.final = self._ai.classify_and_reply(nlp_out.raw_text, nlp_out.keywords)
+            else:
+                events = stream_fn(nlp_out.raw_text, nlp_out.keywords)
+                try:
+                    for event in events:
+                        yield from assembler.on_event(event)
+                finally:
+                    # cliente desconectou/erro: fecha o stream do provider na hora
+                    events.close()
+        except Exception:
+            self._log_fallback()
+
+        provider_ok = assembler.final is not None
+        events = assembler.finish(None if provider_ok else self._fallback_result(nlp_out))
+        if provider_ok:
+            self._remember_event(key, prepared, events[-1])
+        yield from events
+
+    async def analyze_stream_async(self, raw_text: str) -> AsyncIterator[ReplyStreamEvent]:
+        """Versão async do `analyze_stream` (mesmos eventos, NLP em thread, provider no loop)."""
+        key = self._cache_key(raw_text)
+        cached = await self._cache_get_async(key)
+        if cached is not None:
+            for out in _cached_events(cached):
+                yield out
+            return
+
+        prepared = await asyncio.to_thread(self._prepare, raw_text)
+        nlp_out = prepared.nlp_out
+
+        reused = self._near_duplicate(prepared) or self._local(prepared)
+        if reused is None and self._is_long_document(nlp_out):
+            reused = await self._analyze_long_async(key, prepared)
+        if reused is not None:
+            for out in _cached_events(reused):
+                yield out
+            return
+
+        assembler = _StreamAssembler(self._guard)
+
+        stream_fn = getattr(self._ai, "stream_classify_and_reply_async", None)
+
+        try:
+            if stream_fn is None:
+                assembler.final = await self._classify_async(nlp_out)
+            else:
+                events = stream_fn(nlp_out.raw_text, nlp_out.keywords)
+                try:
+                    async for event in events:
+                        for out in assembler.on_event(event):
+                            yield out
+                finally:
+                    await events.aclose()
+        except Exception:
+            self._log_fallback()
+
+        provider_ok = assembler.final is not None
+        events = assembler.finish(None if provider_ok else self._fallback_result(nlp_out))
+        if provider_ok:
+            self._remember_event(key, prepared, events[-1])
+        for out in events:
+            yield out
+
+    async def classify_async(self, raw_text: str) -> EmailAnalyzeResponse:
+        """
+        Modo só-classificação: categoria/confiança sem gerar a resposta (modelo de
+        classificação, saída mínima). A resposta fica pendente em `reply.href` e é gerada
+        sob demanda por `reply_async` — ou já sai quando é de graça (resultado completo em
+        cache, quase-duplicado, template local, fallback).
+        Sem cache de resultados não há onde guardar o pendente: `reply` vem vazio.
+        """
+        started = await self._classify_start(raw_text)
+        if isinstance(started, EmailAnalyzeResponse):
+            return started
+
+        key, prepared = started
+        nlp_out = prepared.nlp_out
+        try:
+            category, confidence = await self._classify_only_async(nlp_out.raw_text, nlp_out.keywords)
+        except Exception:
+            return self._classify_fallback(prepared)
+        return self._classify_done(key, prepared, category, confidence, "provider")
+
+    async def classify_many_async(
+        self,
+        texts: Sequence[str],
+        nlp_outs: Optional[Sequence[Optional[NlpOutput]]] = None,
+        max_concurrency: int = 8,
+    ) -> List[Optional[EmailAnalyzeResponse]]:
+        """
+        `classify_async` de um lote: um resultado por texto, na mesma posição (None = falha
+        inesperada no item). Emails curtos (até `packed_max_chars`) que precisam da IA vão
+        juntos, até `packed_max_items` por chamada, quando o provider suporta
+        (`classify_many_async`); item que volta ausente ou inválido (ou pacote cuja chamada
+        falhou) é refeito sozinho. Os demais seguem o caminho individual. No máximo
+        `max_concurrency` chamadas em voo.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def start(index: int) -> Any:
+            async with semaphore:
+                try:
+                    return await self._classify_start(texts[index], None if nlp_outs is None else nlp_outs[index])
+                except Exception:
+                    logger.exception(
+                        "classify_batch_item_failed", extra={"event": "classify_batch_item_failed", "index": index}
+                    )
+                    return None
+
+        started = await asyncio.gather(*(start(i) for i in range(len(texts))))
+        results: List[Optional[EmailAnalyzeResponse]] = [
+            s if isinstance(s, EmailAnalyzeResponse) else None for s in started
+        ]
+        todo = [i for i, s in enumerate(started) if isinstance(s, tuple)]
+        packable = [i for i in todo if self._packable(started[i][1].nlp_out)]
+        size = self._packed_max_items
+        packs = [packable[j : j + size] for j in range(0, len(packable), size)] if size > 1 else []
+        packed_set = set(packable)
+        # pacote de um item só vira chamada individual
+        single = [i for i in todo if i not in packed_set] + [p[0] for p in packs if len(p) == 1]
+        packs = [p for p in packs if len(p) > 1]
+
+        async def run_single(index: int) -> None:
+            key, prepared = started[index]
+            nlp_out = prepared.nlp_out
+            async with semaphore:
+                try:
+                    category, confidence = await self._classify_only_async(nlp_out.raw_text, nlp_out.keywords)
+                except Exception:
+                    results[index] = self._classify_fallback(prepared)
+                    return
+            results[index] = self._classify_done(key, prepared, category, confidence, "provider")
+
+        async def run_pack(indexes: List[int]) -> None:
+            async with semaphore:
+                decisions = await self._classify_pack_async([started[i][1].nlp_out for i in indexes])
+            missing = []
+            for index, decision in zip(indexes, decisions):
+                if decision is None:
+                    missing.append(index)
+                    continue
+                key, prepared = started[index]
+                results[index] = self._classify_done(key, prepared, decision[0], decision[1], "provider", packed=True)
+            logger.info(
+                "classify_packed",
+                extra={"event": "classify_packed", "items": len(indexes), "retried": len(missing)},
+            )
+            await asyncio.gather(*(run_single(i) for i in missing))
+
+        await asyncio.gather(*(run_pack(p) for p in packs), *(run_single(i) for i in single))
+        return results
+
+    async def _classify_start(
+        self, raw_text: str, nlp_out: Optional[NlpOutput] = None
+    ) -> Union[EmailAnalyzeResponse, Tuple[Optional[str], _Prepared]]:
+        """
+        Etapas do só-classificação antes do provider: resultado pronto (cache, pendente,
+        quase-duplicado, classificador local, provider sem modo só-classificação) ou
+        `(key, prepared)` de quem precisa da IA.
+        """
+        key = self._cache_key(raw_text)
+        cached = await self._cache_get_async(key)
+        if cached is not None:
+            return cached
+        pending = await self._pending_get_async(key)
+        if pending is not None:
+            return self._classification(key, pending, "cache")
+
+        if getattr(self._ai, "classify_async", None) is None and getattr(self._ai, "classify", None) is None:
+            # provider sem modo só-classificação: análise completa
+            return await self.analyze_async(raw_text, nlp_out)
+
+        prepared = await asyncio.to_thread(self._prepare, raw_text, nlp_out)
+
+        reused = self._near_duplicate(prepared)
+        if reused is not None:
+            return reused
+
+        if self._local_classifier is not None:
+            decision = self._local_classifier.decide(prepared.nlp_out.lemmas, reply_needed=False)
+            if decision is not None:
+                return self._classify_done(key, prepared, decision.category, decision.confidence, "local")
+        return key, prepared
+
+    def _classify_done(
+        self,
+        key: Optional[str],
+        prepared: _Prepared,
+        category: str,
+        confidence: float,
+        tier: AnalysisTier,
+        packed: bool = False,
+    ) -> EmailAnalyzeResponse:
+        nlp_out = prepared.nlp_out
+        pending = {
+            "category": category,
+            "confidence": confidence,
+            "tier": tier,
+            "text": nlp_out.raw_text,
+            "keywords": list(nlp_out.keywords),
+        }
+        stored = self._pending_put(key, pending)
+        result = self._classification(key if stored else None, pending, tier, cleaning=prepared.cleaning)
+        if packed and result.meta is not None:
+            return result.model_copy(update={"meta": result.meta.model_copy(update={"packed": True})})
+        return result
+
+    def _classify_fallback(self, prepared: _Prepared) -> EmailAnalyzeResponse:
+        self._log_fallback()
+        category, reply, confidence = self._fallback_result(prepared.nlp_out)
+        return self._response(category, reply, confidence, "fallback", cleaning=prepared.cleaning)
+
+    def _packable(self, nlp_out: NlpOutput) -> bool:
+        return (
+            self._packed_max_items > 1
+            and getattr(self._ai, "classify_many_async", None) is not None
+            and len(nlp_out.raw_text) <= self._packed_max_chars
+        )
+
+    async def _classify_pack_async(self, nlp_outs: List[NlpOutput]) -> List[Optional[Tuple[str, float]]]:
+        try:
+            decisions = await self._ai.classify_many_async([(o.raw_text, o.keywords) for o in nlp_outs])
+        except Exception:
+            # pacote inteiro volta para o caminho individual
+            logger.warning("classify_packed_failed", extra={"event": "classify_packed_failed"}, exc_info=True)
+            return [None] * len(nlp_outs)
+        if len(decisions) != len(nlp_outs):
+            return [None] * len(nlp_outs)
+        return list(decisions)
+
+    async def reply_async(self, reply_id: str) -> Optional[EmailAnalyzeResponse]:
+        """
+        Gera (ou devolve, se já gerada) a resposta pendente de um `classify_async`.
+        None se o id não existe ou expirou. Resultado completo vai para o cache de análises
+        com a mesma chave, então o `/emails/analyze` do mesmo texto também passa a ser HIT.
+        """
+        cached = await self._cache_get_async(reply_id)
+        if cached is not None:
+            return cached
+        pending = await self._pending_get_async(reply_id)
+        if pending is None:
+            return None
+
+        if self._single_flight is None:
+            return await self._generate_reply_async(reply_id, pending)
+
+        result, coalesced = await self._single_flight.do_async(
+            f"reply:{reply_id}", lambda: self._generate_reply_async(reply_id, pending)
+        )
+        return _mark_coalesced(result) if coalesced else result
+
+    async def _generate_reply_async(self, reply_id: str, pending: Dict[str, Any]) -> EmailAnalyzeResponse:
+        category, confidence, text = pending["category"], pending["confidence"], pending["text"]
+        keywords: List[str] = pending["keywords"]
+
+        template = self._template_reply(text, category)
+        if template is not None:
+            return self._response(category, template, confidence, pending["tier"])
+
+        try:
+            reply = await self._generate_reply_text_async(text, keywords, category)
+        except Exception:
+            self._log_fallback()
+            # categoria já decidida: resposta padrão da categoria (não cacheada)
+            return self._response(category, "", confidence, "fallback")
+
+        result = self._response(category, reply, confidence, pending["tier"])
+        self._cache_put(reply_id, result)
+        return result
+
+    async def _classify_only_async(self, text: str, keywords: Sequence[str]) -> Tuple[str, float]:
+        classify_async = getattr(self._ai, "classify_async", None)
+        if classify_async is not None:
+            return await classify_async(text, keywords)
+        return await asyncio.to_thread(self._ai.classify, text, keywords)
+
+    async def _generate_reply_text_async(self, text: str, keywords: Sequence[str], category: str) -> str:
+        generate_async = getattr(self._ai, "generate_reply_async", None)
+        if generate_async is not None:
+            return await generate_async(text, keywords, category)
+        return await asyncio.to_thread(self._ai.generate_reply, text, keywords, category)
+
+    # ---------------------------
+    # Documento longo (map-reduce)
+    # ---------------------------
+    def _is_long_document(self, nlp_out: NlpOutput, sync: bool = False) -> bool:
+        if self._long_min_chars <= 0 or len(nlp_out.raw_text) < self._long_min_chars:
+            return False
+        # caminho sync (threadpool) só usa os métodos sync do provider
+        classify_names = ("classify",) if sync else ("classify_async", "classify")
+        reply_names = ("generate_reply",) if sync else ("generate_reply_async", "generate_reply")
+        has_classify = any(getattr(self._ai, name, None) is not None for name in classify_names)
+        has_reply = any(getattr(self._ai, name, None) is not None for name in reply_names)
+        return has_classify and has_reply
+
+    async def _analyze_long_async(self, key: Optional[str], prepared: _Prepared) -> Optional[EmailAnalyzeResponse]:
+        """
+        Map: classifica os chunks em paralelo (chunk que falha fica de fora).
+        Reduce: `reduce_chunks`. Resposta: uma chamada, sobre o chunk selecionado
+        (ou template local). None = documento não rendeu mais de um chunk (caminho normal).
+        """
+        nlp_out = prepared.nlp_out
+        chunks = split_chunks(nlp_out.raw_text, self._long_chunk_chars, self._long_max_chunks)
+        if len(chunks) < 2:
+            return None
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._classify_chunk_async(chunk, nlp_out.keywords) for chunk in chunks))
+        reduced = self._reduce_long(prepared, chunks, results, started)
+        if isinstance(reduced, EmailAnalyzeResponse):
+            return reduced
+
+        decision, meta = reduced
+        selected = chunks[decision.selected]
+        reply = self._template_reply(selected, decision.category)
+        if reply is None:
+            try:
+                reply = await self._generate_reply_text_async(selected, nlp_out.keywords, decision.category)
+            except Exception:
+                self._log_fallback()
+        return self._finish_long(key, prepared, decision, meta, reply)
+
+    def _analyze_long(self, key: Optional[str], prepared: _Prepared) -> Optional[EmailAnalyzeResponse]:
+        """Versão sync do `_analyze_long_async`: chunks em paralelo num pool de threads."""
+        nlp_out = prepared.nlp_out
+        chunks = split_chunks(nlp_out.raw_text, self._long_chunk_chars, self._long_max_chunks)
+        if len(chunks) < 2:
+            return None
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(chunks), thread_name_prefix="long-document") as pool:
+            results = list(pool.map(lambda chunk: self._classify_chunk(chunk, nlp_out.keywords), chunks))
+        reduced = self._reduce_long(prepared, chunks, results, started)
+        if isinstance(reduced, EmailAnalyzeResponse):
+            return reduced
+
+        decision, meta = reduced
+        selected = chunks[decision.selected]
+        reply = self._template_reply(selected, decision.category)
+        if reply is None:
+            try:
+                reply = self._ai.generate_reply(selected, nlp_out.keywords, decision.category)
+            except Exception:
+                self._log_fallback()
+        return self._finish_long(key, prepared, decision, meta, reply)
+
+    def _reduce_long(
+        self,
+        prepared: _Prepared,
+        chunks: List[str],
+        results: Sequence[Optional[Tuple[str, float]]],
+        started: float,
+    ) -> Union[EmailAnalyzeResponse, Tuple[ChunkDecision, LongDocumentMeta]]:
+        """Decisão dos chunks (ou resultado do fallback, se todos falharam)."""
+        decision = reduce_chunks(results)
+        failed = sum(1 for r in results if r is None)
+        if decision is None:
+            category, reply, confidence = self._fallback_result(prepared.nlp_out)
+            return self._response(category, reply, confidence, "fallback", cleaning=prepared.cleaning)
+
+        logger.info(
+            "long_document_reduced",
+            extra={
+                "event": "long_document_reduced",
+                "chunks": len(chunks),
+                "failed_chunks": failed,
+                "selected_chunk": decision.selected,
+                "category": decision.category,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            },
+        )
+        meta = LongDocumentMeta(chunks=len(chunks), failed_chunks=failed, selected_chunk=decision.selected)
+        return decision, meta
+
+    def _finish_long(
+        self,
+        key: Optional[str],
+        prepared: _Prepared,
+        decision: ChunkDecision,
+        meta: LongDocumentMeta,
+        reply: Optional[str],
+    ) -> EmailAnalyzeResponse:
+        if reply is None:
+            # geração da resposta falhou: categoria já decidida pelos chunks, resposta padrão
+            # da categoria (não cacheada)
+            return self._response(
+                decision.category, "", decision.confidence, "fallback", cleaning=prepared.cleaning, long_document=meta
             )
-            category, reply, confidence = self._fallback.classify_and_reply(nlp_out)
+        result = self._response(
+            decision.category, reply, decision.confidence, "provider", cleaning=prepared.cleaning, long_document=meta
+        )
+        return self._remember(key, prepared, result)
+
+    async def _classify_chunk_async(self, chunk: str, keywords: Sequence[str]) -> Optional[Tuple[str, float]]:
+        try:
+            return await self._classify_only_async(chunk, keywords)
+        except Exception:
+            logger.warning("long_document_chunk_failed", extra={"event": "long_document_chunk_failed"}, exc_info=True)
+            return None
+
+    def _classify_chunk(self, chunk: str, keywords: Sequence[str]) -> Optional[Tuple[str, float]]:
+        try:
+            return self._ai.classify(chunk, keywords)
+        except Exception:
+            logger.warning("long_document_chunk_failed", extra={"event": "long_document_chunk_failed"}, exc_info=True)
+            return None
 
+    def _template_reply(self, text: str, category: str) -> Optional[str]:
+        if not self._reply_templates or category != "Improdutivo":
+            return None
+        return self._fallback.template_reply(text, category)
+
+    def _classification(
+        self,
+        key: Optional[str],
+        pending: Dict[str, Any],
+        tier: AnalysisTier,
+        cleaning: Optional[CleaningMeta] = None,
+    ) -> EmailAnalyzeResponse:
+        """Resultado do modo só-classificação: resposta de template na hora ou adiada (`reply`)."""
+        cache = "hit" if tier == "cache" else ("miss" if self._cache is not None else None)
+        meta = AnalysisMeta(tier=tier, cache=cache, cleaning=cleaning)
+
+        template = self._template_reply(pending["text"], pending["category"])
+        if template is not None:
+            safe = self._guard.ensure(pending["category"], template, pending["confidence"])
+            return EmailAnalyzeResponse(
+                category=safe.category, suggested_reply=safe.suggested_reply, confidence=safe.confidence, meta=meta
+            )
+
+        category, confidence = self._guard.classification(pending["category"], pending["confidence"])
+        return EmailAnalyzeResponse(
+            category=category,
+            confidence=confidence,
+            reply=None if key is None else DeferredReply(id=key, href=REPLY_HREF.format(id=key)),
+            meta=meta,
+        )
+
+    async def _classify_async(self, nlp_out: NlpOutput) -> Tuple[str, str, float]:
+        classify_async = getattr(self._ai, "classify_and_reply_async", None)
+        if classify_async is not None:
+            return await classify_async(nlp_out.raw_text, nlp_out.keywords)
+        return await asyncio.to_thread(self._ai.classify_and_reply, nlp_out.raw_text, nlp_out.keywords)
+
+    def _prepare(self, raw_text: str, nlp_out: Optional[NlpOutput] = None) -> _Prepared:
+        # CPU-bound (limpeza + NLP + MinHash): no caminho async roda inteiro em thread
+        cleaning: Optional[CleaningMeta] = None
+        if nlp_out is None:
+            text = raw_text
+            if self._cleaner is not None:
+                cleaned = self._cleaner.clean(raw_text)
+                text = cleaned.text
+                cleaning = _cleaning_meta(cleaned.input_chars, cleaned.output_chars, list(cleaned.removed))
+            nlp_out = self._nlp.run(text)
+        elif self._cleaner is not None:
+            # NLP prévio do lote (`preprocess_many`) já recebeu o texto limpo; a limpeza
+            # (determinística, só regex) é refeita para o meta trazer as seções removidas
+            cleaned = self._cleaner.clean(raw_text)
+            cleaning = _cleaning_meta(cleaned.input_chars, cleaned.output_chars, list(cleaned.removed))
+        if nlp_out.truncated:
+            logger.info(
+                "nlp_truncated",
+                extra={
+                    "event": "nlp_truncated",
+                    "reason": nlp_out.truncation_reason,
+                    "text_chars": len(nlp_out.raw_text),
+                    "processed_chars": len(nlp_out.normalized_text),
+                },
+            )
+        if self._near_duplicates is None:
+            return _Prepared(nlp_out=nlp_out, cleaning=cleaning)
+        return _Prepared(
+            nlp_out=nlp_out, signature=self._near_duplicates.signature(nlp_out.lemmas), cleaning=cleaning
+        )
+
+    def _response(
+        self,
+        category: str,
+        reply: str,
+        confidence: float,
+        tier: AnalysisTier,
+        near_duplicate: Optional[NearDuplicateMeta] = None,
+        cleaning: Optional[CleaningMeta] = None,
+        long_document: Optional[LongDocumentMeta] = None,
+    ) -> EmailAnalyzeResponse:
         safe = self._guard.ensure(category, reply, confidence)
 
         return EmailAnalyzeResponse(
             category=safe.category,
             suggested_reply=safe.suggested_reply,
             confidence=safe.confidence,
+            meta=AnalysisMeta(
+                tier=tier,
+                cache="miss" if self._cache is not None else None,
+                near_duplicate=near_duplicate,
+                cleaning=cleaning,
+                long_document=long_document,
+            ),
+        )
+
+    def _remember(self, key: Optional[str], prepared: _Prepared, result: EmailAnalyzeResponse) -> EmailAnalyzeResponse:
+        """Guarda resultado do provider no cache e no índice de quase-duplicados."""
+        self._cache_put(key, result)
+        if key is not None and self._near_duplicates is not None:
+            self._near_duplicates.add(
+                key, prepared.signature, self._cache_namespace, result.model_dump(exclude={"meta"})
+            )
+        return result
+
+    def _remember_event(self, key: Optional[str], prepared: _Prepared, done: ReplyStreamEvent) -> None:
+        self._remember(
+            key,
+            prepared,
+            EmailAnalyzeResponse(category=done.category, suggested_reply=done.text, confidence=done.confidence),
+        )
+
+    # ---------------------------
+    # Quase-duplicados
+    # ---------------------------
+    def _near_duplicate(self, prepared: _Prepared) -> Optional[EmailAnalyzeResponse]:
+        if self._near_duplicates is None:
+            return None
+
+        match = self._near_duplicates.find(prepared.signature, self._cache_namespace)
+        if match is None:
+            return None
+
+        reuse_reply = self._reuse_near_duplicate_reply
+        logger.info(
+            "near_duplicate_reused",
+            extra={
+                "event": "near_duplicate_reused",
+                "match_id": match.id,
+                "similarity": match.similarity,
+                "reply_reused": reuse_reply,
+            },
+        )
+        return self._response(
+            match.result["category"],
+            # sem reaproveitar a resposta, o guard aplica a resposta padrão da categoria
+            match.result["suggested_reply"] if reuse_reply else "",
+            match.result.get("confidence"),
+            "near_duplicate",
+            near_duplicate=NearDuplicateMeta(match_id=match.id, similarity=match.similarity, reply_reused=reuse_reply),
+            cleaning=prepared.cleaning,
+        )
+
+    # ---------------------------
+    # Classificador local
+    # ---------------------------
+    def _local(self, prepared: _Prepared) -> Optional[EmailAnalyzeResponse]:
+        if self._local_classifier is None:
+            return None
+
+        decision = self._local_classifier.decide(prepared.nlp_out.lemmas)
+        if decision is None:
+            return None
+
+        logger.info(
+            "local_classifier_answered",
+            extra={
+                "event": "local_classifier_answered",
+                "category": decision.category,
+                "confidence": decision.confidence,
+            },
+        )
+        # resposta vazia: o guard aplica a resposta padrão da categoria
+        return self._response(decision.category, "", decision.confidence, "local", cleaning=prepared.cleaning)
+
+    # ---------------------------
+    # Cache de resultados
+    # ---------------------------
+    def _cache_key(self, raw_text: str) -> Optional[str]:
+        # também é o id das entradas do índice de quase-duplicados e a chave do single-flight
+        if self._cache is None and self._near_duplicates is None and self._single_flight is None:
+            return None
+        return cache_key(raw_text, self._cache_namespace)
+
+    def _cache_get(self, key: Optional[str]) -> Optional[EmailAnalyzeResponse]:
+        return _cached_result(self._cache_read(key))
+
+    async def _cache_get_async(self, key: Optional[str]) -> Optional[EmailAnalyzeResponse]:
+        return _cached_result(await self._cache_read_async(key))
+
+    def _cache_put(self, key: Optional[str], result: EmailAnalyzeResponse) -> None:
+        self._cache_write(key, result.model_dump(exclude={"meta"}))
+
+    async def _pending_get_async(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        return await self._cache_read_async(None if key is None else _PENDING_PREFIX + key)
+
+    def _pending_put(self, key: Optional[str], pending: Dict[str, Any]) -> bool:
+        return self._cache_write(None if key is None else _PENDING_PREFIX + key, pending)
+
+    def _cache_read(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if key is None or self._cache is None:
+            return None
+        try:
+            return self._cache.get(key)
+        except Exception:
+            # cache é otimização: falha nele nunca derruba a análise
+            logger.exception("result_cache_get_failed", extra={"event": "result_cache_get_failed"})
+            return None
+
+    async def _cache_read_async(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if key is None or self._cache is None:
+            return None
+        try:
+            return await self._cache.get_async(key)
+        except Exception:
+            logger.exception("result_cache_get_failed", extra={"event": "result_cache_get_failed"})
+            return None
+
+    def _cache_write(self, key: Optional[str], value: Dict[str, Any]) -> bool:
+        if key is None or self._cache is None:
+            return False
+        try:
+            self._cache.put(key, value)
+            return True
+        except Exception:
+            logger.exception("result_cache_put_failed", extra={"event": "result_cache_put_failed"})
+            return False
+
+    def _log_fallback(self) -> None:
+        logger.exception(
+            "ai_provider_failed_using_fallback",
+            extra={"event": "ai_provider_failed_using_fallback"},
+        )
+
+    def _fallback_result(self, nlp_out: NlpOutput) -> Tuple[str, str, float]:
+        return self._fallback.classify_and_reply(nlp_out.raw_text)
+
+
+def _cleaning_meta(input_chars: int, output_chars: int, removed: List[str]) -> CleaningMeta:
+    ratio = round(input_chars / output_chars, 2) if output_chars else 1.0
+    return CleaningMeta(input_chars=input_chars, output_chars=output_chars, size_ratio=ratio, removed=removed)
+
+
+def _cached_result(value: Optional[Dict[str, Any]]) -> Optional[EmailAnalyzeResponse]:
+    if value is None:
+        return None
+    result = EmailAnalyzeResponse.model_validate(value)
+    return result.model_copy(update={"meta": AnalysisMeta(tier="cache", cache="hit")})
+
+
+def _mark_coalesced(result: EmailAnalyzeResponse) -> EmailAnalyzeResponse:
+    meta = (result.meta or AnalysisMeta()).model_copy(update={"coalesced": True})
+    return result.model_copy(update={"meta": meta})
+
+
+def _cached_events(cached: EmailAnalyzeResponse) -> List[ReplyStreamEvent]:
+    return [
+        ReplyStreamEvent(kind="classification", category=cached.category, confidence=cached.confidence),
+        ReplyStreamEvent(kind="delta", text=cached.suggested_reply),
+        ReplyStreamEvent(
+            kind="done", category=cached.category, confidence=cached.confidence, text=cached.suggested_reply
+        ),
+    ]
+
+
+class _StreamAssembler:
+    """Aplica o guard aos eventos do provider e monta o fechamento do stream (sync/async)."""
+
+    def __init__(self, guard: AiOutputGuard) -> None:
+        self._guard = guard
+        self._reply_guard = guard.stream()
+        self._classified: Optional[Tuple[str, float]] = None  # categoria/confiança já enviadas
+        self._streamed = False  # algum `delta` já saiu
+        self.final: Optional[Tuple[str, str, float]] = None
+
+    def on_event(self, event: ReplyStreamEvent) -> List[ReplyStreamEvent]:
+        if event.kind == "classification" and self._classified is None:
+            self._classified = self._guard.classification(event.category, event.confidence)
+            category, confidence = self._classified
+            return [ReplyStreamEvent(kind="classification", category=category, confidence=confidence)]
+
+        if event.kind == "delta":
+            safe_delta = self._reply_guard.feed(event.text)
+            if not safe_delta:
+                return []
+            self._streamed = True
+            return [ReplyStreamEvent(kind="delta", text=safe_delta)]
+
+        if event.kind == "done":
+            self.final = (event.category, event.text, event.confidence)
+        return []
+
+    def finish(self, fallback: Optional[Tuple[str, str, float]]) -> List[ReplyStreamEvent]:
+        """
+        Eventos finais. Com `fallback` (provider falhou) depois da `classification` já enviada,
+        a categoria enviada é mantida: do fallback só vale a resposta, e apenas se for da mesma
+        categoria (senão, a resposta padrão dela). O `done` sai marcado, e `replaced` avisa o
+        cliente para descartar os `delta` acumulados.
+        """
+        if fallback is not None and self._classified is not None:
+            category, confidence = self._classified
+            reply = fallback[1] if self._guard.classification(fallback[0], None)[0] == category else ""
+            safe = self._guard.ensure(category, reply, confidence)
+        else:
+            safe = self._guard.ensure(*(fallback or self.final))
+        events: List[ReplyStreamEvent] = []
+
+        if self._classified is None:
+            events.append(ReplyStreamEvent(kind="classification", category=safe.category, confidence=safe.confidence))
+            events.append(ReplyStreamEvent(kind="delta", text=safe.suggested_reply))
+
+        events.append(
+            ReplyStreamEvent(
+                kind="done",
+                category=safe.category,
+                confidence=safe.confidence,
+                text=safe.suggested_reply,
+                fallback=fallback is not None,
+                replaced=fallback is not None and self._streamed,
+            )
         )
+        return events
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# cabeçalho de citação de resposta (Gmail/Apple/Thunderbird), às vezes quebrado em 2 linhas
+_REPLY_HEADER_RE = re.compile(
+    r"^\s*(?:em\s.{4,300}?\sescreveu|on\s.{4,300}?\swrote|le\s.{4,300}?\sa\s[ée]crit)\s*:\s*$",
+    re.IGNORECASE,
+)
+# separador de resposta do Outlook; encaminhamentos ("Forwarded message") ficam: o conteúdo
+# encaminhado costuma ser o próprio pedido
+_ORIGINAL_MESSAGE_RE = re.compile(
+    r"^\s*-{2,}\s*(?:original message|mensagem original)\s*-{2,}\s*$",
+    re.IGNORECASE,
+)
+_FORWARDED_RE = re.compile(
+    r"^\s*-{2,}\s*(?:forwarded message|mensagem encaminhada|begin forwarded message)\s*-{0,}\s*:?\s*$",
+    re.IGNORECASE,
+)
+_UNDERSCORE_RULE_RE = re.compile(r"^\s*_{10,}\s*$")
+# bloco de cabeçalhos da mensagem citada (Outlook): "De:"/"From:" seguido de "Enviado:"/"Sent:"/"Para:"...
+_HEADER_FROM_RE = re.compile(r"^\s*\*?(?:de|from)\s*:\*?\s+\S", re.IGNORECASE)
+_HEADER_NEXT_RE = re.compile(
+    r"^\s*\*?(?:enviad[oa](?: em)?|sent|date|data|para|to|assunto|subject|cc)\s*:", re.IGNORECASE
+)
+_QUOTED_LINE_RE = re.compile(r"^\s*>")
+
+# assinatura (só nas últimas linhas): delimitador RFC 3676 exato ("-- "), rodapé de
+# aparelho/app ("Enviado do meu iPhone", "Sent from my...", "Get Outlook for...") e despedidas
+_SIGNATURE_DELIMITER = "-- "
+_SENT_FROM_RE = re.compile(
+    r"^\s*(?:enviado do meu|enviado de meu|sent from my|get outlook for|obter o outlook para"
+    r"|enviado do outlook|enviado do yahoo mail|sent from outlook|sent from yahoo mail)\b[^.!?]{0,40}$",
+    re.IGNORECASE,
+)
+_VALEDICTION_RE = re.compile(
+    r"^\s*(?:atenciosamente|att\.?|atte\.?|abra[çc]os?|abs\.?|cordialmente|sauda[çc][õo]es|grato|grata"
+    r"|obrigad[oa]|um abra[çc]o|best regards|kind regards|regards|best|cheers|thanks|thank you|sincerely)\s*[,.!]?\s*$",
+    re.IGNORECASE,
+)
+# janela do fim do corpo onde se procura assinatura
+_SIGNATURE_MAX_LINES = 8
+# despedida só corta se o que vem depois parece assinatura: poucas linhas, poucas palavras e
+# nenhuma frase ("Obrigado!\nPoderiam enviar o boleto?" é pedido, não assinatura)
+_VALEDICTION_TAIL_MAX_LINES = 4
+_VALEDICTION_TAIL_MAX_WORDS = 6
+
+# disclaimer: parágrafo com `_DISCLAIMER_MIN_MARKERS`+ marcadores distintos de aviso legal (PT/EN)
+_DISCLAIMER_MARKERS = re.compile(
+    r"confidencia|confidential|privileg|destinat[áa]rio|intended recipient|aviso legal|disclaimer"
+    r"|\blgpd\b|proibid|prohibited|se voc[êe] recebeu|if you (?:have )?received|esta mensagem|this (?:e-?mail|message)"
+    r"|notifique|notify the sender|apague|delete (?:it|this)",
+    re.IGNORECASE,
+)
+_DISCLAIMER_MIN_MARKERS = 3
+_ENVIRONMENT_RE = re.compile(
+    r"antes de imprimir|pense no meio ambiente|consider the environment before printing", re.IGNORECASE
+)
+
+# limpeza que deixaria o email quase vazio (ex.: encaminhamento sem comentário): mantém o original
+_MIN_CLEAN_CHARS = 20
+
+
+@dataclass(frozen=True)
+class CleanedEmail:
+    text: str
+    input_chars: int
+    output_chars: int
+    removed: Tuple[str, ...]  # seções removidas: "quote" | "signature" | "disclaimer"
+
+    @property
+    def size_ratio(self) -> float:
+        """Entrada / saída (ex.: 3.0 = o texto enviado ao NLP e à IA ficou 3x menor)."""
+        return round(self.input_chars / self.output_chars, 2) if self.output_chars else 1.0
+
+
+class EmailCleaner:
+    """
+    Remove do corpo o que não é a mensagem em si, antes do NLP e da IA:
+    - histórico citado: a partir do cabeçalho de resposta ("Em ... escreveu:", "On ... wrote:",
+      "-----Original Message-----", bloco "De:/Enviado:/Para:" do Outlook) e linhas com `>`;
+      encaminhamentos são mantidos
+    - assinatura, só entre as últimas linhas: a partir do delimitador "-- ", de um rodapé de
+      aparelho/app ("Enviado do meu iPhone", "Sent from my...") ou de uma despedida
+      ("Atenciosamente", "Best regards"...) seguida só de poucas linhas curtas
+    - disclaimers (parágrafos de aviso legal/confidencialidade) e "antes de imprimir..."
+
+    Só expressões regulares por linha (uma passada); sem dependências. Se a limpeza deixaria
+    o texto quase vazio (encaminhamento sem comentário), o original é mantido.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._texts = 0
+        self._input_chars = 0
+        self._output_chars = 0
+
+    def clean(self, text: str, record: bool = True) -> CleanedEmail:
+        """`record=False`: não entra nos contadores de `stats` (limpeza refeita depois para o meta)."""
+        raw = (text or "").strip()
+        lines = raw.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        removed: List[str] = []
+
+        cut = _quote_start(lines)
+        if cut is not None:
+            lines = lines[:cut]
+            removed.append("quote")
+        kept = [line for line in lines if not _QUOTED_LINE_RE.match(line)]
+        if len(kept) != len(lines) and "quote" not in removed:
+            removed.append("quote")
+        lines = kept
+
+        # disclaimers antes da assinatura: costumam vir depois dela e esconder a despedida do fim
+        lines, disclaimers = _drop_disclaimers(lines)
+        if disclaimers:
+            removed.append("disclaimer")
+
+        while lines and not lines[-1].strip():
+            lines.pop()
+        cut = _signature_start(lines)
+        if cut is not None:
+            lines = lines[:cut]
+            removed.append("signature")
+
+        cleaned = "\n".join(lines).strip()
+        if len(cleaned) < _MIN_CLEAN_CHARS and len(cleaned) < len(raw):
+            cleaned, removed = raw, []
+
+        result = CleanedEmail(
+            text=cleaned, input_chars=len(raw), output_chars=len(cleaned), removed=tuple(removed)
+        )
+        if not record:
+            return result
+        with self._lock:
+            self._texts += 1
+            self._input_chars += result.input_chars
+            self._output_chars += result.output_chars
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "texts": self._texts,
+                "input_chars": self._input_chars,
+                "output_chars": self._output_chars,
+                "size_ratio": round(self._input_chars / self._output_chars, 2) if self._output_chars else 1.0,
+            }
+
+
+def _quote_start(lines: List[str]) -> Optional[int]:
+    forwarded_until = -1
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        if _FORWARDED_RE.match(line):
+            # cabeçalhos logo abaixo do marcador são do encaminhamento, não de citação
+            forwarded_until = i + 6
+            continue
+        if _REPLY_HEADER_RE.match(line) or _ORIGINAL_MESSAGE_RE.match(line):
+            return i
+        # cabeçalho de resposta quebrado em duas linhas pelo cliente
+        if i + 1 < len(lines) and _REPLY_HEADER_RE.match(f"{line.rstrip()} {lines[i + 1].strip()}"):
+            return i
+        if i > forwarded_until and _HEADER_FROM_RE.match(line) and any(_HEADER_NEXT_RE.match(nxt) for nxt in lines[i + 1 : i + 4]):
+            # régua "____" logo acima (Outlook) também sai
+            return i - 1 if i > 0 and _UNDERSCORE_RULE_RE.match(lines[i - 1]) else i
+    return None
+
+
+def _signature_start(lines: List[str]) -> Optional[int]:
+    # só o fim do corpo: frases comuns ("Enviado do financeiro ontem...") no meio nunca cortam
+    n = len(lines)
+    window = range(max(0, n - _SIGNATURE_MAX_LINES - 1), n)
+    for i in window:
+        if lines[i] == _SIGNATURE_DELIMITER or _SENT_FROM_RE.match(lines[i]):
+            return i
+
+    # despedida: só se o resto parece assinatura (nome, cargo, telefone)
+    for i in window:
+        if _VALEDICTION_RE.match(lines[i]) and _looks_like_signature(lines[i + 1 :]):
+            return i
+    return None
+
+
+def _looks_like_signature(lines: List[str]) -> bool:
+    tail = [line.strip() for line in lines if line.strip()]
+    return len(tail) <= _VALEDICTION_TAIL_MAX_LINES and all(
+        not line.endswith(("?", ".", "!")) and len(line.split()) <= _VALEDICTION_TAIL_MAX_WORDS for line in tail
+    )
+
+
+def _drop_disclaimers(lines: List[str]) -> Tuple[List[str], bool]:
+    out: List[str] = []
+    paragraph: List[str] = []
+    dropped = False
+
+    def flush() -> None:
+        nonlocal dropped
+        if paragraph:
+            markers = {m.group(0).lower() for m in _DISCLAIMER_MARKERS.finditer(" ".join(paragraph))}
+            if len(markers) >= _DISCLAIMER_MIN_MARKERS:
+                dropped = True
+            else:
+                out.extend(paragraph)
+            paragraph.clear()
+
+    for line in lines:
+        if _ENVIRONMENT_RE.search(line) and len(line.strip()) <= 120:
+            dropped = True
+            continue
+        if line.strip():
+            paragraph.append(line)
+        else:
+            flush()
+            out.append(line)
+    flush()
+    return out, dropped
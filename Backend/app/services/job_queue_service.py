@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.domain.models.api_response import ApiError
+from app.providers.email_reader import EmailReader
+from app.providers.job_store import TERMINAL_STATUSES, JobRecord, JobStore
+from app.providers.pdf_sandbox import PdfSandboxError
+from app.services.email_classifier_service import EmailClassifierService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class JobInput:
+    """Entrada do job (fica só no processo dono; o store guarda apenas estado/resultado)."""
+
+    text: Optional[str] = None
+    path: Optional[str] = None  # arquivo temporário (upload) — removido ao final do job
+    data: Optional[bytes] = None  # upload pequeno mantido em memória (sem arquivo temporário)
+    filename: Optional[str] = None
+    content_hash: Optional[str] = None  # sha256 do upload (cache de extração de PDF)
+
+
+class JobQueueFull(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Fila de jobs cheia.")
+        self.retry_after = retry_after
+
+
+class JobExecutionError(Exception):
+    def __init__(self, code: str, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class JobQueueService:
+    """
+    Fila de jobs em processo:
+    - `workers` tarefas asyncio consomem uma fila limitada (`depth`)
+    - fila cheia -> `JobQueueFull` com Retry-After estimado (rota responde 503 na hora)
+    - estado/resultados ficam no `JobStore` (memória ou SQLite compartilhado entre workers)
+    - cancelamento: na fila -> cancelado direto; rodando -> a task é cancelada pelo processo dono
+      (pedido vindo de outro worker é percebido pelo polling de `cancel_poll_seconds`)
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        service_factory: Callable[[], EmailClassifierService],
+        reader: EmailReader,
+        *,
+        workers: int,
+        depth: int,
+        timeout_seconds: float,
+        result_ttl_seconds: float,
+        cancel_poll_seconds: float = 1.0,
+    ) -> None:
+        self._store = store
+        self._service_factory = service_factory
+        self._reader = reader
+        self._workers_count = max(1, workers)
+        self._depth = max(1, depth)
+        self._timeout_seconds = timeout_seconds
+        self._result_ttl_seconds = result_ttl_seconds
+        self._cancel_poll_seconds = cancel_poll_seconds
+
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._avg_job_seconds = 5.0  # média móvel para estimar o Retry-After
+
+    # ---------------------------
+    # Ciclo de vida
+    # ---------------------------
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self._depth)
+        self._workers = [asyncio.create_task(self._worker_loop()) for _ in range(self._workers_count)]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # jobs que ficaram na fila deste processo não vão rodar
+        if self._queue is not None:
+            while not self._queue.empty():
+                job_id, job_input = self._queue.get_nowait()
+                await self._call(self._store.finish, job_id, "failed", time.time(), None, _error("JOB_ABORTED", "Servidor reiniciado antes de executar o job."))
+                self._cleanup(job_input)
+        self._queue = None
+
+    # ---------------------------
+    # API
+    # ---------------------------
+    def ensure_capacity(self) -> None:
+        """Falha rápido (antes de receber upload) se a fila está cheia."""
+        self.start()
+        if self._queue is not None and self._queue.full():
+            raise JobQueueFull(self.retry_after())
+
+    async def submit(self, job_input: JobInput, kind: str) -> JobRecord:
+        self.ensure_capacity()
+
+        record = JobRecord(
+            id=uuid.uuid4().hex,
+            status="queued",
+            kind=kind,
+            owner=self._owner,
+            created_at=time.time(),
+            filename=job_input.filename,
+        )
+        await self._call(self._store.purge_finished, record.created_at - self._result_ttl_seconds)
+        await self._call(self._store.create, record)
+
+        try:
+            self._queue.put_nowait((record.id, job_input))
+        except asyncio.QueueFull:
+            await self._call(self._store.finish, record.id, "failed", time.time(), None, _error("JOB_QUEUE_FULL", "Fila de jobs cheia."))
+            raise JobQueueFull(self.retry_after())
+
+        logger.info("job_submitted", extra={"event": "job_submitted", "job_id": record.id, "kind": kind})
+        return record
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        record = await self._call(self._store.get, job_id)
+        if record is not None and record.status not in TERMINAL_STATUSES and not self._owner_alive(record.owner):
+            # processo dono morreu (reciclagem do gunicorn, deploy): o job não vai terminar
+            await self._call(self._store.finish, job_id, "failed", time.time(), None, _error("JOB_LOST", "O worker que executava o job foi encerrado."))
+            record = await self._call(self._store.get, job_id)
+        return record
+
+    async def cancel(self, job_id: str) -> Optional[JobRecord]:
+        record = await self._call(self._store.request_cancel, job_id, time.time())
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return record
+
+    def retry_after(self) -> int:
+        backlog = (self._queue.qsize() if self._queue is not None else 0) + 1
+        estimate = self._avg_job_seconds * backlog / self._workers_count
+        return int(min(300, max(1, math.ceil(estimate))))
+
+    # ---------------------------
+    # Execução
+    # ---------------------------
+    async def _worker_loop(self) -> None:
+        while True:
+            job_id, job_input = await self._queue.get()
+            try:
+                await self._run(job_id, job_input)
+            except asyncio.CancelledError:
+                self._cleanup(job_input)
+                raise
+            except Exception:
+                logger.exception("job_worker_error", extra={"event": "job_worker_error", "job_id": job_id})
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, job_input: JobInput) -> None:
+        started = time.time()
+        if not await self._call(self._store.mark_running, job_id, started):
+            # cancelado enquanto esperava na fila
+            self._cleanup(job_input)
+            return
+
+        task = asyncio.create_task(self._execute(job_input))
+        self._running[job_id] = task
+        watcher = asyncio.create_task(self._watch_cancel(job_id, task))
+
+        try:
+            done, _ = await asyncio.wait({task}, timeout=self._timeout_seconds)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            watcher.cancel()
+            self._running.pop(job_id, None)
+            self._cleanup(job_input)
+
+        finished = time.time()
+        if not done:
+            task.cancel()
+            status, result, error = "failed", None, _error("JOB_TIMEOUT", f"Job excedeu {int(self._timeout_seconds)}s.")
+        elif task.cancelled():
+            status, result, error = "cancelled", None, None
+        elif task.exception() is not None:
+            status, result, error = "failed", None, self._error_from(task.exception())
+        else:
+            status, result, error = "succeeded", task.result(), None
+
+        await self._call(self._store.finish, job_id, status, finished, result, error)
+
+        duration = finished - started
+        self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * duration
+        logger.info(
+            "job_finished",
+            extra={"event": "job_finished", "job_id": job_id, "status": status, "duration_ms": int(duration * 1000)},
+        )
+
+    async def _execute(self, job_input: JobInput) -> dict:
+        text = job_input.text
+        if text is None and (job_input.path is not None or job_input.data is not None):
+            try:
+                if job_input.path is not None:
+                    content = await asyncio.to_thread(
+                        self._reader.from_path, job_input.path, job_input.filename, job_input.content_hash
+                    )
+                else:
+                    content = await asyncio.to_thread(
+                        self._reader.from_bytes, job_input.data, job_input.filename, job_input.content_hash
+                    )
+            except PdfSandboxError as exc:
+                raise JobExecutionError("PDF_REJECTED", exc.message) from exc
+            text = content.text
+
+        if not (text or "").strip():
+            raise JobExecutionError("EMPTY_TEXT", "Não foi possível extrair texto do arquivo.")
+
+        service = self._service_factory()
+        result = await service.analyze_async(text)
+        return result.model_dump()
+
+    async def _watch_cancel(self, job_id: str, task: asyncio.Task) -> None:
+        # cancelamento pedido em outro worker (store compartilhado)
+        while not task.done():
+            await asyncio.sleep(self._cancel_poll_seconds)
+            record = await self._call(self._store.get, job_id)
+            if record is not None and record.cancel_requested:
+                task.cancel()
+                return
+
+    # ---------------------------
+    # Helpers
+    # ---------------------------
+    async def _call(self, fn, *args):
+        # store pode ser SQLite (I/O bloqueante): nunca no event loop
+        return await asyncio.to_thread(fn, *args)
+
+    def _owner_alive(self, owner: str) -> bool:
+        host, _, pid = owner.rpartition(":")
+        if owner == self._owner or host != socket.gethostname():
+            return True  # outro host: sem como verificar, assume vivo
+        try:
+            os.kill(int(pid), 0)
+        except (ValueError, ProcessLookupError):
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _error_from(self, exc: BaseException) -> dict:
+        if isinstance(exc, JobExecutionError):
+            return _error(exc.code, exc.message)
+        if isinstance(exc, HTTPException):
+            return _error("HTTP_ERROR", str(exc.detail))
+        logger.error("job_failed", exc_info=exc, extra={"event": "job_failed"})
+        return _error("INTERNAL_ERROR", "Falha inesperada ao executar o job.")
+
+    def _cleanup(self, job_input: JobInput) -> None:
+        if job_input.path:
+            try:
+                Path(job_input.path).unlink(missing_ok=True)
+            except Exception:
+                logger.warning(
+                    "failed_to_delete_tempfile",
+                    extra={"event": "failed_to_delete_tempfile", "tmp_path": job_input.path},
+                )
+
+
+def _error(code: str, message: str) -> dict:
+    return ApiError(code=code, message=message).model_dump()
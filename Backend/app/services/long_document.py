@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"[.!?…]+\s")
+
+# chunk `Produtivo` com pelo menos esta confiança decide o documento: basta um parágrafo
+# pedindo ação (ex.: no meio de uma thread longa) para o documento pedir ação
+_PRODUCTIVE_MIN_CONFIDENCE = 0.5
+
+
+@dataclass(frozen=True)
+class ChunkDecision:
+    category: str
+    confidence: float
+    selected: int  # índice do chunk mais relevante (base da resposta)
+
+
+def split_chunks(text: str, chunk_chars: int, max_chunks: int) -> List[str]:
+    """
+    Divide o texto em até `max_chunks` pedaços de ~`chunk_chars`, cortando em parágrafos
+    (linha em branco). Texto maior que `chunk_chars * max_chunks` aumenta o tamanho do
+    chunk em vez do número de chamadas. Parágrafo maior que o chunk é cortado em fim de
+    frase (ou espaço).
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    size = max(chunk_chars, -(-len(text) // max(1, max_chunks)))
+
+    pieces: List[str] = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > size:
+            cut = _cut_point(paragraph, size)
+            pieces.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    for piece in pieces:
+        if current and current_len + 2 + len(piece) > size:
+            chunks.append("\n\n".join(current))
+            current, current_len = [], 0
+        current.append(piece)
+        current_len += len(piece) + (2 if current_len else 0)
+    if current:
+        chunks.append("\n\n".join(current))
+
+    # cortes em parágrafo podem gerar chunks a mais: junta os excedentes no último
+    if len(chunks) > max_chunks:
+        chunks = chunks[: max_chunks - 1] + ["\n\n".join(chunks[max_chunks - 1 :])]
+    return chunks
+
+
+def reduce_chunks(results: Sequence[Optional[Tuple[str, float]]]) -> Optional[ChunkDecision]:
+    """
+    Junta as classificações dos chunks (None = chamada do chunk falhou):
+    - algum chunk `Produtivo` confiante: documento `Produtivo`, com a maior confiança entre
+      eles; o chunk dessa confiança é o selecionado
+    - senão: `Improdutivo`, com a confiança média; selecionado = o mais confiante
+    None se todos falharam.
+    """
+    ok = [(idx, r[0], r[1]) for idx, r in enumerate(results) if r is not None]
+    if not ok:
+        return None
+
+    productive = [
+        (confidence, idx)
+        for idx, category, confidence in ok
+        if category == "Produtivo" and confidence >= _PRODUCTIVE_MIN_CONFIDENCE
+    ]
+    if productive:
+        confidence, idx = max(productive, key=lambda item: (item[0], -item[1]))
+        return ChunkDecision(category="Produtivo", confidence=confidence, selected=idx)
+
+    confidences = [confidence for _, category, confidence in ok if category != "Produtivo"]
+    if not confidences:
+        # só `Produtivo` de baixa confiança: mantém a categoria, sem promover a confiança
+        confidence, idx = max((confidence, idx) for idx, _, confidence in ok)
+        return ChunkDecision(category="Produtivo", confidence=confidence, selected=idx)
+    _, idx = max((confidence, idx) for idx, category, confidence in ok if category != "Produtivo")
+    return ChunkDecision(category="Improdutivo", confidence=sum(confidences) / len(confidences), selected=idx)
+
+
+def _cut_point(text: str, size: int) -> int:
+    window = text[: size + 1]
+    ends = [m.end() for m in _SENTENCE_END_RE.finditer(window)]
+    if ends and ends[-1] > size // 2:
+        return ends[-1]
+    space = window.rfind(" ", size // 2)
+    return space if space > 0 else size
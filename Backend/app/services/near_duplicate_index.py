@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# hash universal (a*x + b) mod p com x de 32 bits e a, b < 2^31: cabe em uint64 sem overflow
+_PRIME = np.uint64((1 << 32) + 15)
+_MAX_COEF = 1 << 31
+# shingles por bloco no cálculo da assinatura: temporários de num_perm x bloco (1 MB com 128 permutações)
+_SIGNATURE_CHUNK = 1024
+
+
+@dataclass(frozen=True)
+class NearDuplicateMatch:
+    id: str
+    similarity: float
+    result: Dict[str, Any]
+
+
+@dataclass
+class _Entry:
+    namespace: str
+    signature: np.ndarray
+    result: Dict[str, Any]
+    expires_at: float
+    band_keys: List[Tuple[int, bytes]]
+
+
+class NearDuplicateIndex:
+    """
+    Índice MinHash + LSH das análises recentes (por worker), para emails "de template"
+    (notificações, faturas, respostas automáticas) que só mudam nomes/números.
+
+    - shingles: n-gramas de lemas do `NlpPreprocess` (números/urls/emails já viram placeholders)
+    - assinatura: `num_perm` mínimos de hashes universais (vetorizado com NumPy)
+    - LSH: `bands` faixas da assinatura; emails que colidem em alguma faixa viram candidatos
+    - similaridade: fração de posições iguais nas assinaturas (estimativa do Jaccard)
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 3,
+        min_lemmas: int = 8,
+        max_entries: int = 5000,
+        ttl_seconds: float = 86400,
+        seed: int = 1,
+    ) -> None:
+        if num_perm % bands != 0:
+            raise ValueError("num_perm deve ser múltiplo de bands.")
+
+        self._threshold = threshold
+        self._num_perm = num_perm
+        self._bands = bands
+        self._rows = num_perm // bands
+        self._shingle_size = max(1, shingle_size)
+        self._min_lemmas = min_lemmas
+        self._max_entries = max(1, max_entries)
+        self._ttl_seconds = ttl_seconds
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MAX_COEF, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MAX_COEF, size=num_perm, dtype=np.uint64)
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        self._lock = threading.Lock()
+
+        self._lookups = 0
+        self._matches = 0
+
+    def signature(self, lemmas: Sequence[str]) -> Optional[np.ndarray]:
+        """Assinatura MinHash dos lemas (None se o texto é curto demais para comparar)."""
+        if len(lemmas) < self._min_lemmas:
+            return None
+
+        k = self._shingle_size
+        shingles = {" ".join(lemmas[i : i + k]) for i in range(len(lemmas) - k + 1)}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+
+        # mínimo por permutação, em blocos de colunas: memória fixa mesmo com documentos longos
+        # (a matriz num_perm x n inteira passava de 60 MB com ~30 mil lemas)
+        signature = np.full(self._num_perm, _PRIME, dtype=np.uint64)
+        buf = np.empty((self._num_perm, min(_SIGNATURE_CHUNK, hashes.shape[0])), dtype=np.uint64)
+        for start in range(0, hashes.shape[0], _SIGNATURE_CHUNK):
+            chunk = hashes[start : start + _SIGNATURE_CHUNK]
+            out = buf[:, : chunk.shape[0]]
+            np.multiply.outer(self._a, chunk, out=out)
+            out += self._b[:, None]
+            out %= _PRIME
+            np.minimum(signature, out.min(axis=1), out=signature)
+        return signature
+
+    def find(self, signature: Optional[np.ndarray], namespace: str) -> Optional[NearDuplicateMatch]:
+        if signature is None:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            self._lookups += 1
+
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                candidates.update(self._buckets.get(band_key, ()))
+
+            best: Optional[Tuple[float, str, _Entry]] = None
+            for entry_id in candidates:
+                entry = self._entries.get(entry_id)
+                if entry is None or entry.namespace != namespace:
+                    continue
+                if entry.expires_at <= now:
+                    self._remove(entry_id)
+                    continue
+                similarity = float(np.count_nonzero(entry.signature == signature)) / self._num_perm
+                if similarity >= self._threshold and (best is None or similarity > best[0]):
+                    best = (similarity, entry_id, entry)
+
+            if best is None:
+                return None
+
+            similarity, entry_id, entry = best
+            self._matches += 1
+            return NearDuplicateMatch(id=entry_id, similarity=round(similarity, 4), result=dict(entry.result))
+
+    def add(self, entry_id: str, signature: Optional[np.ndarray], namespace: str, result: Dict[str, Any]) -> None:
+        if signature is None:
+            return
+
+        band_keys = self._band_keys(signature)
+        entry = _Entry(
+            namespace=namespace,
+            signature=signature,
+            result=dict(result),
+            expires_at=time.monotonic() + self._ttl_seconds,
+            band_keys=band_keys,
+        )
+
+        with self._lock:
+            if entry_id in self._entries:
+                self._remove(entry_id)
+
+            self._entries[entry_id] = entry
+            for band_key in band_keys:
+                self._buckets.setdefault(band_key, []).append(entry_id)
+
+            while len(self._entries) > self._max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "lookups": self._lookups,
+                "matches": self._matches,
+                "threshold": self._threshold,
+            }
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        r = self._rows
+        return [(band, signature[band * r : (band + 1) * r].tobytes()) for band in range(self._bands)]
+
+    def _remove(self, entry_id: str) -> None:
+        entry = self._entries.pop(entry_id)
+        for band_key in entry.band_keys:
+            ids = self._buckets.get(band_key)
+            if ids is None:
+                continue
+            try:
+                ids.remove(entry_id)
+            except ValueError:
+                pass
+            if not ids:
+                del self._buckets[band_key]
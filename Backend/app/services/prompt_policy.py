@@ -1,7 +1,68 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# estimativa de tokens sem tokenizer: cada palavra vale 1 token a cada 4 caracteres (arredondado
+# para cima), cada pontuação vale 1 — fica um pouco acima do BPE real em pt/en (limite conservador)
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# unidades da compactação: frases (fim em .!?…) ou linhas; texto sem pontuação (PDF) é fatiado
+_UNIT_END_RE = re.compile(r"[.!?…]+(?=\s)|\n")
+_MAX_UNIT_CHARS = 600
+
+# fatias do orçamento do corpo: começo (saudação/pedido) e fim (fechamento/pergunta final);
+# o resto vai para as frases do meio com mais palavras-chave do NLP
+_HEAD_SHARE = 0.35
+_TAIL_SHARE = 0.20
+_GAP_MARKER = "\n[...]\n"
+_MIN_EMAIL_TOKENS = 256
+_OMITTED_NOTE = "(trechos omitidos marcados com [...])\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return sum(1 + (len(piece) - 1) // 4 for piece in _TOKEN_RE.findall(text or ""))
+
+
+_GAP_TOKENS = estimate_tokens(_GAP_MARKER)
+
+
+@dataclass(frozen=True)
+class CompactedText:
+    text: str
+    input_tokens: int  # estimativa do corpo original
+    output_tokens: int  # estimativa do corpo enviado
+    units_total: int = 0
+    units_kept: int = 0
+
+    @property
+    def compacted(self) -> bool:
+        return self.units_kept < self.units_total
+
 
 class PromptPolicy:
+    # incrementar ao mudar `build_user`/`build_reply_user` (os textos de system já entram no hash de `version`)
+    REVISION = 3
+
+    def __init__(self, max_input_tokens: int = 0) -> None:
+        # orçamento (estimado) da mensagem do usuário; 0 = envia o email inteiro
+        self.max_input_tokens = max_input_tokens
+
+    @property
+    def version(self) -> str:
+        """Identifica a política atual (usada na chave do cache de resultados)."""
+        systems = self.build_system() + "\x00" + self.build_classify_system()
+        systems += "\x00" + self.build_packed_classify_system()
+        systems += f"\x00{self.max_input_tokens}"
+        digest = hashlib.sha256(systems.encode("utf-8")).hexdigest()[:12]
+        return f"{self.REVISION}-{digest}"
+
     def build_system(self) -> str:
         return (
             "Você é um assistente de triagem de emails. "
@@ -37,9 +98,179 @@ class PromptPolicy:
             "- Não retorne nada além do texto da resposta (sem JSON, sem explicações)."
         )
 
+    def build_classify_system(self) -> str:
+        """Só classificação (modelo menor, saída mínima: categoria + confiança)."""
+        return (
+            "Você é um assistente de triagem de emails. "
+            "Classifique o email como Produtivo ou Improdutivo. Não escreva resposta.\n\n"
+            "- Produtivo: pede ação, suporte, atualização, envia problema/dúvida ou documento para tratar.\n"
+            "- Improdutivo: agradecimentos, felicitações, marketing, avisos automáticos, convite genérico sem ação.\n"
+            "- confidence: 0 a 1, o quanto você tem certeza da categoria."
+        )
+
+    def build_packed_classify_system(self) -> str:
+        """Só classificação de vários emails por chamada (saída: um item por email, pelo índice)."""
+        return (
+            self.build_classify_system()
+            + "\n\nVocê receberá VÁRIOS emails independentes, cada um marcado com [índice]. "
+            "Classifique cada um isoladamente (o conteúdo de um não influencia o outro) e retorne "
+            "exatamente um item por email, com o mesmo `index`."
+        )
+
+    def build_packed_user(self, items: list[tuple[str, list[str]]]) -> str:
+        blocks = []
+        for index, (email_text, keywords) in enumerate(items):
+            kw = ", ".join(keywords[:10]) or "nenhuma"
+            blocks.append(f'[{index}]\n"""\n{email_text.strip()}\n"""\nPalavras-chave (NLP): {kw}\n')
+        return f"Emails ({len(items)}):\n\n" + "\n".join(blocks)
+
     def build_user(self, email_text: str, keywords: list[str]) -> str:
         kw = ", ".join(keywords[:25]) or "nenhuma"
+        compacted = self.compact(email_text, keywords)
+        note = _OMITTED_NOTE if compacted.compacted else ""
         return (
-            f'Email:\n"""\n{email_text.strip()}\n"""\n\n'
+            f'Email:\n{note}"""\n{compacted.text}\n"""\n\n'
             f"Palavras-chave (NLP): {kw}\n"
         )
+
+    def build_reply_user(self, email_text: str, keywords: list[str], category: str) -> str:
+        """Geração da resposta sob demanda: a categoria já foi decidida na classificação."""
+        return (
+            self.build_user(email_text, keywords)
+            + f"Categoria (já definida): {category}\n"
+            + "Escreva apenas a resposta sugerida.\n"
+        )
+
+    def compact(self, email_text: str, keywords: list[str]) -> CompactedText:
+        """
+        Encaixa o corpo no orçamento `max_input_tokens` (descontados moldura e palavras-chave):
+        mantém o começo, o fim e, no meio, as frases com maior densidade de palavras-chave do
+        NLP, na ordem original e com `[...]` nos cortes. Dentro do orçamento, o texto vai inteiro.
+        """
+        text = (email_text or "").strip()
+        input_tokens = estimate_tokens(text)
+        if self.max_input_tokens <= 0:
+            return CompactedText(text=text, input_tokens=input_tokens, output_tokens=input_tokens)
+
+        kw = ", ".join(keywords[:25]) or "nenhuma"
+        overhead = estimate_tokens(f'Email:\n{_OMITTED_NOTE}"""\n\n"""\n\nPalavras-chave (NLP): {kw}\n') + _GAP_TOKENS
+        budget = max(_MIN_EMAIL_TOKENS, self.max_input_tokens - overhead)
+        if input_tokens <= budget:
+            return CompactedText(text=text, input_tokens=input_tokens, output_tokens=input_tokens)
+
+        spans = _units(text)
+        costs = [estimate_tokens(text[start:end]) for start, end in spans]
+        kept = _select(text, spans, costs, budget, _keyword_stems(keywords))
+
+        parts: List[str] = []
+        prev = -1
+        for idx in kept:
+            if parts and idx != prev + 1:
+                parts.append(_GAP_MARKER)
+            elif parts:
+                # unidade contígua: preserva o separador original (espaço/quebra de linha)
+                parts.append(text[spans[prev][1] : spans[idx][0]])
+            parts.append(text[spans[idx][0] : spans[idx][1]])
+            prev = idx
+        if kept and kept[-1] != len(spans) - 1:
+            parts.append(_GAP_MARKER)
+        out = "".join(parts).strip()
+
+        result = CompactedText(
+            text=out,
+            input_tokens=input_tokens,
+            output_tokens=estimate_tokens(out),
+            units_total=len(spans),
+            units_kept=len(kept),
+        )
+        logger.info(
+            "prompt_compacted",
+            extra={
+                "event": "prompt_compacted",
+                "input_tokens": result.input_tokens,
+                "output_tokens": result.output_tokens,
+                "budget_tokens": budget,
+                "units_total": result.units_total,
+                "units_kept": result.units_kept,
+            },
+        )
+        return result
+
+
+def _units(text: str) -> List[Tuple[int, int]]:
+    """Spans (início, fim) das frases/linhas não vazias; unidades longas são fatiadas em espaços."""
+    spans: List[Tuple[int, int]] = []
+    start = 0
+    bounds = [m.end() for m in _UNIT_END_RE.finditer(text)] + [len(text)]
+    for end in bounds:
+        piece = text[start:end]
+        lead = len(piece) - len(piece.lstrip())
+        s, e = start + lead, start + len(piece.rstrip())
+        while e - s > _MAX_UNIT_CHARS:
+            cut = text.rfind(" ", s + _MAX_UNIT_CHARS // 2, s + _MAX_UNIT_CHARS)
+            cut = cut if cut > s else s + _MAX_UNIT_CHARS
+            spans.append((s, cut))
+            s = cut
+            while s < e and text[s].isspace():
+                s += 1
+        if e > s:
+            spans.append((s, e))
+        start = end
+    return spans
+
+
+def _keyword_stems(keywords: list[str]) -> Set[str]:
+    # keywords são lemas ("fatura", "gerar"): casam com as formas flexionadas pelo prefixo
+    stems = set()
+    for keyword in keywords[:25]:
+        word = re.sub(r"\W+", "", keyword.lower())
+        if len(word) >= 3:
+            stems.add(word[:5])
+    return stems
+
+
+def _select(
+    text: str, spans: List[Tuple[int, int]], costs: List[int], budget: int, stems: Set[str]
+) -> List[int]:
+    kept: Set[int] = set()
+    used = 0
+
+    def take(idx: int, limit: int, extra: int = 0) -> bool:
+        nonlocal used
+        cost = costs[idx] + extra
+        if used + cost > limit:
+            return False
+        kept.add(idx)
+        used += cost
+        return True
+
+    head_limit = int(budget * _HEAD_SHARE)
+    head_end = 0
+    while head_end < len(spans) and take(head_end, head_limit):
+        head_end += 1
+
+    tail_limit = used + int(budget * _TAIL_SHARE)
+    tail_start = len(spans)
+    while tail_start - 1 >= head_end and take(tail_start - 1, tail_limit):
+        tail_start -= 1
+
+    # meio: densidade de palavras-chave, cada uma pesando pelo quão rara é entre as frases
+    # (idf: boilerplate repetido pesa pouco); cada unidade pode abrir um corte (`[...]`)
+    middle = range(head_end, tail_start)
+    found: Dict[int, List[str]] = {}
+    df: Dict[str, int] = {}
+    for idx in middle:
+        words = [w[:5] for w in re.findall(r"\w+", text[spans[idx][0] : spans[idx][1]].lower())]
+        hits = [w for w in words if w in stems]
+        if hits:
+            found[idx] = hits
+            for stem in set(hits):
+                df[stem] = df.get(stem, 0) + 1
+    n = max(1, len(middle))
+    scored = []
+    for idx, hits in found.items():
+        weight = sum(math.log(1 + n / df[stem]) for stem in hits)
+        scored.append((-weight / max(1, costs[idx]), idx))
+    for _, idx in sorted(scored):
+        take(idx, budget, extra=_GAP_TOKENS)
+    return sorted(kept)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """O líder foi cancelado (cliente desconectou): quem esperava tenta de novo."""
+
+
+class SingleFlight:
+    """
+    Coalescência de chamadas idênticas em voo (por worker): a primeira chamada de uma chave
+    executa; as concorrentes com a mesma chave esperam e recebem o mesmo resultado
+    (ou a mesma exceção).
+
+    Funciona entre o threadpool (`do`) e o event loop (`do_async`) ao mesmo tempo:
+    o estado em voo é um `concurrent.futures.Future`, que threads esperam com `.result()`
+    e corrotinas com `asyncio.wrap_future` (sem bloquear o loop).
+    Retorna `(resultado, coalesced)`; `coalesced=True` para quem só esperou.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        while True:
+            fut, leader = self._join(key)
+            if not leader:
+                try:
+                    return fut.result(), True
+                except _LeaderCancelled:
+                    continue
+
+            try:
+                result = fn()
+            except BaseException as exc:
+                self._finish(key, fut, exc=exc)
+                raise
+            self._finish(key, fut, result=result)
+            return result, False
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        while True:
+            fut, leader = self._join(key)
+            if not leader:
+                try:
+                    # shield: cancelar um seguidor (cliente desconectou) não pode cancelar o futuro compartilhado
+                    return await asyncio.shield(asyncio.wrap_future(fut)), True
+                except _LeaderCancelled:
+                    continue
+
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                # o trabalho morreu com o líder: libera os seguidores para um deles assumir
+                self._finish(key, fut, exc=_LeaderCancelled())
+                raise
+            except BaseException as exc:
+                self._finish(key, fut, exc=exc)
+                raise
+            self._finish(key, fut, result=result)
+            return result, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "executed": self._leaders, "coalesced": self._coalesced}
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            fut = self._calls.get(key)
+            if fut is not None:
+                self._coalesced += 1
+                return fut, False
+            fut = Future()
+            self._calls[key] = fut
+            self._leaders += 1
+            return fut, True
+
+    def _finish(self, key: str, fut: Future, *, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._calls.get(key) is fut:
+                del self._calls[key]
+        if fut.done():
+            return
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
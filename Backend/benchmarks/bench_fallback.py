@@ -0,0 +1,131 @@
+"""
+Benchmark do HeuristicFallbackProvider (emails/s e MB/s) — em queda da OpenAI ele atende
+todo o tráfego.
+
+Compara o matcher compilado (Aho-Corasick, uma passada) com duas referências:
+- `1º sinal`: implementação anterior (primeiro grupo com algum sinal vence; para no 1º `in`)
+- `todos`: mesmo score ponderado do engine, com um `in` por sinal
+com as regras embutidas e com `--extra-signals` sinais sintéticos a mais (o custo das
+referências cresce com o número de sinais; o do autômato não). Os textos têm poucos
+sinais (`--signal-rate` por palavra), como emails reais.
+
+Uso (na pasta Backend):
+    python -m benchmarks.bench_fallback
+    python -m benchmarks.bench_fallback --sizes 1KB,10KB --extra-signals 0,500 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Set, Tuple
+
+from app.providers.fallback_provider import DEFAULT_RULES_PATH, FallbackRules, HeuristicFallbackProvider
+from benchmarks.bench_nlp import _EXTRAS, _WORDS_EN, _WORDS_PT
+
+_SIZES = {"1KB": 1024, "10KB": 10 * 1024, "100KB": 100 * 1024}
+
+
+def _fallback_text(rules: FallbackRules, size: int, rate: float, seed: int) -> str:
+    signals = [s for g in rules.groups for s in g.signals]
+    # vocabulário neutro (sem nenhum sinal dentro); sinais entram só na taxa pedida
+    neutral = [w for w in _WORDS_PT + _WORDS_EN + _EXTRAS if not any(s in w for s in signals)]
+    rng = random.Random(seed)
+    words: List[str] = []
+    total = 0
+    while total < size:
+        word = rng.choice(signals) if rng.random() < rate else rng.choice(neutral)
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)[:size]
+
+
+class _ReferenceFirstMatch:
+    """Implementação anterior (primeiro grupo com algum sinal vence), generalizada para as regras."""
+
+    def __init__(self, rules: FallbackRules) -> None:
+        self._rules = rules
+
+    def classify_and_reply(self, text: str) -> Tuple[str, str, float]:
+        t = (text or "").lower()
+        for group in self._rules.groups:
+            signals = [s.lower() for s in group.signals]
+            if any(s in t for s in signals):
+                return (group.category, group.reply, group.confidence)
+        default = self._rules.default
+        return (default.category, default.reply, default.confidence)
+
+
+class _ReferenceAllSignals(HeuristicFallbackProvider):
+    """Mesmo score ponderado do engine, mas com um `in` por sinal em vez do autômato."""
+
+    def __init__(self, rules: FallbackRules) -> None:
+        super().__init__(rules)
+        self._signals: Dict[str, int] = {}
+        for group in rules.groups:
+            for signal in group.signals:
+                self._signals.setdefault(signal.lower(), len(self._signals))
+
+    def _signals_in(self, text: str) -> Set[int]:
+        return {pattern_id for signal, pattern_id in self._signals.items() if signal in text}
+
+
+def _with_extra_signals(rules: FallbackRules, n: int, seed: int = 7) -> FallbackRules:
+    rng = random.Random(seed)
+    out = rules.model_copy(deep=True)
+    for i in range(n):
+        group = out.groups[i % len(out.groups)]
+        signal = "".join(rng.choice("abcdefghijlmnopqrstuvxz") for _ in range(rng.randint(6, 12)))
+        group.signals[signal] = 1.0
+    return out
+
+
+def _bench(fn: Callable[[str], object], texts: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1KB,10KB,100KB", help="Tamanhos (1KB, 10KB, 100KB)")
+    parser.add_argument("--extra-signals", default="0,300", help="Sinais sintéticos a mais (lista)")
+    parser.add_argument("--signal-rate", type=float, default=0.01, help="Fração das palavras que são sinais")
+    parser.add_argument("--emails", type=int, default=200, help="Emails por medição (1KB; proporcionalmente menos nos maiores)")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por medição (usa a melhor)")
+    args = parser.parse_args()
+
+    base = FallbackRules.model_validate_json(DEFAULT_RULES_PATH.read_text(encoding="utf-8"))
+
+    print(
+        f"{'sinais':>7} {'tamanho':>8} {'engine emails/s':>16} {'MB/s':>6} "
+        f"{'1º sinal emails/s':>18} {'todos emails/s':>15} {'speedup (todos)':>16}"
+    )
+    for extra in [int(x) for x in args.extra_signals.split(",") if x.strip()]:
+        rules = _with_extra_signals(base, extra)
+        engine = HeuristicFallbackProvider(rules)
+        first_match = _ReferenceFirstMatch(rules)
+        all_signals = _ReferenceAllSignals(rules)
+
+        for label in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+            size = _SIZES[label]
+            count = max(5, args.emails * 1024 // size)
+            texts = [_fallback_text(base, size, args.signal_rate, seed=i) for i in range(count)]
+            assert all(engine.classify_and_reply(t) == all_signals.classify_and_reply(t) for t in texts)
+
+            t_engine = _bench(engine.classify_and_reply, texts, args.repeat)
+            t_first = _bench(first_match.classify_and_reply, texts, args.repeat)
+            t_all = _bench(all_signals.classify_and_reply, texts, args.repeat)
+            print(
+                f"{engine.n_signals:>7} {label:>8} {count / t_engine:>16,.0f} {count * size / t_engine / 1e6:>6,.0f} "
+                f"{count / t_first:>18,.0f} {count / t_all:>15,.0f} {t_all / t_engine:>15.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark do NlpPreprocess (tokens/s em entradas de 1KB, 100KB e 5MB).
+
+Compara o engine atual com a implementação de referência (a versão anterior, de duas
+tokenizações e sem cache) e confere que o `NlpOutput` é idêntico.
+
+Uso (na pasta Backend):
+    python -m benchmarks.bench_nlp
+    python -m benchmarks.bench_nlp --sizes 1KB,100KB --repeat 5 --no-reference
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from dataclasses import astuple
+from typing import Callable, List
+
+import simplemma
+
+from app.providers.nlp_preprocess import NlpOutput, NlpPreprocess
+
+_WORDS_PT = (
+    "olá bom dia equipe preciso de ajuda com o acesso ao sistema financeiro desde ontem "
+    "não consigo entrar e aparece erro de senha inválida poderiam verificar a fatura do mês "
+    "o pagamento foi realizado mas o boleto continua em aberto obrigado pela atenção "
+    "atenciosamente reunião amanhã confirmar horário projeto prazo entrega relatório"
+).split()
+_WORDS_EN = (
+    "hello team please check the invoice attached we could not process the payment "
+    "because the account was locked thanks for your help regards meeting tomorrow "
+    "deadline report project access password reset support ticket"
+).split()
+_EXTRAS = ["12345", "2026", "https://portal.exemplo.com/fatura", "financeiro@exemplo.com", "R$", "10/11", "-", "."]
+
+_SIZES = {"1KB": 1024, "100KB": 100 * 1024, "5MB": 5 * 1024 * 1024}
+
+
+def _email_text(size: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    parts: List[str] = []
+    total = 0
+    while total < size:
+        words = _WORDS_PT if rng.random() < 0.7 else _WORDS_EN
+        line = " ".join(rng.choice(words) if rng.random() < 0.9 else rng.choice(_EXTRAS) for _ in range(rng.randint(6, 16)))
+        parts.append(line)
+        total += len(line) + 1
+    return "\n".join(parts)[:size]
+
+
+class _ReferenceNlp(NlpPreprocess):
+    """Implementação anterior (duas tokenizações, regex por lema, lematização sem cache)."""
+
+    def run(self, text: str):
+        raw = (text or "").strip()
+        normalized = re.sub(r"\s+", " ", raw.strip())
+
+        toks = re.findall(r"[A-Za-zÀ-ÿ]+", normalized.lower())
+        en_hits = sum(1 for t in toks if t in self._stop_en)
+        pt_hits = sum(1 for t in toks if t in self._stop_pt)
+        lang = "en" if toks and en_hits > pt_hits else "pt"
+
+        lemmas: List[str] = []
+        for tok in re.findall(r"[A-Za-zÀ-ÿ0-9_@.\-]+", normalized.lower()):
+            if self._is_url(tok):
+                lemmas.append("<url>")
+                continue
+            if self._is_email(tok):
+                lemmas.append("<email>")
+                continue
+            if tok.isdigit():
+                lemmas.append("<num>")
+                continue
+            if self._is_stopword(tok, lang):
+                continue
+            lemma = simplemma.lemmatize(tok, lang=("pt", "en") if lang == "pt" else ("en", "pt")).lower().strip()
+            if len(lemma) < 3 or not re.search(r"[a-zà-ÿ]", lemma):
+                continue
+            lemmas.append(lemma)
+
+        return NlpOutput(
+            raw_text=raw,
+            normalized_text=normalized,
+            lang=lang,
+            lemmas=lemmas,
+            keywords=self._unique_first(lemmas, limit=25),
+        )
+
+
+def _bench(fn: Callable[[str], object], text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1KB,100KB,5MB", help="Tamanhos (1KB, 100KB, 5MB)")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por tamanho (usa a melhor)")
+    parser.add_argument("--no-reference", action="store_true", help="Não roda a implementação de referência")
+    args = parser.parse_args()
+
+    engine = NlpPreprocess()
+    reference = _ReferenceNlp()
+
+    # aquece dicionários do simplemma (carregamento lazy) fora da medição
+    engine.run(_email_text(2048, seed=1))
+    reference.run(_email_text(2048, seed=1))
+
+    print(f"{'tamanho':>8} {'tokens':>10} {'engine tok/s':>14} {'ref tok/s':>14} {'speedup':>8}  idêntico")
+    for label in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+        text = _email_text(_SIZES[label])
+        tokens = len(engine._tokenize(engine._normalize(text.strip())))
+
+        # instância nova por tamanho; a melhor de `repeat` execuções reflete o cache já aquecido
+        # (o estado normal de um worker, em que o vocabulário dos emails se repete)
+        engine = NlpPreprocess()
+        t_engine = _bench(engine.run, text, args.repeat)
+
+        if args.no_reference:
+            print(f"{label:>8} {tokens:>10} {tokens / t_engine:>14,.0f} {'-':>14} {'-':>8}  -")
+            continue
+
+        t_ref = _bench(reference.run, text, args.repeat)
+        same = astuple(engine.run(text)) == astuple(reference.run(text))
+        print(
+            f"{label:>8} {tokens:>10} {tokens / t_engine:>14,.0f} {tokens / t_ref:>14,.0f} "
+            f"{t_ref / t_engine:>7.1f}x  {'sim' if same else 'NÃO'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
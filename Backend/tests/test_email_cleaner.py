@@ -0,0 +1,45 @@
+import pytest
+
+from app.services.email_cleaner import EmailCleaner
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        # despedida antes do pedido: não é assinatura
+        (
+            "Bom dia equipe financeira,\nObrigado!\nPoderiam enviar a segunda via do boleto de março?\nJoão",
+            "Bom dia equipe financeira,\nObrigado!\nPoderiam enviar a segunda via do boleto de março?\nJoão",
+        ),
+        ("Hi team,\nThanks!\nCan you reset my password?", "Hi team,\nThanks!\nCan you reset my password?"),
+        (
+            "Prezados, bom dia.\nAtenciosamente,\nSolicito o cancelamento do contrato 123 a partir de hoje.",
+            "Prezados, bom dia.\nAtenciosamente,\nSolicito o cancelamento do contrato 123 a partir de hoje.",
+        ),
+        # despedida seguida de assinatura curta: corta
+        (
+            "Poderiam enviar a segunda via do boleto?\n\nAtenciosamente,\nJoão Silva\nAnalista Financeiro\n(11) 99999-0000",
+            "Poderiam enviar a segunda via do boleto?",
+        ),
+        # frase comum começando como rodapé de app não é assinatura
+        (
+            "Enviado do financeiro ontem, mas o boleto ainda não foi gerado e precisamos do pagamento até sexta.",
+            "Enviado do financeiro ontem, mas o boleto ainda não foi gerado e precisamos do pagamento até sexta.",
+        ),
+        ("Preciso do acesso ao repositório hoje.\n\nEnviado do meu iPhone", "Preciso do acesso ao repositório hoje."),
+    ],
+)
+def test_signature(text: str, expected: str) -> None:
+    assert EmailCleaner().clean(text).text == expected
+
+
+def test_quoted_reply_is_removed() -> None:
+    text = "Oi Ana, o relatório ainda não chegou, pode reenviar?\n\nEm seg., 3 de jun. de 2024, Ana <a@x.com> escreveu:\n> Segue."
+    cleaned = EmailCleaner().clean(text)
+    assert cleaned.text == "Oi Ana, o relatório ainda não chegou, pode reenviar?"
+    assert cleaned.removed == ("quote",)
+
+
+def test_forwarded_message_is_kept() -> None:
+    text = "---------- Forwarded message ---------\nDe: Cliente <c@x.com>\nDate: seg, 3 jun\n\nO sistema está com erro 500."
+    assert EmailCleaner().clean(text).text == text
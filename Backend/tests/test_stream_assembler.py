@@ -0,0 +1,40 @@
+from app.providers.ai_provider import ReplyStreamEvent
+from app.services.ai_output_guard import AiOutputGuard
+from app.services.email_classifier_service import _StreamAssembler
+
+_FALLBACK = ("Improdutivo", "Obrigado pela mensagem!", 0.6)
+
+
+def _classified(*deltas: str) -> _StreamAssembler:
+    assembler = _StreamAssembler(AiOutputGuard())
+    assembler.on_event(ReplyStreamEvent(kind="classification", category="Produtivo", confidence=0.8))
+    for text in deltas:
+        assembler.on_event(ReplyStreamEvent(kind="delta", text=text))
+    return assembler
+
+
+def test_fallback_after_deltas_keeps_category_and_marks_replaced():
+    done = _classified("Olá, vou verificar").finish(_FALLBACK)[-1]
+    assert (done.kind, done.category, done.confidence) == ("done", "Produtivo", 0.8)
+    assert done.text and done.text != _FALLBACK[1]
+    assert done.fallback and done.replaced
+
+
+def test_fallback_before_deltas_is_not_replaced():
+    events = _classified().finish(_FALLBACK)
+    assert [e.kind for e in events] == ["done"]
+    assert events[0].category == "Produtivo" and events[0].fallback and not events[0].replaced
+
+
+def test_fallback_without_classification_uses_fallback_result():
+    events = _StreamAssembler(AiOutputGuard()).finish(_FALLBACK)
+    assert [e.kind for e in events] == ["classification", "delta", "done"]
+    assert (events[-1].category, events[-1].text) == ("Improdutivo", "Obrigado pela mensagem!")
+    assert events[-1].fallback and not events[-1].replaced
+
+
+def test_provider_result_is_not_fallback():
+    assembler = _classified("Olá")
+    assembler.on_event(ReplyStreamEvent(kind="done", category="Produtivo", confidence=0.8, text="Olá, vou verificar."))
+    done = assembler.finish(None)[-1]
+    assert done.text == "Olá, vou verificar." and not done.fallback and not done.replaced
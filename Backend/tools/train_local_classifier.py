@@ -0,0 +1,231 @@
+"""
+Treino offline do classificador local (regressão logística sobre features hasheadas dos lemas).
+
+Entrada: JSONL com um par por linha — saídas da OpenAI logadas ou correções humanas:
+    {"text": "...", "category": "Produtivo" | "Improdutivo"}
+
+O corpus é lido em streaming e passa pelo `NlpPreprocess` em blocos (`run_many`, com pool de
+processos); só os índices das features ficam em memória. Como no serviço, o texto passa antes pelo
+`EmailCleaner` (padrão: `EMAIL_CLEANER_ENABLED`; `--no-clean` desliga); o artefato registra a escolha
+e o serviço recusa um modelo treinado de outro jeito. Treina com mini-batch SGD (AdaGrad),
+avalia num holdout determinístico e grava o artefato versionado lido pelos workers via mmap
+(`LOCAL_CLASSIFIER_PATH`).
+
+Uso (na pasta Backend):
+    python -m tools.train_local_classifier corpus.jsonl -o local-classifier.bin
+    python -m tools.train_local_classifier corpus.jsonl -o model.bin --features 18 --epochs 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.providers.local_classifier import (
+    NEGATIVE_CATEGORY,
+    POSITIVE_CATEGORY,
+    feature_indices,
+    save_artifact,
+)
+from app.providers.nlp_preprocess import NlpPreprocess
+from app.services.email_cleaner import EmailCleaner
+
+_LABELS = {POSITIVE_CATEGORY: 1.0, NEGATIVE_CATEGORY: 0.0}
+
+
+def _read_corpus(path: str, skipped: List[int]) -> Iterator[Tuple[str, float]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+                text, label = str(row["text"]), _LABELS[row["category"]]
+            except (ValueError, KeyError, TypeError):
+                skipped[0] += 1
+                continue
+            if text.strip():
+                yield text, label
+            else:
+                skipped[0] += 1
+
+
+def _featurize(
+    path: str, nlp: NlpPreprocess, n_features: int, block_size: int, cleaner: Optional[EmailCleaner] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """Corpus -> matriz esparsa (CSR: indptr/indices) + rótulos."""
+    indices: List[np.ndarray] = []
+    lengths: List[int] = []
+    labels: List[float] = []
+    skipped = [0]
+
+    block: List[Tuple[str, float]] = []
+
+    def flush() -> None:
+        texts = [t for t, _ in block]
+        if cleaner is not None:
+            # mesmas features que o serviço enxerga: NLP sobre o texto limpo
+            texts = [cleaner.clean(t, record=False).text for t in texts]
+        for out, (_, label) in zip(nlp.run_many(texts), block):
+            idx = feature_indices(out.lemmas, n_features).astype(np.uint32)
+            indices.append(idx)
+            lengths.append(idx.shape[0])
+            labels.append(label)
+        block.clear()
+
+    for pair in _read_corpus(path, skipped):
+        block.append(pair)
+        if len(block) >= block_size:
+            flush()
+    if block:
+        flush()
+
+    indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    flat = np.concatenate(indices) if indices else np.zeros(0, dtype=np.uint32)
+    return indptr, flat, np.asarray(labels, dtype=np.float32), skipped[0]
+
+
+def _rows(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    parts = [indices[indptr[r] : indptr[r + 1]] for r in rows]
+    lengths = np.fromiter((p.shape[0] for p in parts), dtype=np.int64, count=len(parts))
+    cat = np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint32)
+    return cat, np.repeat(np.arange(len(parts)), lengths)
+
+
+def _scores(w: np.ndarray, indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    cat, owner = _rows(indptr, indices, rows)
+    return w[-1] + np.bincount(owner, weights=w[cat], minlength=len(rows))
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -60, 60)))
+
+
+def _train(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    y: np.ndarray,
+    train_rows: np.ndarray,
+    n_features: int,
+    *,
+    epochs: int,
+    batch_size: int,
+    lr: float,
+    l2: float,
+    seed: int,
+) -> np.ndarray:
+    w = np.zeros(n_features + 1, dtype=np.float64)
+    g2 = np.full(n_features + 1, 1e-8, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+
+    for _ in range(epochs):
+        order = rng.permutation(train_rows)
+        for start in range(0, order.shape[0], batch_size):
+            rows = order[start : start + batch_size]
+            cat, owner = _rows(indptr, indices, rows)
+            err = _sigmoid(w[-1] + np.bincount(owner, weights=w[cat], minlength=len(rows))) - y[rows]
+
+            # AdaGrad esparso: só as features presentes no batch são atualizadas
+            touched, inverse = np.unique(cat, return_inverse=True)
+            grad = np.bincount(inverse, weights=err[owner]) / len(rows) + l2 * w[touched]
+            g2[touched] += grad * grad
+            w[touched] -= lr * grad / np.sqrt(g2[touched])
+
+            grad_b = float(err.mean())
+            g2[-1] += grad_b * grad_b
+            w[-1] -= lr * grad_b / np.sqrt(g2[-1])
+
+    return w
+
+
+def _accuracy(w: np.ndarray, indptr: np.ndarray, indices: np.ndarray, y: np.ndarray, rows: np.ndarray) -> float:
+    if rows.shape[0] == 0:
+        return float("nan")
+    predicted = (_scores(w, indptr, indices, rows) >= 0).astype(np.float32)
+    return float((predicted == y[rows]).mean())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="JSONL com {\"text\", \"category\"} por linha")
+    parser.add_argument("-o", "--output", required=True, help="Caminho do artefato (LOCAL_CLASSIFIER_PATH)")
+    parser.add_argument("--features", type=int, default=18, help="log2 do número de features hasheadas")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--lr", type=float, default=0.5, help="Taxa de aprendizado (AdaGrad)")
+    parser.add_argument("--l2", type=float, default=1e-6)
+    parser.add_argument("--holdout", type=float, default=0.1, help="Fração do corpus para avaliação")
+    parser.add_argument("--block-size", type=int, default=512, help="Textos por bloco do NLP")
+    parser.add_argument("--workers", type=int, default=2, help="Processos do NLP (0 = sem pool)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--clean",
+        action=argparse.BooleanOptionalAction,
+        default=settings.email_cleaner_enabled,
+        help="Limpa o texto com o EmailCleaner antes do NLP (padrão: EMAIL_CLEANER_ENABLED)",
+    )
+    args = parser.parse_args()
+
+    n_features = 1 << args.features
+    nlp = NlpPreprocess(pool_workers=args.workers)
+
+    started = time.perf_counter()
+    try:
+        indptr, indices, y, skipped = _featurize(
+            args.corpus, nlp, n_features, args.block_size, EmailCleaner() if args.clean else None
+        )
+    finally:
+        nlp.close()
+    t_nlp = time.perf_counter() - started
+
+    n = y.shape[0]
+    if n == 0:
+        sys.exit("Corpus sem exemplos válidos.")
+
+    # holdout determinístico (mesmo corpus + seed -> mesma divisão)
+    rows = np.random.default_rng(args.seed).permutation(n)
+    n_holdout = int(n * args.holdout) if n > 1 else 0
+    holdout_rows, train_rows = rows[:n_holdout], rows[n_holdout:]
+
+    started = time.perf_counter()
+    w = _train(
+        indptr,
+        indices,
+        y,
+        train_rows,
+        n_features,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        lr=args.lr,
+        l2=args.l2,
+        seed=args.seed,
+    )
+    t_train = time.perf_counter() - started
+
+    save_artifact(args.output, w, n_samples=train_rows.shape[0], cleaned=args.clean)
+
+    positives = int(y.sum())
+    acc_train = _accuracy(w, indptr, indices, y, train_rows)
+    acc_holdout = _accuracy(w, indptr, indices, y, holdout_rows)
+    train_rate = train_rows.shape[0] * args.epochs / t_train
+
+    print(f"exemplos: {n} (Produtivo {positives}, Improdutivo {n - positives}, ignorados {skipped})")
+    print(f"NLP:      {t_nlp:.2f}s ({n / t_nlp:,.0f} emails/s)")
+    print(f"treino:   {t_train:.2f}s ({train_rate:,.0f} exemplos/s, {args.epochs} épocas)")
+    print(f"acurácia: treino {acc_train:.4f}, holdout {acc_holdout:.4f} ({holdout_rows.shape[0]} exemplos)")
+    print(
+        f"artefato: {args.output} ({n_features} features, {(n_features + 1) * 4 / 1024:,.0f} KB, "
+        f"{'com' if args.clean else 'sem'} EmailCleaner)"
+    )
+
+
+if __name__ == "__main__":
+    main()